@@ -0,0 +1,261 @@
+"""
+ASGI entry point: the small JSON write routes and the notification stream run as coroutines,
+everything else on the Flask app.
+
+    uvicorn asgi:app --port 8000 --workers 2      # or: python scripts/serve.py --server uvicorn
+
+POST /vote_review, /vote_setup and /mark_notifications_read are answered on
+the event loop through an async engine (aiosqlite, or psycopg on PostgreSQL),
+so thousands of concurrent votes wait for the database without holding a
+worker thread each. They run the same code as the Flask views
+(services.apply_review_vote and friends, through AsyncSession.run_sync) and
+read the signed-in user from the Flask session cookie.
+
+GET /notifications/stream stays open and pushes each new notification of the
+user as a server-sent event (notification_hub.py); an idle stream costs a
+queue, not a thread. Any other request is handed to the Flask app on a thread
+pool (ASGI_WSGI_THREADS, default 10).
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import dump_cookie, parse_cookie, parse_options_header
+
+from app import create_app
+from database import create_async_engine_for
+from extensions import db, fragment_cache, metrics, notification_hub
+from models import User
+from notification_hub import format_event
+from services import apply_review_vote, apply_setup_vote, mark_notifications_read
+
+MAX_BODY = 64 * 1024  # the routes only take a couple of form fields
+STREAM_PATH = '/notifications/stream'
+STREAM_RETRY_MS = 3000   # reconnect delay after a dropped stream
+KEEPALIVE_SECONDS = 15   # comment lines keep proxies from closing an idle stream
+
+
+class AsyncRouteSession(Session):
+    """Sync session under the AsyncSessions of the coroutine routes (so listeners can target it)"""
+
+
+def vote_review(session, user, form):
+    return apply_review_vote(session, user, int(form['review_id']), form['vote_type'])
+
+
+def vote_setup(session, user, form):
+    return apply_setup_vote(session, user, int(form['setup_id']), form['vote_type'])
+
+
+def mark_all_notifications_read(session, user, form):
+    return {'success': True, 'updated': mark_notifications_read(session, user.id)}, 200
+
+
+# (method, path) -> (Flask endpoint the route stands in for, handler run inside the session)
+ROUTES = {
+    ('POST', '/vote_review'): ('social.vote_review', vote_review),
+    ('POST', '/vote_setup'): ('social.vote_setup', vote_setup),
+    ('POST', '/mark_notifications_read'): ('notifications.mark_all_notifications_read', mark_all_notifications_read),
+}
+
+
+class AsyncRoutes:
+    """ASGI app serving ROUTES on an async engine and passing everything else to ``fallback``"""
+
+    def __init__(self, flask_app, fallback):
+        self.flask_app = flask_app
+        self.fallback = fallback
+        self.engine = create_async_engine_for(flask_app, db)
+        self.sessions = async_sessionmaker(self.engine, sync_session_class=AsyncRouteSession, expire_on_commit=False)
+        fragment_cache.watch(AsyncRouteSession)
+        notification_hub.watch(AsyncRouteSession)
+        metrics.gauge('notification_streams_open', 'Open notification streams in this process',
+                      lambda: [((), notification_hub.subscriber_count())])
+        # SQLite has a single writer: queue the write transactions here, in order, rather than
+        # in SQLite's busy handler, which is not fair and times out waiters under load
+        self.write_lock = asyncio.Lock() if self.engine.dialect.name == 'sqlite' else contextlib.nullcontext()
+        self.session_interface = flask_app.session_interface
+        self.serializer = self.session_interface.get_signing_serializer(flask_app)
+        self.cookie_name = self.session_interface.get_cookie_name(flask_app)
+        self.max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == STREAM_PATH:
+            return await self.notification_stream(scope, receive, send)
+        route = ROUTES.get((scope.get('method'), scope['path'])) if scope['type'] == 'http' else None
+        if route is None:
+            return await self.fallback(scope, receive, send)
+
+        endpoint, handler = route
+        started = time.perf_counter()
+        cookie = None
+        data = self._load_session(scope)
+        user_id = data.get('_user_id')
+        if user_id is None:
+            body, status = {'success': False, 'message': 'Login required'}, 401
+        else:
+            try:
+                form = await self._read_form(scope, receive)
+                async with self.write_lock, self.sessions() as session:
+                    body, status = await session.run_sync(self._handle, handler, int(user_id), form)
+                    if status == 200:
+                        await session.commit()
+                        cookie = self._pin_to_primary(data)
+            except (KeyError, ValueError):
+                body, status = {'success': False, 'message': 'Bad request'}, 400
+
+        await self._respond(send, body, status, cookie)
+        labels = (('endpoint', endpoint),)
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, labels)
+        metrics.inc('http_requests_total', labels + (('method', scope['method']), ('status', str(status))))
+
+    @staticmethod
+    def _handle(session, handler, user_id, form):
+        user = session.get(User, user_id)
+        if user is None:
+            return {'success': False, 'message': 'Login required'}, 401
+        if user.ban_in_effect():
+            # Same answer as account.enforce_ban gives banned users' writes on the Flask side
+            return {'success': False, 'message': 'Account banned'}, 403
+        return handler(session, user, form)
+
+    async def notification_stream(self, scope, receive, send):
+        user_id = self._load_session(scope).get('_user_id')
+        if user_id is None:
+            return await self._respond(send, {'success': False, 'message': 'Login required'}, 401)
+        user_id = int(user_id)
+        try:
+            after_id = int(self._header(scope, b'last-event-id'))
+        except ValueError:
+            after_id = None
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def deliver(item):
+            # Called on whichever thread committed the notification
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        # Subscribe before reading the backlog so nothing committed in between is lost
+        notification_hub.subscribe(user_id, deliver)
+        disconnected = asyncio.ensure_future(self._disconnected(receive))
+        try:
+            async with self.sessions() as session:
+                events, cursor = await session.run_sync(notification_hub.replay, user_id, after_id)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),  # nginx: pass events through unbuffered
+            ]})
+            chunk = f"retry: {STREAM_RETRY_MS}\nid: {cursor}\n\n" + ''.join(format_event(item) for item in events)
+            while True:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+                next_event = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({next_event, disconnected}, timeout=KEEPALIVE_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    next_event.cancel()
+                    return
+                if next_event not in done:
+                    next_event.cancel()
+                    chunk = ': keepalive\n\n'
+                    continue
+                chunk = ''
+                for item in [next_event.result()] + [queue.get_nowait() for _ in range(queue.qsize())]:
+                    if item['id'] > cursor:  # skip what the backlog already sent
+                        cursor = item['id']
+                        chunk += format_event(item)
+        finally:
+            notification_hub.unsubscribe(user_id, deliver)
+            disconnected.cancel()
+
+    @staticmethod
+    async def _disconnected(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    def _header(scope, name):
+        return next((value for key, value in scope['headers'] if key == name), b'').decode('latin-1')
+
+    # Flask session cookie
+
+    def _load_session(self, scope):
+        if self.serializer is None:
+            return {}
+        value = parse_cookie(self._header(scope, b'cookie')).get(self.cookie_name)
+        if not value:
+            return {}
+        try:
+            return self.serializer.loads(value, max_age=self.max_age)
+        except BadSignature:
+            return {}
+
+    def _pin_to_primary(self, data):
+        """Same read-your-writes cookie as database.init_database, when a replica is configured"""
+        if self.flask_app.extensions.get('database_replica') is None:
+            return None
+        data = dict(data, db_primary_until=time.time() + self.flask_app.config.get('DATABASE_REPLICA_PIN_SECONDS', 5))
+        app, interface = self.flask_app, self.session_interface
+        return dump_cookie(
+            self.cookie_name, self.serializer.dumps(data),
+            max_age=self.max_age if data.get('_permanent') else None,
+            domain=interface.get_cookie_domain(app), path=interface.get_cookie_path(app),
+            secure=interface.get_cookie_secure(app), httponly=interface.get_cookie_httponly(app),
+            samesite=interface.get_cookie_samesite(app),
+        )
+
+    # ASGI plumbing
+
+    async def _read_form(self, scope, receive):
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY:
+                raise ValueError("request body too large")
+            if not message.get('more_body'):
+                break
+        mimetype, options = parse_options_header(self._header(scope, b'content-type'))
+        _, form, _ = FormDataParser().parse(io.BytesIO(bytes(body)), mimetype, len(body), options)
+        return form
+
+    @staticmethod
+    async def _respond(send, body, status, cookie=None):
+        payload = json.dumps(body).encode()
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        if cookie:
+            headers.append((b'set-cookie', cookie.encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                notification_hub.listen()  # hear about notifications committed by other processes
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                notification_hub.close()
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(flask_app=None):
+    flask_app = flask_app or create_app()
+    threads = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+    return AsyncRoutes(flask_app, WSGIMiddleware(flask_app, workers=threads))
+
+
+app = create_asgi_app()
@@ -0,0 +1,163 @@
+# Static asset fingerprinting, precompression and far-future caching
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional; gzip siblings are still produced
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+RETIRED_NAME = 'manifest.retired.json'
+# How long fingerprinted copies outlive the build that stopped using them
+STALE_RETENTION = 7 * 24 * 60 * 60
+# Uploads are already content-addressed by the upload pipeline
+SKIP_DIRS = ('uploads',)
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+_UPLOAD_VARIANT_RE = re.compile(r'(^|/)[0-9a-f]{32}_[a-z]+\.(webp|jpg)$')
+
+
+def is_immutable(filename):
+    """True for files whose name changes whenever their content does"""
+    return bool(_FINGERPRINT_RE.search(filename) or _UPLOAD_VARIANT_RE.search(filename))
+
+
+def _fingerprinted_name(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def _write_compressed(path, data):
+    with gzip.open(path + '.gz', 'wb', compresslevel=9) as fh:
+        fh.write(data)
+    if brotli is not None:
+        with open(path + '.br', 'wb') as fh:
+            fh.write(brotli.compress(data, quality=11))
+
+
+def build_manifest(static_folder, retention=STALE_RETENTION, now=None):
+    """Fingerprint every static asset and write ``manifest.json``.
+
+    Each source file gets a ``name.<hash>.ext`` copy plus ``.gz`` (and
+    ``.br`` when the brotli package is installed) siblings for text
+    assets. Copies from earlier builds that the new manifest no longer
+    names are kept for ``retention`` seconds, since pages cached during a
+    rolling deploy still link to them, and removed by the first build
+    after that (``manifest.retired.json`` records when each was retired).
+    Returns the manifest mapping source names to fingerprinted names.
+    """
+    now = time.time() if now is None else now
+    sources, previous = [], set()
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        rel_dir = os.path.relpath(dirpath, static_folder)
+        if rel_dir.split(os.sep)[0] in SKIP_DIRS:
+            dirnames[:] = []
+            continue
+        for filename in filenames:
+            if filename in (MANIFEST_NAME, RETIRED_NAME) or filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(dirpath, filename)
+            if _FINGERPRINT_RE.search(filename):
+                previous.add(_relative(path, static_folder))  # output of a previous build
+            else:
+                sources.append(path)
+
+    manifest = {}
+    for path in sources:
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        hashed_path = _fingerprinted_name(path, hashlib.sha256(data).hexdigest()[:12])
+        with open(hashed_path, 'wb') as fh:
+            fh.write(data)
+        if path.endswith(COMPRESSIBLE):
+            _write_compressed(hashed_path, data)
+        manifest[_relative(path, static_folder)] = _relative(hashed_path, static_folder)
+
+    retired = _read_json(os.path.join(static_folder, RETIRED_NAME))
+    still_retired = {}
+    for name in previous - set(manifest.values()):
+        since = retired.get(name, now)
+        if now - since < retention:
+            still_retired[name] = since
+            continue
+        path = os.path.join(static_folder, name)
+        for stale in (path, path + '.gz', path + '.br'):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    _write_json(os.path.join(static_folder, RETIRED_NAME), still_retired)
+    _write_json(os.path.join(static_folder, MANIFEST_NAME), manifest)
+    return manifest
+
+
+def _relative(path, static_folder):
+    return os.path.relpath(path, static_folder).replace(os.sep, '/')
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _write_json(path, data):
+    # Written aside and renamed, so a server starting mid-build never reads half a file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(static_folder):
+    return _read_json(os.path.join(static_folder, MANIFEST_NAME))
+
+
+def init_assets(app):
+    """Rewrite ``url_for('static', ...)`` to fingerprinted names and serve them immutably.
+
+    Without a manifest (e.g. in development before ``scripts/build_assets.py``
+    has run) URLs are left unchanged.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        if not is_immutable(filename):
+            return app.send_static_file(filename)
+
+        response = None
+        full_path = os.path.join(app.static_folder, filename)
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.isfile(full_path + ext):
+                response = send_from_directory(app.static_folder, filename + ext, mimetype=mimetype)
+                response.content_encoding = encoding
+                break
+        if response is None:
+            response = send_from_directory(app.static_folder, filename)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+        response.expires = None
+        return response
+
+    app.view_functions['static'] = static
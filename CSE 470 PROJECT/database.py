@@ -0,0 +1,223 @@
+# Database engine profiles: connection pragmas and pool settings, read-replica routing
+
+import functools
+import time
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+
+# PRAGMAs applied to every new SQLite connection, per profile
+SQLITE_PRAGMAS = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',        # readers never block the writer and vice versa
+        'busy_timeout': 5000,         # wait up to 5s for the write lock instead of failing
+        'synchronous': 'NORMAL',      # safe with WAL; fsync only at checkpoints
+        'mmap_size': 268435456,       # 256 MB of the file memory-mapped for reads
+        'cache_size': -65536,         # 64 MB page cache per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+# SQLAlchemy engine options, per backend and profile
+ENGINE_OPTIONS = {
+    'sqlite': {
+        'default': {},
+        'production': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            'pool_recycle': 3600,
+            'connect_args': {'timeout': 5, 'check_same_thread': False},
+        },
+    },
+    'postgresql': {
+        'default': {'pool_pre_ping': True},
+        'production': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        },
+    },
+}
+
+# Async drivers for the coroutine routes in asgi.py, per backend
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'psycopg'}
+
+
+def database_url(url):
+    """Normalise a DATABASE_URL (Heroku-style postgres:// URLs are not accepted by SQLAlchemy)"""
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(profile, url):
+    """Return SQLALCHEMY_ENGINE_OPTIONS for a database profile and URL"""
+    backend = make_url(url).get_backend_name()
+    options = ENGINE_OPTIONS.get(backend, {'default': {}, 'production': {}})
+    if profile not in options:
+        raise ValueError(f"Unknown DATABASE_PROFILE: {profile}")
+    return dict(options[profile])
+
+
+def set_sqlite_pragmas(engine, profile, readonly=False):
+    """Run the profile's PRAGMAs on each new connection of a SQLite engine"""
+    pragmas = SQLITE_PRAGMAS[profile]
+    if readonly:
+        # journal_mode is a property of the file; the primary sets it
+        pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of ``@read_replica`` views to the replica engine.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary,
+    and once a request has written, the rest of it reads from the primary
+    too. The user's following requests stay on the primary for
+    DATABASE_REPLICA_PIN_SECONDS so they see their own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+                g.db_pinned = True
+            elif g.get('db_read_replica') and not g.get('db_pinned'):
+                replica = current_app.extensions.get('database_replica')
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """Let a GET handler that never writes read from the replica"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('db_primary_until', 0) > time.time():
+            g.db_pinned = True
+        g.db_read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def create_replica_engine(app, primary):
+    """Build the engine for DATABASE_REPLICA, or None when no replica is configured.
+
+    ``'readonly'`` opens the primary SQLite file read-only (useful with
+    WAL, where readers never wait for the writer); anything else is taken
+    as the URL of a replica server.
+    """
+    replica = app.config.get('DATABASE_REPLICA')
+    profile = app.config.get('DATABASE_PROFILE', 'default')
+    if not replica:
+        return None
+    if replica == 'readonly':
+        if primary.dialect.name != 'sqlite':
+            raise ValueError("DATABASE_REPLICA=readonly needs a SQLite primary")
+        url = f"sqlite:///file:{primary.url.database}?mode=ro&uri=true"
+    else:
+        url = database_url(replica)
+    engine = create_engine(url, **engine_options(profile, url))
+    set_sqlite_pragmas(engine, profile, readonly=True)
+    return engine
+
+
+def init_database(app, db):
+    """Apply the configured DATABASE_PROFILE to every engine of the app and set up the replica"""
+    profile = app.config.get('DATABASE_PROFILE', 'default')
+    with app.app_context():
+        for engine in db.engines.values():
+            set_sqlite_pragmas(engine, profile)
+        replica = create_replica_engine(app, db.engine)
+    app.extensions['database_replica'] = replica
+    if replica is None:
+        return
+
+    @app.after_request
+    def pin_to_primary(response):
+        if g.get('db_pinned'):
+            session['db_primary_until'] = time.time() + app.config.get('DATABASE_REPLICA_PIN_SECONDS', 5)
+        return response
+
+
+def create_async_engine_for(app, db):
+    """Async engine on the app's primary database (same profile and pool settings) for asgi.py"""
+    # Imported here so only the ASGI server needs greenlet and the async drivers
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with app.app_context():
+        url = db.engine.url  # Flask-SQLAlchemy has already resolved relative SQLite paths
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    profile = app.config.get('DATABASE_PROFILE', 'default')
+    engine = create_async_engine(url, **engine_options(profile, url))
+    set_sqlite_pragmas(engine.sync_engine, profile)
+    if backend == 'sqlite':
+        # The async routes all read then write. Taking the write lock up front makes a
+        # busy SQLite wait (busy_timeout) instead of failing to upgrade a stale read.
+        @event.listens_for(engine.sync_engine, 'connect')
+        def disable_implicit_begin(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine.sync_engine, 'begin')
+        def begin_immediate(connection):
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+    return engine
+
+
+def dispose_engines(app, db):
+    """Drop pooled connections inherited from a parent process (call in each forked worker).
+
+    ``close=False`` leaves the parent's sockets alone; the child just
+    stops using them and opens its own on first use.
+    """
+    with app.app_context():
+        engines = list(db.engines.values())
+    if app.extensions.get('database_replica') is not None:
+        engines.append(app.extensions['database_replica'])
+    for engine in engines:
+        engine.dispose(close=False)
+
+
+def create_missing_indexes(db):
+    """Create any index declared on the models that the database does not have yet.
+
+    ``db.create_all()`` only creates indexes together with new tables, so
+    databases created before an index was declared need this. Indexes on
+    columns the database does not have yet (run the migration script
+    first) are skipped. Must be called inside an app context.
+    Returns ``(created, skipped)`` lists of index names.
+    """
+    created, skipped = [], []
+    for engine in db.engines.values():
+        for table in db.metadata.sorted_tables:
+            with engine.begin() as conn:
+                inspector = inspect(conn)
+                if not inspector.has_table(table.name):
+                    continue
+                columns = {column['name'] for column in inspector.get_columns(table.name)}
+                existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    if index.name in existing:
+                        continue
+                    if not {column.name for column in index.columns} <= columns:
+                        skipped.append(index.name)
+                        continue
+                    index.create(conn)
+                    created.append(index.name)
+    return created, skipped
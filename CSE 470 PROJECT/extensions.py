@@ -0,0 +1,21 @@
+# Extension objects shared by the models, services and blueprints; bound to an app in create_app()
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+from database import RoutingSession
+from fragment_cache import FragmentCache
+from metrics import Metrics
+from notification_hub import NotificationHub
+from passwords import PasswordHasher
+from query_stats import QueryStats
+from rate_limit import RateLimiter
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+login_manager = LoginManager()
+fragment_cache = FragmentCache()
+query_stats = QueryStats()
+metrics = Metrics()
+notification_hub = NotificationHub()
+password_hasher = PasswordHasher()
+rate_limiter = RateLimiter()
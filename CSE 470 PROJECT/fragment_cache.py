@@ -0,0 +1,328 @@
+# Rendered-fragment cache for anonymous pages, invalidated by entity versions
+
+import functools
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class LRUBackend:
+    """In-process LRU store. Versions live outside the LRU so they are never evicted.
+
+    Only suitable for a single worker process: other processes never see
+    the version bumps made here, so they would go on serving (and
+    answering 304 for) pages that have changed.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, keys):
+        with self._lock:
+            return [self._versions.get(key, 0) for key in keys]
+
+    def incr_versions(self, keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Local SQLite file shared by every worker process on the host"""
+
+    shared = True
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_expires ON entries (expires)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl)
+        )
+        self._sets += 1
+        if self._sets % 100 == 0:
+            # Drop expired entries, then the soonest-to-expire ones beyond the size cap
+            conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def get_versions(self, keys):
+        placeholders = ','.join('?' * len(keys))
+        rows = dict(self._conn().execute(
+            f"SELECT key, version FROM versions WHERE key IN ({placeholders})", list(keys)
+        ).fetchall())
+        return [rows.get(key, 0) for key in keys]
+
+    def incr_versions(self, keys):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO versions (key, version) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET version = version + 1",
+                [(key,) for key in keys]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+    def after_fork(self):
+        # SQLite connections must not cross a fork; each worker opens its own
+        self._local = threading.local()
+
+
+class FragmentCache:
+    """Caches rendered HTML keyed by route, query args and entity versions.
+
+    Each tracked model has a table-wide version (``'Game'``) and a per-row
+    version (``'Game:3'``); both are bumped after a commit that inserts,
+    updates or deletes a row, so cached fragments that depend on them are
+    never served again. Bulk ``query.update()``/``delete()`` calls bump the
+    table-wide version.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 300
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.etag_salt = ''
+        self._tracked = {}
+        self._warned = False
+
+    def init_app(self, app, db):
+        backend = app.config.get('FRAGMENT_CACHE_BACKEND', 'sqlite')
+        max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 1024)
+        if backend == 'sqlite':
+            path = app.config.get('FRAGMENT_CACHE_PATH') or os.path.join(app.instance_path, 'fragment_cache.db')
+            self.backend = SQLiteBackend(path, max_entries)
+        elif backend == 'lru':
+            self.backend = LRUBackend(max_entries)
+        else:
+            raise ValueError(f"Unknown FRAGMENT_CACHE_BACKEND: {backend}")
+        self.ttl = app.config.get('FRAGMENT_CACHE_TTL', 300)
+        self.enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+        # Changes whenever the code or templates change, so a deploy invalidates old ETags
+        self.etag_salt = app.config.get('ETAG_SALT') or _code_version(app)
+        app.extensions['fragment_cache'] = self
+        self._warned = False
+        if not self.backend.shared:
+            app.before_request(self._check_single_process)
+
+        self.watch(db.session)
+
+    def _check_single_process(self):
+        # The WSGI server says whether other processes serve the same app
+        if not self._warned and request.environ.get('wsgi.multiprocess'):
+            self._warned = True
+            logger.warning("FRAGMENT_CACHE_BACKEND=lru under a multi-process server: other workers' "
+                           "commits never reach this cache; use 'sqlite'")
+
+    def watch(self, session):
+        """Invalidate on commits made through ``session`` (a session, scoped session or Session subclass)"""
+        event.listen(session, 'after_flush', self._collect_changes)
+        event.listen(session, 'after_commit', self._bump_versions)
+        event.listen(session, 'after_rollback', self._discard_changes)
+        event.listen(session, 'do_orm_execute', self._collect_bulk_changes)
+
+    def after_fork(self):
+        """Call in each forked worker process"""
+        if hasattr(self.backend, 'after_fork'):
+            self.backend.after_fork()
+        elif not self.backend.shared and not self._warned:
+            self._warned = True
+            logger.warning("FRAGMENT_CACHE_BACKEND=lru in a forked worker: its versions are not shared "
+                           "with the other workers; use 'sqlite'")
+
+    def track(self, model, parents=None):
+        """Invalidate on changes to ``model``.
+
+        ``parents`` maps a parent model name to the foreign key attribute,
+        e.g. ``{'Game': 'game_id'}`` so a new review also bumps ``Game:<id>``.
+        """
+        self._tracked[model] = parents or {}
+
+    def _version_keys(self, instance):
+        model = type(instance)
+        name = model.__name__
+        keys = {name}
+        if getattr(instance, 'id', None) is not None:
+            keys.add(f"{name}:{instance.id}")
+        for parent, attr in self._tracked[model].items():
+            parent_id = getattr(instance, attr, None)
+            if parent_id is not None:
+                keys.add(f"{parent}:{parent_id}")
+        return keys
+
+    def _collect_changes(self, session, flush_context):
+        pending = session.info.setdefault('fragment_cache_keys', set())
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            if type(instance) in self._tracked:
+                pending.update(self._version_keys(instance))
+
+    def _collect_bulk_changes(self, orm_execute_state):
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in self._tracked:
+            pending = orm_execute_state.session.info.setdefault('fragment_cache_keys', set())
+            pending.add(mapper.class_.__name__)
+
+    def _bump_versions(self, session):
+        keys = session.info.pop('fragment_cache_keys', None)
+        if keys:
+            self.backend.incr_versions(sorted(keys))
+
+    def _discard_changes(self, session):
+        session.info.pop('fragment_cache_keys', None)
+
+    def _dependency_keys(self, dependencies, view_args):
+        """Fill ``{view_arg}`` and ``{user_id}`` placeholders in dependency names"""
+        user_id = current_user.get_id() if current_user.is_authenticated else 'anon'
+        return [dep.format(user_id=user_id, **view_args) for dep in dependencies]
+
+    def make_key(self, dependencies):
+        versions = self.backend.get_versions(dependencies)
+        args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        stamp = ','.join(f"{dep}@{version}" for dep, version in zip(dependencies, versions))
+        return f"{request.path}?{args}|{stamp}"
+
+    def conditional(self, *dependencies):
+        """Answer revalidation requests with 304 before the view renders anything.
+
+        The ETag covers the URL and query args, the viewer, the code version
+        and the versions of the dependencies (same placeholders as
+        ``cached_for_anonymous``, plus ``{user_id}`` for the viewer's own rows),
+        so it only matches while the page would render identically.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                keys = self._dependency_keys(dependencies, kwargs)
+                versions = self.backend.get_versions(keys)
+                viewer = current_user.get_id() if current_user.is_authenticated else 'anon'
+                parts = [self.etag_salt, request.full_path, viewer]
+                parts += [f"{key}@{version}" for key, version in zip(keys, versions)]
+                etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+                if etag in request.if_none_match:
+                    response = current_app.response_class(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                # Per-viewer content: browsers may keep it but must revalidate every time
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
+
+    def cached_for_anonymous(self, *dependencies):
+        """Serve the view's rendered HTML from the cache for anonymous visitors.
+
+        Dependencies are version keys; ``{name}`` placeholders are filled
+        from the view arguments, e.g. ``'Game:{game_id}'``. Visitors who are
+        logged in or have pending flash messages always get a fresh render.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or current_user.is_authenticated or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                key = self.make_key(self._dependency_keys(dependencies, kwargs))
+                html = self.backend.get(key)
+                if html is not None:
+                    self.hits += 1
+                    return html
+                self.misses += 1
+                rv = view(*args, **kwargs)
+                if isinstance(rv, str):
+                    self.backend.set(key, rv, self.ttl)
+                return rv
+            return wrapper
+        return decorator
+
+
+def _code_version(app):
+    """Fingerprint of the application's Python modules and templates (by mtime)"""
+    paths = [os.path.join(app.root_path, name) for name in os.listdir(app.root_path) if name.endswith('.py')]
+    for dirpath, _, filenames in os.walk(os.path.join(app.root_path, app.template_folder)):
+        paths.extend(os.path.join(dirpath, name) for name in filenames)
+    stamp = max((os.path.getmtime(path) for path in paths), default=0)
+    return str(int(stamp))
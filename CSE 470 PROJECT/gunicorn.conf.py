@@ -0,0 +1,48 @@
+# Gunicorn settings, loaded by scripts/serve.py or `gunicorn -c gunicorn.conf.py wsgi:app`.
+#
+# Every value can be overridden from the environment. The app is preloaded in the
+# master, so code changes need a new master rather than a HUP:
+#   kill -USR2 $(cat instance/gunicorn.pid)      # start a new master with the new code
+#   kill -WINCH <old master pid>                 # stop its workers once the new ones serve
+#   kill -QUIT <old master pid>                  # then the old master itself
+# HUP still reloads this file and replaces workers gracefully.
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+# Processes use every core; threads overlap the time requests wait on the database
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+preload_app = True        # import and build the app once; workers fork with it in memory
+timeout = 30              # kill a worker stuck on one request this long
+graceful_timeout = 30     # on reload/shutdown, let in-flight requests finish
+keepalive = 5
+max_requests = 2000       # recycle workers now and then, with jitter so they don't restart together
+max_requests_jitter = 200
+pidfile = os.environ.get('GUNICORN_PIDFILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'gunicorn.pid'))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # unset = no access log
+errorlog = '-'
+
+# Read before the app is preloaded: production pragmas/pools, and a page cache every worker shares
+os.environ.setdefault('DATABASE_PROFILE', 'production')
+os.environ.setdefault('FRAGMENT_CACHE_BACKEND', 'sqlite')
+
+# Password hashing pools, per worker process (passwords.PasswordHasher). A hash waiting in a
+# backlog holds one of the `threads` request threads, so each process keeps workers + backlog of
+# both lanes below `threads`: the shared lane gets about one hashing thread per core across all
+# workers and no queue (a credential-stuffing burst gets "busy, retry" at once), and clients
+# without recent failures get a thread of their own with one more login waiting behind it.
+# Raise GUNICORN_THREADS before raising these. Every one can be set in the environment.
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+os.environ.setdefault('PASSWORD_HASH_BACKLOG', '0')
+os.environ.setdefault('PASSWORD_HASH_PRIORITY_WORKERS', '1')
+os.environ.setdefault('PASSWORD_HASH_PRIORITY_BACKLOG', '1')
+os.environ.setdefault('PASSWORD_HASH_NICE', '10')
+
+
+def post_fork(server, worker):
+    # Pooled connections and cache handles created in the master must not be shared
+    from app import after_fork
+    after_fork(server.app.wsgi())
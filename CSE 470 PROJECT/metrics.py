@@ -0,0 +1,247 @@
+# Prometheus-style metrics: request latency, DB time, pool usage, cache hits and job durations
+
+import bisect
+import functools
+import threading
+import time
+
+from flask import Response, abort, current_app, g, got_request_exception, request
+
+# Histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Merge the shards of finished threads after this many new ones (the dev server uses a thread per request)
+COMPACT_EVERY = 256
+
+
+class Metrics:
+    """Counters and histograms exposed in Prometheus text format on ``/metrics``.
+
+    Recording is lock-free: every thread writes to its own shard, and the
+    shards are only summed when ``/metrics`` is scraped. Shards of threads
+    that have exited are folded into one retired shard. Gauges are
+    computed at scrape time by callbacks. Values are per process; with
+    several workers, scrape each or use one worker per metrics port.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._meta = {}        # name -> (type, help)
+        self._gauges = []      # (name, callback returning [(labels, value)])
+        self._local = threading.local()
+        self._shards = []      # (thread, shard)
+        self._retired = {'counters': {}, 'histograms': {}}
+        self._registry_lock = threading.Lock()  # only taken when a thread registers or on scrape
+        self._new_shards = 0
+        self._last_success = {}  # job -> unix time
+
+    def init_app(self, app, db):
+        self._gauges = []  # the callbacks close over this app
+        self.describe('http_requests_total', 'counter', 'Requests by endpoint, method and status')
+        self.describe('http_request_exceptions_total', 'counter', 'Unhandled exceptions by endpoint')
+        self.describe('http_request_duration_seconds', 'histogram', 'Request latency by endpoint')
+        self.describe('http_request_db_seconds', 'histogram', 'Database time per request by endpoint')
+        self.describe('http_request_queries_total', 'counter', 'SQL statements issued by requests, by endpoint')
+        self.describe('job_duration_seconds', 'histogram', 'Background job and sweep durations')
+        self.describe('job_runs_total', 'counter', 'Background job runs by outcome')
+        self.gauge('db_pool_checked_out', 'Connections in use per engine', lambda: self._pool_stats(app, db, 'checkedout'))
+        self.gauge('db_pool_size', 'Configured pool size per engine', lambda: self._pool_stats(app, db, 'size'))
+        self.gauge('db_pool_overflow', 'Connections beyond the pool size per engine', lambda: self._pool_stats(app, db, 'overflow'))
+        self.gauge('fragment_cache_hits_total', 'Rendered-page cache hits', lambda: self._cache_stat(app, 'hits'), 'counter')
+        self.gauge('fragment_cache_misses_total', 'Rendered-page cache misses', lambda: self._cache_stat(app, 'misses'), 'counter')
+        self.gauge('fragment_cache_hit_ratio', 'Rendered-page cache hit ratio since start', lambda: self._cache_stat(app, 'ratio'))
+        self.gauge('job_last_success_timestamp_seconds', 'When each job last succeeded',
+                   lambda: [((('job', job),), at) for job, at in sorted(self._last_success.items())])
+
+        app.extensions['metrics'] = self
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        got_request_exception.connect(self._record_exception, app, weak=False)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # Recording
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def gauge(self, name, help_text, callback, kind='gauge'):
+        """Sampled at scrape time; ``callback()`` returns ``[(labels, value)]``"""
+        self.describe(name, kind, help_text)
+        self._gauges.append((name, callback))
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard()['counters']
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        histograms = self._shard()['histograms']
+        key = (name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            # One slot per bucket, then +Inf, then the running sum
+            counts = histograms[key] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def timed_job(self, job):
+        """Record duration, outcome and last success of a background job or sweep"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = 'error'
+                try:
+                    result = fn(*args, **kwargs)
+                    outcome = 'success'
+                    self._last_success[job] = time.time()
+                    return result
+                finally:
+                    labels = (('job', job),)
+                    self.observe('job_duration_seconds', time.perf_counter() - started, labels)
+                    self.inc('job_runs_total', labels + (('outcome', outcome),))
+            return wrapper
+        return decorator
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {'counters': {}, 'histograms': {}}
+            with self._registry_lock:
+                self._shards.append((threading.current_thread(), shard))
+                self._new_shards += 1
+                if self._new_shards >= COMPACT_EVERY:
+                    self._compact()
+        return shard
+
+    def _compact(self):
+        """Fold the shards of exited threads into the retired shard; call with the registry lock held"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge(self._retired, shard)
+        self._shards = alive
+        self._new_shards = 0
+
+    # Requests
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        labels = (('endpoint', endpoint),)
+        self.observe('http_request_duration_seconds', time.perf_counter() - started, labels)
+        self.inc('http_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+        stats = g.get('query_stats')  # filled in by query_stats.QueryStats
+        if stats is not None and endpoint != 'static':
+            self.observe('http_request_db_seconds', stats['db_ms'] / 1000, labels)
+            self.inc('http_request_queries_total', labels, stats['queries'])
+        return response
+
+    def _record_exception(self, sender, exception, **extra):
+        self.inc('http_request_exceptions_total', (
+            ('endpoint', request.endpoint or 'unmatched'), ('exception', type(exception).__name__)
+        ))
+
+    # Gauges
+
+    @staticmethod
+    def _pool_stats(app, db, attr):
+        with app.app_context():
+            engines = dict(db.engines)
+        if app.extensions.get('database_replica') is not None:
+            engines['replica'] = app.extensions['database_replica']
+        samples = []
+        for key, engine in engines.items():
+            method = getattr(engine.pool, attr, None)
+            if method is not None:
+                samples.append(((('engine', key or 'default'),), method()))
+        return samples
+
+    @staticmethod
+    def _cache_stat(app, stat):
+        cache = app.extensions.get('fragment_cache')
+        if cache is None:
+            return []
+        if stat == 'ratio':
+            total = cache.hits + cache.misses
+            return [((), cache.hits / total if total else 0.0)]
+        return [((), getattr(cache, stat))]
+
+    # Exposition
+
+    def collect(self):
+        """Sum every shard into ``{'counters': {...}, 'histograms': {...}}``"""
+        total = {'counters': {}, 'histograms': {}}
+        with self._registry_lock:
+            self._compact()
+            _merge(total, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _merge(total, shard)
+        return total
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        data = self.collect()
+        families = {}
+        for (name, labels), value in sorted(data['counters'].items()):
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), counts in sorted(data['histograms'].items()):
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(counts[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        for name, callback in self._gauges:
+            lines = families.setdefault(name, [])
+            for labels, value in callback():
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        out = []
+        for name in sorted(families):
+            kind, help_text = self._meta.get(name, ('untyped', name))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(families[name])
+        return '\n'.join(out) + '\n'
+
+    def view(self):
+        # Optional shared secret for scrapers: Authorization: Bearer <METRICS_TOKEN>
+        token = current_app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            abort(403)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _merge(into, shard):
+    counters = into['counters']
+    for key, value in list(shard['counters'].items()):
+        counters[key] = counters.get(key, 0) + value
+    histograms = into['histograms']
+    for key, counts in list(shard['histograms'].items()):
+        target = histograms.get(key)
+        if target is None:
+            histograms[key] = list(counts)
+        else:
+            for i, count in enumerate(counts):
+                target[i] += count
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
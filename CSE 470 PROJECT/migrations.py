@@ -0,0 +1,336 @@
+# Versioned schema migrations with online-friendly steps
+
+import time
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, exc, func, inspect, literal, select, text
+
+# (version, name, function), in version order; see @migration
+MIGRATIONS = []
+
+_meta = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _meta,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+# Last id processed by each batched backfill, so an interrupted run resumes
+migration_progress = Table(
+    'schema_migration_progress', _meta,
+    Column('version', Integer, primary_key=True),
+    Column('step', String(100), primary_key=True),
+    Column('last_id', Integer, nullable=False),
+)
+
+
+def migration(version, name):
+    """Register a migration function ``fn(migrator)``. Steps must be safe to re-run."""
+    def decorator(fn):
+        if any(v == version for v, _, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+class Migrator:
+    """Applies pending migrations to one engine.
+
+    Every step checks the live schema first, so re-running a migration
+    that failed halfway is safe. Indexes are built with CONCURRENTLY on
+    PostgreSQL; backfills run in small id-ordered batches, each in its
+    own short transaction, so the site keeps serving writes meanwhile.
+    With ``dry_run`` nothing is written and the statements are printed.
+    """
+
+    def __init__(self, engine, metadata, dry_run=False, batch_size=1000, pause=0.05, log=print):
+        self.engine = engine
+        self.metadata = metadata
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.pause = pause
+        self.log = log
+        self.version = None
+        self.dialect = engine.dialect
+        self.quote = engine.dialect.identifier_preparer.quote
+
+    # Bookkeeping
+
+    def applied(self):
+        """Map of applied version -> applied_at"""
+        if not inspect(self.engine).has_table('schema_migrations'):
+            return {}
+        with self.engine.connect() as conn:
+            return dict(conn.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all())
+
+    def pending(self, target=None):
+        applied = self.applied()
+        return [
+            (version, name, fn) for version, name, fn in MIGRATIONS
+            if version not in applied and (target is None or version <= target)
+        ]
+
+    def run(self, target=None):
+        """Apply pending migrations up to ``target``; returns the versions applied"""
+        if not self.dry_run:
+            _meta.create_all(self.engine)
+        done = []
+        for version, name, fn in self.pending(target):
+            self.version = version
+            self.log(f"{'[dry run] ' if self.dry_run else ''}Migration {version:04d} {name}")
+            started = time.perf_counter()
+            fn(self)
+            if not self.dry_run:
+                with self.engine.begin() as conn:
+                    conn.execute(migration_progress.delete().where(migration_progress.c.version == version))
+                    conn.execute(schema_migrations.insert().values(
+                        version=version, name=name, applied_at=datetime.utcnow()
+                    ))
+            self.log(f"✓ {version:04d} done in {time.perf_counter() - started:.1f}s")
+            done.append(version)
+        self.version = None
+        return done
+
+    # Schema inspection
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        if not self.has_table(table):
+            return self.dry_run  # in a dry run, a table an earlier step would create with all its columns
+        return column in {c['name'] for c in inspect(self.engine).get_columns(table)}
+
+    def has_index(self, table, name):
+        if not self.has_table(table):
+            return False  # in a dry run, a table an earlier step would create; the index is planned with it
+        return name in {ix['name'] for ix in inspect(self.engine).get_indexes(table)}
+
+    # Steps
+
+    def execute(self, sql, params=None):
+        """Run one statement in its own transaction"""
+        if self.dry_run:
+            self.log(f"  {sql}")
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text(sql), params or {})
+
+    def create_tables(self):
+        """Create model tables that do not exist yet (with their indexes)"""
+        missing = [t for t in self.metadata.sorted_tables if not self.has_table(t.name)]
+        for table in missing:
+            self.log(f"  create table {table.name}")
+        if missing and not self.dry_run:
+            self.metadata.create_all(self.engine, tables=missing)
+
+    def add_column(self, table, column):
+        """Add ``table.column`` as declared on the model, with its scalar default"""
+        if self.has_column(table, column):
+            return
+        col = self.metadata.tables[table].c[column]
+        ddl = f"ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(column)} {col.type.compile(self.dialect)}"
+        if col.default is not None and col.default.is_scalar:
+            value = literal(col.default.arg, col.type).compile(
+                dialect=self.dialect, compile_kwargs={'literal_binds': True}
+            )
+            ddl += f" DEFAULT {value}"
+        self.execute(ddl)
+
+    def widen_column(self, table, column):
+        """Grow a string column to the length declared on the model (SQLite does not enforce lengths)"""
+        declared = self.metadata.tables[table].c[column].type
+        if self.dialect.name == 'sqlite' or not self.has_table(table):
+            return
+        live = next(c['type'] for c in inspect(self.engine).get_columns(table) if c['name'] == column)
+        if live.length is None or live.length >= declared.length:
+            return
+        type_sql = declared.compile(self.dialect)
+        if self.dialect.name == 'mysql':
+            null = '' if self.metadata.tables[table].c[column].nullable else ' NOT NULL'
+            self.execute(f"ALTER TABLE {self.quote(table)} MODIFY {self.quote(column)} {type_sql}{null}")
+        else:
+            # Only raises the limit on PostgreSQL, so no table rewrite
+            self.execute(f"ALTER TABLE {self.quote(table)} ALTER COLUMN {self.quote(column)} TYPE {type_sql}")
+
+    def create_index(self, name):
+        """Create an index declared on the models, without blocking writes where the database allows"""
+        index = next(ix for t in self.metadata.tables.values() for ix in t.indexes if ix.name == name)
+        table = index.table.name
+        if self.has_index(table, name):
+            return
+        columns = ', '.join(self.quote(c.name) for c in index.columns)
+        unique = 'UNIQUE ' if index.unique else ''
+        if self.dialect.name == 'postgresql':
+            # CONCURRENTLY cannot run inside a transaction block
+            sql = f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({columns})"
+            if self.dry_run:
+                self.log(f"  {sql}")
+                return
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(sql))
+        else:
+            self.execute(f"CREATE {unique}INDEX IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({columns})")
+
+    def backfill(self, step, table, where, set_sql=None, columns=None, compute=None):
+        """Update the rows of ``table`` matching ``where`` in batches of ``batch_size``.
+
+        Either ``set_sql`` (a SET clause run on each id range) or
+        ``columns`` plus ``compute(row) -> dict`` for values computed in
+        Python. Progress is checkpointed per batch under ``step``.
+        """
+        table_obj = self.metadata.tables[table]
+        condition = text(f"({where})")
+        last_id = self._checkpoint(step)
+        try:
+            with self.engine.connect() as conn:
+                remaining = conn.execute(
+                    select(func.count()).select_from(table_obj).where(table_obj.c.id > last_id, condition)
+                ).scalar()
+        except exc.DBAPIError:
+            if not self.dry_run:
+                raise
+            remaining = 'all'  # column added by an earlier step of this dry run
+        if self.dry_run:
+            self.log(f"  backfill {table}: {remaining} rows in batches of {self.batch_size} ({set_sql or 'computed'})")
+            return
+        if last_id:
+            self.log(f"  resuming {step} after id {last_id}")
+
+        processed = 0
+        while True:
+            with self.engine.begin() as conn:
+                rows = conn.execute(
+                    select(table_obj.c.id, *(table_obj.c[name] for name in columns or ()))
+                    .where(table_obj.c.id > last_id, condition)
+                    .order_by(table_obj.c.id).limit(self.batch_size)
+                ).all()
+                if not rows:
+                    break
+                if set_sql is not None:
+                    conn.execute(
+                        text(f"UPDATE {self.quote(table)} SET {set_sql} WHERE id > :lo AND id <= :hi AND ({where})"),
+                        {'lo': last_id, 'hi': rows[-1].id}
+                    )
+                else:
+                    for row in rows:
+                        conn.execute(table_obj.update().where(table_obj.c.id == row.id).values(**compute(row)))
+                last_id = rows[-1].id
+                self._save_checkpoint(conn, step, last_id)
+            processed += len(rows)
+            self.log(f"  {step}: {processed}/{remaining} rows")
+            time.sleep(self.pause)  # let queued writers take the lock between batches
+
+    def _checkpoint(self, step):
+        if not self.has_table('schema_migration_progress'):
+            return 0
+        with self.engine.connect() as conn:
+            last_id = conn.execute(
+                select(migration_progress.c.last_id)
+                .where(migration_progress.c.version == self.version, migration_progress.c.step == step)
+            ).scalar()
+        return last_id or 0
+
+    def _save_checkpoint(self, conn, step, last_id):
+        key = (migration_progress.c.version == self.version) & (migration_progress.c.step == step)
+        if conn.execute(migration_progress.update().where(key).values(last_id=last_id)).rowcount == 0:
+            conn.execute(migration_progress.insert().values(version=self.version, step=step, last_id=last_id))
+
+
+# Migrations
+
+@migration(1, 'create missing tables')
+def create_missing_tables(m):
+    m.create_tables()
+
+
+@migration(2, 'ban and overdue tracking fields')
+def ban_and_overdue_fields(m):
+    for column in ('is_banned', 'banned_at', 'banned_by', 'ban_reason', 'ban_duration_days'):
+        m.add_column('user', column)
+    for column in ('is_overdue', 'overdue_notification_sent'):
+        m.add_column('game_lending', column)
+    m.add_column('notification', 'notification_type')
+
+
+@migration(3, 'non-NULL setup vote counters')
+def setup_vote_counters(m):
+    # Keyset pagination of the setups gallery compares these columns
+    for column in ('likes', 'dislikes', 'cleanest_votes', 'rgb_votes', 'budget_votes'):
+        m.backfill(f'setup_post.{column}', 'setup_post', f"{column} IS NULL", set_sql=f"{column} = 0")
+
+
+@migration(4, 'setup hot score')
+def setup_hot_score(m):
+    from models import SetupPost
+
+    m.add_column('setup_post', 'hot_score')
+
+    def compute(row):
+        setup = SetupPost(
+            likes=row.likes, dislikes=row.dislikes, cleanest_votes=row.cleanest_votes,
+            rgb_votes=row.rgb_votes, budget_votes=row.budget_votes, created_at=row.created_at
+        )
+        return {'hot_score': setup.update_hot_score()}
+
+    m.backfill(
+        'setup_post.hot_score', 'setup_post', "hot_score IS NULL OR hot_score = 0",
+        columns=('likes', 'dislikes', 'cleanest_votes', 'rgb_votes', 'budget_votes', 'created_at'),
+        compute=compute
+    )
+
+
+# The indexes declared on the models when migration 5 was written; later indexes come with their own migration
+FOREIGN_KEY_AND_FILTER_INDEXES = (
+    'ix_admin_notification_created_at', 'ix_admin_notification_related_user_id',
+    'ix_cart_game_id', 'ix_cart_user_id_game_id',
+    'ix_game_genre', 'ix_game_is_available_created_at',
+    'ix_game_lending_borrower_id_is_returned', 'ix_game_lending_game_id',
+    'ix_game_lending_is_returned_return_date', 'ix_game_lending_lender_id',
+    'ix_notification_user_id_created_at', 'ix_notification_user_id_is_read',
+    'ix_notify_request_game_id', 'ix_notify_request_user_id_game_id',
+    'ix_purchase_game_id', 'ix_purchase_user_id_game_id',
+    'ix_review_comment_review_id', 'ix_review_comment_user_id',
+    'ix_review_game_id', 'ix_review_user_id_game_id',
+    'ix_review_vote_review_id', 'ix_review_vote_user_id_review_id',
+    'ix_setup_post_budget_votes_id', 'ix_setup_post_cleanest_votes_id', 'ix_setup_post_created_at_id',
+    'ix_setup_post_hot_score_id', 'ix_setup_post_is_featured', 'ix_setup_post_likes_id',
+    'ix_setup_post_rgb_votes_id', 'ix_setup_post_user_id',
+    'ix_setup_vote_setup_id', 'ix_setup_vote_user_id_setup_id',
+    'ix_user_banned_by', 'ix_user_is_admin_popularity_points', 'ix_user_is_banned',
+    'ix_voucher_user_id_is_used',
+)
+
+
+@migration(5, 'foreign key, filter and gallery sort indexes')
+def declared_indexes(m):
+    for name in FOREIGN_KEY_AND_FILTER_INDEXES:
+        m.create_index(name)
+
+
+@migration(6, 'library index')
+def library_index(m):
+    m.create_index('ix_purchase_user_id_purchase_date')
+
+
+@migration(7, 'voucher ledger')
+def voucher_ledger(m):
+    m.create_tables()
+
+
+@migration(8, 'review comment counts')
+def review_comment_counts(m):
+    m.add_column('review', 'comment_count')
+    m.backfill(
+        'review.comment_count', 'review', "id IN (SELECT review_id FROM review_comment)",
+        set_sql="comment_count = (SELECT COUNT(*) FROM review_comment WHERE review_comment.review_id = review.id)"
+    )
+    m.create_index('ix_review_comment_review_id_id')
+
+
+@migration(9, 'wider password hashes')
+def wider_password_hashes(m):
+    # scrypt hashes are longer than the old VARCHAR(120); PostgreSQL enforces the limit
+    m.widen_column('user', 'password_hash')
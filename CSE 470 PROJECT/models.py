@@ -0,0 +1,316 @@
+# Database models
+
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from extensions import db, fragment_cache, notification_hub
+
+# Hot ranking for setups: badge votes count double a like, and a post that is
+# 12.5 hours newer needs 10x fewer points to rank equally
+HOT_SCORE_EPOCH = datetime(2024, 1, 1)
+HOT_SCORE_DECAY_SECONDS = 45000
+HOT_SCORE_BADGE_WEIGHT = 2
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
+    is_admin = db.Column(db.Boolean, default=False)
+    popularity_points = db.Column(db.Integer, default=0)
+    profile_picture = db.Column(db.String(200), default='default.jpg')
+    bio = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    is_banned = db.Column(db.Boolean, default=False, index=True)
+    banned_at = db.Column(db.DateTime)
+    banned_by = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    ban_reason = db.Column(db.Text)
+    ban_duration_days = db.Column(db.Integer)  # NULL for permanent, number for temporary
+
+    # Leaderboard: non-admins ordered by points
+    __table_args__ = (
+        db.Index('ix_user_is_admin_popularity_points', 'is_admin', 'popularity_points'),
+    )
+    
+    def is_authenticated(self):
+        return True
+    
+    def is_active(self):
+        return not self.ban_in_effect()
+
+    @property
+    def ban_expires_at(self):
+        """When a temporary ban ends; None for permanent bans and users who are not banned"""
+        if self.is_banned and self.ban_duration_days and self.banned_at:
+            return self.banned_at + timedelta(days=self.ban_duration_days)
+        return None
+
+    def ban_in_effect(self, now=None):
+        """Whether the ban applies now. Read-only: an expired temporary ban stops applying at once,
+        and services.check_expired_bans clears the stored fields later, in a batch."""
+        if not self.is_banned:
+            return False
+        expires_at = self.ban_expires_at
+        return expires_at is None or (now or datetime.utcnow()) <= expires_at
+    
+    def is_anonymous(self):
+        return False
+    
+    def get_id(self):
+        return str(self.id)
+
+class Game(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    price = db.Column(db.Float, nullable=False)
+    genre = db.Column(db.String(100))
+    platform = db.Column(db.String(100))
+    release_date = db.Column(db.Date)
+    image_url = db.Column(db.String(200))
+    voice_preview_url = db.Column(db.String(200))
+    is_available = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Catalog listing (newest first) and recommendations by genre
+    __table_args__ = (
+        db.Index('ix_game_is_available_created_at', 'is_available', 'created_at'),
+        db.Index('ix_game_genre', 'genre'),
+    )
+
+class Review(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
+    content = db.Column(db.Text, nullable=False)
+    likes = db.Column(db.Integer, default=0)
+    dislikes = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0)  # kept by comment_review/delete_comment; comments load on demand
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref='reviews')
+    game = db.relationship('Game', backref='reviews')
+
+    # A user's reviews, and "has this user reviewed this game"
+    __table_args__ = (
+        db.Index('ix_review_user_id_game_id', 'user_id', 'game_id'),
+    )
+
+class ReviewVote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    review_id = db.Column(db.Integer, db.ForeignKey('review.id'), nullable=False, index=True)
+    vote_type = db.Column(db.String(10), nullable=False)  # 'like' or 'dislike'
+
+    __table_args__ = (
+        db.Index('ix_review_vote_user_id_review_id', 'user_id', 'review_id'),
+    )
+
+class ReviewComment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    review_id = db.Column(db.Integer, db.ForeignKey('review.id'), nullable=False, index=True)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref='comments')
+    review = db.relationship('Review', backref='comments')
+
+    # A review's comment thread, oldest first, a page at a time
+    __table_args__ = (
+        db.Index('ix_review_comment_review_id_id', 'review_id', 'id'),
+    )
+
+class Cart(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, default=1)
+    
+    user = db.relationship('User', backref='cart_items')
+    game = db.relationship('Game', backref='cart_items')
+
+    # Leading user_id also serves "the user's cart" lookups
+    __table_args__ = (
+        db.Index('ix_cart_user_id_game_id', 'user_id', 'game_id'),
+    )
+
+class Purchase(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    price_paid = db.Column(db.Float, nullable=False)
+    purchase_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref='purchases')
+    game = db.relationship('Game', backref='purchases')
+
+    # Ownership checks, and the user's library newest purchase first
+    __table_args__ = (
+        db.Index('ix_purchase_user_id_game_id', 'user_id', 'game_id'),
+        db.Index('ix_purchase_user_id_purchase_date', 'user_id', 'purchase_date'),
+    )
+
+class GameLending(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    lender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    borrower_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    lend_date = db.Column(db.DateTime, default=datetime.utcnow)
+    return_date = db.Column(db.DateTime)
+    is_returned = db.Column(db.Boolean, default=False)
+    is_overdue = db.Column(db.Boolean, default=False)
+    overdue_notification_sent = db.Column(db.Boolean, default=False)
+    
+    lender = db.relationship('User', foreign_keys=[lender_id], backref='lent_games')
+    borrower = db.relationship('User', foreign_keys=[borrower_id], backref='borrowed_games')
+    game = db.relationship('Game', backref='lending_records')
+
+    # Active loans of a borrower, and the overdue sweep over unreturned loans
+    __table_args__ = (
+        db.Index('ix_game_lending_borrower_id_is_returned', 'borrower_id', 'is_returned'),
+        db.Index('ix_game_lending_is_returned_return_date', 'is_returned', 'return_date'),
+    )
+
+class SetupPost(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    image_url = db.Column(db.String(200), nullable=False)
+    likes = db.Column(db.Integer, default=0)
+    dislikes = db.Column(db.Integer, default=0)
+    cleanest_votes = db.Column(db.Integer, default=0)
+    rgb_votes = db.Column(db.Integer, default=0)
+    budget_votes = db.Column(db.Integer, default=0)
+    is_featured = db.Column(db.Boolean, default=False, index=True)
+    hot_score = db.Column(db.Float, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref='setup_posts')
+
+    # One index per gallery sort mode; id breaks ties for keyset pagination
+    __table_args__ = (
+        db.Index('ix_setup_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_setup_post_likes_id', 'likes', 'id'),
+        db.Index('ix_setup_post_cleanest_votes_id', 'cleanest_votes', 'id'),
+        db.Index('ix_setup_post_rgb_votes_id', 'rgb_votes', 'id'),
+        db.Index('ix_setup_post_budget_votes_id', 'budget_votes', 'id'),
+        db.Index('ix_setup_post_hot_score_id', 'hot_score', 'id'),
+    )
+
+    def update_hot_score(self):
+        """Recompute hot_score from the vote counters and post age.
+
+        Votes count logarithmically and every HOT_SCORE_DECAY_SECONDS of
+        age is worth one order of magnitude of votes, so newer posts
+        overtake older ones without the score needing periodic decay.
+        """
+        points = (
+            (self.likes or 0) - (self.dislikes or 0)
+            + HOT_SCORE_BADGE_WEIGHT * ((self.cleanest_votes or 0) + (self.rgb_votes or 0) + (self.budget_votes or 0))
+        )
+        order = math.log10(max(abs(points), 1))
+        sign = 1 if points > 0 else -1 if points < 0 else 0
+        age_seconds = ((self.created_at or datetime.utcnow()) - HOT_SCORE_EPOCH).total_seconds()
+        self.hot_score = round(sign * order + age_seconds / HOT_SCORE_DECAY_SECONDS, 7)
+        return self.hot_score
+
+class SetupVote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    setup_id = db.Column(db.Integer, db.ForeignKey('setup_post.id'), nullable=False, index=True)
+    vote_type = db.Column(db.String(20), nullable=False)  # 'like', 'dislike', 'cleanest', 'rgb', 'budget'
+
+    __table_args__ = (
+        db.Index('ix_setup_vote_user_id_setup_id', 'user_id', 'setup_id'),
+    )
+
+class Notification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    notification_type = db.Column(db.String(50), default='general')  # 'overdue', 'admin', 'general'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref='notifications')
+
+    # Unread counts, and the user's notifications newest first
+    __table_args__ = (
+        db.Index('ix_notification_user_id_is_read', 'user_id', 'is_read'),
+        db.Index('ix_notification_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+class AdminNotification(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    notification_type = db.Column(db.String(50), default='general')  # 'overdue_user', 'system'
+    related_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    related_user = db.relationship('User', backref='admin_notifications')
+
+class NotifyRequest(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_notify_request_user_id_game_id', 'user_id', 'game_id'),
+    )
+
+class Voucher(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    discount_amount = db.Column(db.Float, nullable=False)  # Amount in dollars
+    is_used = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    used_at = db.Column(db.DateTime)
+    
+    user = db.relationship('User', backref='vouchers')
+
+    # A user's unused vouchers at checkout
+    __table_args__ = (
+        db.Index('ix_voucher_user_id_is_used', 'user_id', 'is_used'),
+    )
+
+class VoucherLedgerEntry(db.Model):
+    """One voucher event: points spent on a redemption, or a voucher applied at checkout. Never changed."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    voucher_id = db.Column(db.Integer, db.ForeignKey('voucher.id'), nullable=False, index=True)
+    event = db.Column(db.String(20), nullable=False)  # 'redeemed' or 'used'
+    points = db.Column(db.Integer, nullable=False, default=0)  # change to popularity_points
+    amount = db.Column(db.Float, nullable=False)
+    balance = db.Column(db.Integer)  # popularity_points right after a redemption
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # A user's voucher history, newest first
+    __table_args__ = (
+        db.Index('ix_voucher_ledger_entry_user_id_created_at', 'user_id', 'created_at'),
+    )
+
+@event.listens_for(VoucherLedgerEntry, 'before_update')
+@event.listens_for(VoucherLedgerEntry, 'before_delete')
+def _ledger_is_append_only(mapper, connection, target):
+    raise ValueError("Voucher ledger entries cannot be changed or deleted")
+
+# Anonymous page cache and ETag invalidation: any commit touching these models bumps their versions
+fragment_cache.track(Game)
+fragment_cache.track(Review, parents={'Game': 'game_id'})
+fragment_cache.track(ReviewComment)
+fragment_cache.track(SetupPost)
+fragment_cache.track(User)
+fragment_cache.track(Purchase, parents={'User': 'user_id'})
+fragment_cache.track(NotifyRequest, parents={'User': 'user_id'})
+
+# New notifications are pushed to the user's open pages (see notification_hub.py)
+notification_hub.track(Notification)
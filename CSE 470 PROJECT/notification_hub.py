@@ -0,0 +1,201 @@
+# Push channel for new notifications: in-process pub/sub, fanned out to other processes over Unix sockets
+
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from sqlalchemy import event, func, select
+
+logger = logging.getLogger(__name__)
+
+MAX_DATAGRAM = 60 * 1024  # under the default Unix datagram limit on Linux and macOS
+REPLAY_LIMIT = 100        # missed notifications sent on reconnect, oldest first
+
+
+class NotificationHub:
+    """Hands every committed notification to the open streams of its user.
+
+    Like the fragment cache it watches sessions rather than the code that
+    creates notifications: rows of the tracked model added in a session
+    are published after its commit, whether they come from ban_user,
+    check_overdue_games, a vote or an admin broadcast. Subscribers are
+    callbacks per user id, called on the committing thread (the SSE
+    stream in asgi.py passes them on to its event loop).
+
+    With NOTIFICATION_FANOUT_DIR set, events are also sent as datagrams
+    to the Unix sockets in that directory, one per process that called
+    ``listen()``, so a stream held by one worker hears about
+    notifications committed by another worker or by a script.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.fanout_dir = None
+        self._subscribers = {}  # user id -> set of callbacks
+        self._lock = threading.Lock()
+        self._sender = None
+        self._path = None       # our own socket, once listening
+
+    def init_app(self, app, db):
+        self.fanout_dir = app.config.get('NOTIFICATION_FANOUT_DIR') or None
+        if self.fanout_dir and not hasattr(socket, 'AF_UNIX'):
+            logger.warning("NOTIFICATION_FANOUT_DIR needs Unix sockets; notifications stay in this process")
+            self.fanout_dir = None
+        app.extensions['notification_hub'] = self
+        self.watch(db.session)
+
+    def track(self, model):
+        """Publish new rows of ``model`` (needs ``id``, ``user_id``, ``title``, ``message``)"""
+        self.model = model
+
+    def watch(self, session):
+        """Publish notifications committed through ``session`` (a session, scoped session or Session subclass)"""
+        event.listen(session, 'after_flush', self._collect)
+        event.listen(session, 'after_commit', self._publish_committed)
+        event.listen(session, 'after_rollback', self._discard)
+
+    # Subscribers
+
+    def subscribe(self, user_id, callback):
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(callback)
+
+    def unsubscribe(self, user_id, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(user_id)
+            if callbacks is not None:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(callbacks) for callbacks in self._subscribers.values())
+
+    # Publishing
+
+    def _collect(self, session, flush_context):
+        for instance in session.new:
+            if type(instance) is self.model:
+                session.info.setdefault('notification_events', []).append(self.to_event(instance))
+
+    def _publish_committed(self, session):
+        events = session.info.pop('notification_events', None)
+        if events:
+            self.publish(events)
+
+    def _discard(self, session):
+        session.info.pop('notification_events', None)
+
+    def publish(self, events, fan_out=True):
+        with self._lock:
+            deliveries = [(callback, item) for item in events
+                          for callback in list(self._subscribers.get(item['user_id'], ()))]
+        for callback, item in deliveries:
+            try:
+                callback(item)
+            except Exception:
+                logger.exception("Notification subscriber failed")
+        if fan_out and self.fanout_dir:
+            self._send(events)
+
+    def _send(self, events):
+        try:
+            peers = [entry.path for entry in os.scandir(self.fanout_dir)
+                     if entry.name.endswith('.sock') and entry.path != self._path]
+        except FileNotFoundError:
+            return  # nobody has listened yet
+        if not peers:
+            return
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.setblocking(False)  # a full peer drops events instead of stalling the commit
+        for datagram in _datagrams(events):
+            for peer in peers:
+                try:
+                    self._sender.sendto(datagram, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    _unlink(peer)  # left behind by a process that died
+                except OSError as exc:
+                    logger.warning("Dropped notifications for %s: %s", peer, exc)
+
+    # Receiving from other processes
+
+    def listen(self):
+        """Receive the notifications other processes publish (call once per process that serves streams)"""
+        if not self.fanout_dir or self._path is not None:
+            return
+        os.makedirs(self.fanout_dir, exist_ok=True)
+        self._path = os.path.join(self.fanout_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(self._path)
+        threading.Thread(target=self._receive, args=(receiver,), name='notification-hub', daemon=True).start()
+
+    def close(self):
+        if self._path is not None:
+            _unlink(self._path)
+            self._path = None
+
+    def _receive(self, receiver):
+        while True:
+            datagram = receiver.recv(65536)
+            try:
+                events = json.loads(datagram)
+            except ValueError:
+                continue
+            self.publish(events, fan_out=False)
+
+    # Events
+
+    @staticmethod
+    def to_event(notification):
+        return {
+            'id': notification.id,
+            'user_id': notification.user_id,
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.notification_type or 'general',
+            'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        }
+
+    def replay(self, session, user_id, after_id):
+        """``(events, cursor)``: the user's notifications after ``after_id``, or none and the newest id
+        when the client has no cursor yet"""
+        model = self.model
+        if after_id is None:
+            newest = session.execute(select(func.max(model.id)).where(model.user_id == user_id)).scalar()
+            return [], newest or 0
+        rows = session.execute(
+            select(model).where(model.user_id == user_id, model.id > after_id).order_by(model.id).limit(REPLAY_LIMIT)
+        ).scalars().all()
+        events = [self.to_event(row) for row in rows]
+        return events, events[-1]['id'] if events else after_id
+
+
+def format_event(item):
+    """One server-sent event; the id lets a reconnecting browser resume with Last-Event-ID"""
+    return f"id: {item['id']}\nevent: notification\ndata: {json.dumps(item)}\n\n"
+
+
+def _datagrams(events):
+    """JSON-encoded batches of events, each small enough for one datagram"""
+    batch, size = [], 2
+    for item in events:
+        encoded = json.dumps(item)
+        if batch and size + len(encoded) + 1 > MAX_DATAGRAM:
+            yield ('[' + ','.join(batch) + ']').encode()
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield ('[' + ','.join(batch) + ']').encode()
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
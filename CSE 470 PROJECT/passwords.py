@@ -0,0 +1,150 @@
+# Password hashing off the request thread: configurable parameters, bounded pools and rehash-on-login
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'  # Werkzeug's default; every existing hash uses it
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing backlog is full; the caller should ask the client to retry"""
+
+
+class _Lane:
+    """A thread pool that holds at most ``workers + backlog`` jobs; ``submit`` returns None when full"""
+
+    def __init__(self, name, workers, backlog, initializer):
+        self.name = name
+        self.workers = workers
+        self.initializer = initializer
+        self.slots = threading.BoundedSemaphore(workers + backlog) if workers else None
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        if self.slots is None or not self.slots.acquire(blocking=False):
+            return None
+        try:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                                       thread_name_prefix=f'password-hash-{self.name}')
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on small thread pools.
+
+    hashlib's scrypt and PBKDF2 release the GIL, so the pool threads hash
+    in parallel while the rest of the worker keeps serving. Jobs go to a
+    shared pool of PASSWORD_HASH_WORKERS threads that queues at most
+    PASSWORD_HASH_BACKLOG more; past that ``HasherBusy`` is raised at
+    once, so a burst of logins costs a bounded amount of CPU instead of
+    tying up every request thread (keep the total below the server's
+    threads per process). ``priority`` jobs (clients with no recent
+    failures) go to a lane of their own, PASSWORD_HASH_PRIORITY_WORKERS
+    threads queueing up to PASSWORD_HASH_PRIORITY_BACKLOG more, and only
+    spill over to the shared pool when that is full, so an attack that
+    fills the shared pool does not turn real users away. On Linux the
+    shared pool's threads run at PASSWORD_HASH_NICE, so the scheduler
+    serves the request threads first when hashing saturates the CPU.
+
+    Settings left unset (None) are sized from the CPU count for a single
+    process: a hashing thread per core, half as many priority threads,
+    and a backlog of twice the threads in each lane. gunicorn.conf.py
+    sets smaller values, since every worker process has pools of its own.
+
+    PASSWORD_HASH_METHOD is any Werkzeug method string. Hashes made with
+    other parameters still verify and are replaced on the next successful
+    login (``verify`` returns the new hash).
+    """
+
+    def __init__(self):
+        cpus = os.cpu_count() or 1
+        self.method = DEFAULT_METHOD
+        self.workers = cpus
+        self.backlog = 2 * self.workers
+        self.priority_workers = max(1, cpus // 2)
+        self.priority_backlog = 2 * self.priority_workers
+        self.nice = 10
+        self.timeout = 10
+        self._prefix = None
+        self._dummy = None
+        self._shared = None
+        self._priority = None
+
+    def init_app(self, app):
+        def setting(key, default):
+            value = app.config.get(key)
+            return default if value is None else value
+
+        self.method = app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+        self.workers = setting('PASSWORD_HASH_WORKERS', self.workers)
+        self.backlog = setting('PASSWORD_HASH_BACKLOG', 2 * self.workers)
+        self.priority_workers = setting('PASSWORD_HASH_PRIORITY_WORKERS', self.priority_workers)
+        self.priority_backlog = setting('PASSWORD_HASH_PRIORITY_BACKLOG', 2 * self.priority_workers)
+        self.nice = setting('PASSWORD_HASH_NICE', self.nice)
+        self._prefix = None
+        self._dummy = None
+        self.after_fork()
+        app.extensions['password_hasher'] = self
+
+    def after_fork(self):
+        # Pool threads are not copied into a forked worker; start new pools there on first use
+        self._shared = _Lane('shared', self.workers, self.backlog, self._lower_priority)
+        # Priority threads keep the normal nice value: they are few, and for clients we trust
+        self._priority = _Lane('priority', self.priority_workers, self.priority_backlog, None)
+
+    def _lower_priority(self):
+        # Linux keeps a nice value per thread (other systems would apply it to the whole process)
+        if self.nice and sys.platform.startswith('linux'):
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+
+    @property
+    def prefix(self):
+        """The method as Werkzeug writes it in the hash (it fills in defaults such as the PBKDF2 rounds)"""
+        if self._prefix is None:
+            self._prefix = self._dummy_hash().split('$', 1)[0]
+        return self._prefix
+
+    def _dummy_hash(self):
+        if self._dummy is None:
+            self._dummy = generate_password_hash('not a password', method=self.method)
+        return self._dummy
+
+    def _run(self, priority, fn, *args):
+        future = (priority and self._priority.submit(fn, *args)) or self._shared.submit(fn, *args)
+        if future is None:
+            raise HasherBusy()
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, password, priority=False):
+        return self._run(priority, generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password, priority=False):
+        """``(ok, new_hash)``; ``new_hash`` is set when the password checked out but ``stored_hash``
+        uses other parameters. Pass ``None`` for an unknown user: a dummy hash is checked so the
+        response takes as long as for a real one."""
+        return self._run(priority, self._verify, stored_hash, password)
+
+    def _verify(self, stored_hash, password):
+        if stored_hash is None:
+            check_password_hash(self._dummy_hash(), password)
+            return False, None
+        if not check_password_hash(stored_hash, password):
+            return False, None
+        if stored_hash.split('$', 1)[0] != self.prefix:
+            return True, generate_password_hash(password, method=self.method)
+        return True, None
@@ -0,0 +1,158 @@
+# Per-request SQL instrumentation: query counts, database time and slow statements
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Counts the SQL statements and database time of every request.
+
+    Listens to ``before/after_cursor_execute`` on the app's engines
+    (primary and replica). Each request keeps its ``QUERY_STATS_TOP``
+    slowest statements together with the application or template line
+    that issued them, so lazy loads such as ``review.user`` inside a loop
+    are easy to spot. Statements slower than ``QUERY_STATS_SLOW_MS`` are
+    logged, in requests and background jobs alike. With debug on (or
+    ``QUERY_STATS_HEADERS``) responses carry ``X-DB-*`` headers, and the
+    last ``QUERY_STATS_WINDOW`` requests are summarised by ``summary()``.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.slow_ms = 100
+        self.top = 3
+        self.root = ''
+        self._requests = deque(maxlen=1000)
+        self._slow = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('QUERY_STATS_ENABLED', True)
+        self.slow_ms = app.config.get('QUERY_STATS_SLOW_MS', 100)
+        self.top = app.config.get('QUERY_STATS_TOP', 3)
+        self._requests = deque(maxlen=app.config.get('QUERY_STATS_WINDOW', 1000))
+        self.root = app.root_path
+        app.extensions['query_stats'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        if app.extensions.get('database_replica') is not None:
+            engines.append(app.extensions['database_replica'])
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    # Statement timing
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_stats_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        ms = (time.perf_counter() - conn.info['query_stats_started'].pop()) * 1000
+        stats = g.get('query_stats') if has_request_context() else None
+        if stats is not None:
+            stats['queries'] += 1
+            stats['db_ms'] += ms
+            slowest = stats['slowest']
+            if len(slowest) < self.top or ms > slowest[-1][0]:
+                # Walking the stack is only worth it for the statements we keep
+                slowest.append((ms, _shorten(statement), self._call_site()))
+                slowest.sort(key=lambda item: item[0], reverse=True)
+                del slowest[self.top:]
+        if self.slow_ms is not None and ms >= self.slow_ms:
+            site = self._call_site()
+            logger.warning("Slow query (%.1f ms) at %s: %s", ms, site, _shorten(statement))
+            with self._lock:
+                self._slow.append({
+                    'at': time.time(), 'ms': round(ms, 1), 'site': site, 'statement': _shorten(statement),
+                    'endpoint': request.endpoint if has_request_context() else None,
+                })
+
+    def _call_site(self):
+        """The innermost frame in the application's own code or templates"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self.root) and filename != __file__ and 'site-packages' not in filename:
+                path = os.path.relpath(filename, self.root)
+                if 'debug_info' in frame.f_globals:
+                    return f"{path}:{_template_line(frame)}"
+                return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        return '?'
+
+    # Requests
+
+    def _start_request(self):
+        g.query_stats = {'queries': 0, 'db_ms': 0.0, 'slowest': [], 'started': time.perf_counter()}
+
+    def _finish_request(self, response):
+        stats = g.get('query_stats')
+        if stats is None or request.endpoint in (None, 'static'):
+            return response
+        total_ms = (time.perf_counter() - stats['started']) * 1000
+        with self._lock:
+            self._requests.append((request.endpoint, stats['queries'], stats['db_ms'], total_ms))
+
+        headers = current_app.config.get('QUERY_STATS_HEADERS')
+        if headers is None:
+            headers = current_app.debug
+        if headers:
+            response.headers['X-DB-Queries'] = str(stats['queries'])
+            response.headers['X-DB-Time'] = f"{stats['db_ms']:.1f}ms"
+            if stats['slowest']:
+                ms, _, site = stats['slowest'][0]
+                response.headers['X-DB-Slowest'] = f"{ms:.1f}ms {site}"
+        return response
+
+    def summary(self):
+        """Per-endpoint query counts and database time over the rolling window, busiest first"""
+        with self._lock:
+            requests = list(self._requests)
+            slow = list(self._slow)
+        by_endpoint = {}
+        for endpoint, queries, db_ms, total_ms in requests:
+            by_endpoint.setdefault(endpoint, []).append((queries, db_ms, total_ms))
+
+        endpoints = []
+        for endpoint, rows in by_endpoint.items():
+            db_times = sorted(db_ms for _, db_ms, _ in rows)
+            endpoints.append({
+                'endpoint': endpoint,
+                'requests': len(rows),
+                'avg_queries': round(sum(queries for queries, _, _ in rows) / len(rows), 1),
+                'max_queries': max(queries for queries, _, _ in rows),
+                'avg_db_ms': round(sum(db_times) / len(rows), 2),
+                'p95_db_ms': round(db_times[min(len(db_times) - 1, int(len(db_times) * 0.95))], 2),
+                'avg_total_ms': round(sum(total_ms for _, _, total_ms in rows) / len(rows), 2),
+                'db_share': round(sum(db_times) / max(sum(total_ms for _, _, total_ms in rows), 1e-9), 2),
+            })
+        endpoints.sort(key=lambda e: e['avg_db_ms'] * e['requests'], reverse=True)
+        return {'window': len(requests), 'endpoints': endpoints, 'slow_queries': slow[::-1]}
+
+
+def _shorten(statement, limit=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + '…'
+
+
+def _template_line(frame):
+    """Template line of a frame running compiled Jinja code (same lookup as Template.get_corresponding_lineno)"""
+    pairs = [tuple(map(int, pair.split('='))) for pair in frame.f_globals['debug_info'].split('&') if pair]
+    for template_line, code_line in reversed(pairs):
+        if code_line <= frame.f_lineno:
+            return template_line
+    return 1
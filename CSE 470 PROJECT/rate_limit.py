@@ -0,0 +1,85 @@
+# In-memory sliding-window rate limiter for login and registration attempts
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class RateLimiter:
+    """Counts events per ``(scope, key)`` over a sliding window.
+
+    ``limits`` maps a scope to ``(events, seconds)``, e.g. ``{'ip': (30, 60)}``:
+    at most 30 events per IP in any 60 seconds. The timestamps of the events
+    still in the window are kept per key, so the limit is exact rather than
+    per fixed minute. At most ``max_keys`` keys are tracked; the least
+    recently used are dropped first, so a flood of distinct keys costs
+    bounded memory. State is per process, so with several workers each
+    enforces the limit on the requests it serves.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.limits = {}
+        self.max_keys = max_keys
+        self._events = OrderedDict()  # (scope, key) -> deque of timestamps, oldest first
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.limits = dict(app.config.get('RATE_LIMITS') or {})
+        self._events.clear()
+        app.extensions['rate_limiter'] = self
+
+    def retry_after(self, scope, key, now=None):
+        """Seconds until ``key`` may act again in ``scope`` (0 if it may now); records nothing"""
+        limit = self.limits.get(scope)
+        if limit is None or key is None:
+            return 0
+        events, seconds = limit
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            window = self._events.get((scope, key))
+            if window is None:
+                return 0
+            self._expire(window, now - seconds)
+            if len(window) < events:
+                return 0
+            return max(1, math.ceil(window[0] + seconds - now))
+
+    def count(self, scope, key, now=None):
+        """Events of ``key`` still in the window"""
+        limit = self.limits.get(scope)
+        if limit is None or key is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            window = self._events.get((scope, key))
+            if window is None:
+                return 0
+            self._expire(window, now - limit[1])
+            return len(window)
+
+    def hit(self, scope, key, now=None):
+        limit = self.limits.get(scope)
+        if limit is None or key is None:
+            return
+        events, seconds = limit
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            window = self._events.get((scope, key))
+            if window is None:
+                if len(self._events) >= self.max_keys:
+                    self._events.popitem(last=False)
+                window = self._events[(scope, key)] = deque(maxlen=events)
+            else:
+                self._events.move_to_end((scope, key))
+                self._expire(window, now - seconds)
+            window.append(now)
+
+    def reset(self, scope, key):
+        with self._lock:
+            self._events.pop((scope, key), None)
+
+    @staticmethod
+    def _expire(window, cutoff):
+        while window and window[0] <= cutoff:
+            window.popleft()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Find where the vote routes stop scaling: the same burst of POST /vote_setup requests at
+rising concurrency against the sync server (gunicorn, threads) and the async one
+(uvicorn with asgi.py, coroutines on aiosqlite). Every client is a different generated
+user with one keep-alive connection; it votes on random setups for --duration seconds.
+
+    python scripts/benchmark_async_votes.py
+    python scripts/benchmark_async_votes.py --levels 50 500 2000 --duration 15
+
+Targets the configured database (DATABASE_URL; generate data first with
+scripts/generate_data.py). Votes toggle, so the data stays roughly as it was.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from benchmark_servers import ROOT, free_port, wait_for
+
+SERVERS = {
+    'sync': [sys.executable, 'scripts/serve.py', '--server', 'gunicorn', '--bind', '127.0.0.1:{port}'],
+    'async': [sys.executable, 'scripts/serve.py', '--server', 'uvicorn', '--bind', '127.0.0.1:{port}'],
+}
+
+
+def fixtures(clients):
+    """Signed session cookies for ``clients`` distinct users, and the setup ids to vote on"""
+    from app import create_app
+    from extensions import db
+    from models import SetupPost, User
+
+    app = create_app(blueprints=())
+    serializer = app.session_interface.get_signing_serializer(app)
+    with app.app_context():
+        user_ids = db.session.execute(
+            select(User.id).where(User.is_admin == False, User.is_banned == False).limit(clients)  # noqa: E712
+        ).scalars().all()
+        setup_ids = db.session.execute(select(SetupPost.id)).scalars().all()
+    if not user_ids or not setup_ids:
+        sys.exit("Database has no users or setups; run scripts/generate_data.py first")
+    cookies = [f"{app.config.get('SESSION_COOKIE_NAME', 'session')}="
+               + serializer.dumps({'_user_id': str(user_id), '_fresh': True}) for user_id in user_ids]
+    return cookies, setup_ids
+
+
+async def client(port, cookie, setup_ids, deadline, results, rng):
+    writer = None
+    while time.perf_counter() < deadline:
+        body = f"setup_id={rng.choice(setup_ids)}&vote_type=like".encode()
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(
+                b"POST /vote_setup HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: " + cookie.encode()
+                + b"\r\nContent-Type: application/x-www-form-urlencoded\r\nContent-Length: "
+                + str(len(body)).encode() + b"\r\n\r\n" + body
+            )
+            status = await asyncio.wait_for(read_response(reader), timeout=30)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            # Refused, reset or timed out: count it and reconnect
+            results.append((time.perf_counter() - started, 599))
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.1)
+            continue
+        results.append((time.perf_counter() - started, status))
+    if writer is not None:
+        writer.close()
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("server closed the connection")
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'transfer-encoding' and b'chunked' in value.lower():
+            chunked = True
+    if not chunked:
+        await reader.readexactly(length)
+        return status
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        await reader.readexactly(size + 2)  # chunk and its CRLF
+        if size == 0:
+            return status
+
+
+async def burst(port, cookies, setup_ids, clients, duration, seed):
+    results = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, cookies[i % len(cookies)], setup_ids, started + duration, results, random.Random(seed + i))
+        for i in range(clients)
+    ))
+    # Requests in flight at the deadline still finish, so rates use the real elapsed time
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    ok = sorted(seconds for seconds, status in results if status == 200)
+    errors = len(results) - len(ok)
+    if not ok:
+        return 0.0, errors, float('nan'), float('nan')
+    p50 = ok[len(ok) // 2] * 1000
+    p99 = ok[min(len(ok) - 1, int(len(ok) * 0.99))] * 1000
+    return len(ok) / elapsed, errors, p50, p99
+
+
+def run(name, args, cookies, setup_ids, tmp):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PIDFILE=os.path.join(tmp, f'{name}.pid'))
+    log_path = os.path.join(tmp, f'{name}.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen([part.format(port=port) for part in SERVERS[name]],
+                                  cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    rows = []
+    try:
+        try:
+            wait_for(port)
+        except RuntimeError:
+            with open(log_path) as log:
+                sys.exit(f"{name} did not start:\n{log.read()[-2000:]}")
+        for clients in args.levels:
+            results, elapsed = asyncio.run(burst(port, cookies, setup_ids, clients, args.duration, args.seed))
+            rows.append((clients, *summarize(results, elapsed)))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--levels', nargs='+', type=int, default=[16, 128, 512, 1024],
+                        help='concurrent clients per step')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per step')
+    parser.add_argument('--seed', type=int, default=470)
+    args = parser.parse_args()
+
+    # One socket per client on both ends; the servers inherit the raised limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = max(args.levels) * 2 + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    cookies, setup_ids = fixtures(max(args.levels))
+    print(f"POST /vote_setup, {len(cookies)} users, {args.duration:g}s per step, {os.cpu_count()} CPUs\n")
+    print(f"{'server':<8}{'clients':>8}{'req/s':>9}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.servers:
+            for clients, rate, errors, p50, p99 in run(name, args, cookies, setup_ids, tmp):
+                print(f"{name:<8}{clients:>8}{rate:>9.1f}{errors:>8}{p50:>9.1f}{p99:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Time the main routes on a fixed synthetic dataset and count their SQL queries.
+Each run seeds a fresh SQLite database with scripts/generate_data.py (same scale and
+seed every time, so query counts are deterministic), then requests every endpoint
+through the Flask test client. The rendered-page cache is disabled.
+
+    python scripts/benchmark_endpoints.py
+    python scripts/benchmark_endpoints.py --save benchmarks/baseline.json
+    python scripts/benchmark_endpoints.py --compare benchmarks/baseline.json
+
+--compare exits with status 1 when an endpoint issues more queries than the baseline
+(an N+1 creeping in) or its median time grows beyond --time-threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALE = 0.05  # 500 users, 25 games, 100 setups
+SEED = 470
+CART_GAMES = 3  # games put in the member's cart before the cart and checkout benchmarks
+
+# name -> (role, method, path, form data, fill cart first); {game}, {review}, {setup} come from the fixtures
+BENCHMARKS = {
+    'index': ('anonymous', 'GET', '/', None, False),
+    'games': ('anonymous', 'GET', '/games', None, False),
+    'game_detail': ('anonymous', 'GET', '/game/{game}', None, False),
+    'cart': ('member', 'GET', '/cart', None, True),
+    'process_checkout': ('member', 'POST', '/process_checkout', {}, True),
+    'vote_review': ('member', 'POST', '/vote_review', {'review_id': '{review}', 'vote_type': 'like'}, False),
+    'vote_setup': ('member', 'POST', '/vote_setup', {'setup_id': '{setup}', 'vote_type': 'like'}, False),
+    'review_comments': ('member', 'GET', '/review/{review}/comments', None, False),
+    'lend_games': ('member', 'GET', '/lend_games', None, False),
+    'profile': ('member', 'GET', '/profile', None, False),
+    'library': ('member', 'GET', '/library', None, False),
+    'admin': ('admin', 'GET', '/admin', None, False),
+    'admin_users': ('admin', 'GET', '/admin/users', None, False),
+    'leaderboard': ('anonymous', 'GET', '/leaderboard', None, False),
+    'api_games': ('anonymous', 'GET', '/api/v1/games?limit=200', None, False),
+    'api_reviews': ('anonymous', 'GET', '/api/v1/reviews?game_id={game}&limit=100', None, False),
+    'api_lendings': ('member', 'GET', '/api/v1/lendings?limit=100', None, False),
+}
+
+# Where the cart entries may redirect when they succeed (any other redirect fails the run)
+REDIRECTS = {'process_checkout': '/profile'}
+
+
+class QueryCounter:
+    """Counts statements on the app's engines while ``active``"""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.active = False
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        if self.active:
+            self.count += 1
+
+
+def seed(app):
+    """Generate the fixed dataset and return the fixtures the benchmarks need"""
+    from sqlalchemy import func, select
+    from werkzeug.security import generate_password_hash
+
+    from extensions import db
+    from generate_data import generate
+    from models import Game, Purchase, Review, SetupPost, User
+
+    with app.app_context():
+        db.create_all()
+        generate(SCALE, 5000, SEED)
+        db.session.add(User(username='bench_admin', email='bench_admin@example.com',
+                            password_hash=generate_password_hash('password123'), is_admin=True))
+        db.session.commit()
+        # The heaviest user who still has CART_GAMES games left to buy, and the most reviewed game:
+        # worst cases for per-row queries
+        game_count = db.session.execute(select(func.count(Game.id))).scalar()
+        member_id = db.session.execute(
+            select(Purchase.user_id).group_by(Purchase.user_id)
+            .having(func.count(func.distinct(Purchase.game_id)) <= game_count - CART_GAMES)
+            .order_by(func.count().desc(), Purchase.user_id).limit(1)
+        ).scalar()
+        if member_id is None:
+            sys.exit(f"No generated user owns fewer than {game_count - CART_GAMES + 1} games; cannot fill a cart")
+        game_id = db.session.execute(
+            select(Review.game_id).group_by(Review.game_id)
+            .order_by(func.count().desc(), Review.game_id).limit(1)
+        ).scalar()
+        owned = set(db.session.execute(select(Purchase.game_id).where(Purchase.user_id == member_id)).scalars())
+        return {
+            'member': db.session.get(User, member_id).username,
+            'game': game_id,
+            'review': db.session.execute(select(func.min(Review.id)).where(Review.user_id != member_id)).scalar(),
+            'setup': db.session.execute(select(func.min(SetupPost.id)).where(SetupPost.user_id != member_id)).scalar(),
+            'cart_games': db.session.execute(
+                select(Game.id).where(Game.id.not_in(owned)).order_by(Game.id).limit(CART_GAMES)
+            ).scalars().all(),
+            'member_id': member_id,
+        }
+
+
+def fill_cart(app, fixtures):
+    from extensions import db
+    from models import Cart
+
+    with app.app_context():
+        Cart.query.filter_by(user_id=fixtures['member_id']).delete()
+        db.session.add_all(Cart(user_id=fixtures['member_id'], game_id=game_id, quantity=1)
+                           for game_id in fixtures['cart_games'])
+        db.session.commit()
+        count = Cart.query.filter_by(user_id=fixtures['member_id']).count()
+    if count != CART_GAMES:
+        sys.exit(f"Cart holds {count} games, expected {CART_GAMES}")
+
+
+def run(iterations, warmup, only):
+    from app import create_app
+    from extensions import db, fragment_cache
+
+    app = create_app()
+    fragment_cache.enabled = False
+    fixtures = seed(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    if app.extensions.get('database_replica') is not None:
+        engines.append(app.extensions['database_replica'])
+    counter = QueryCounter(engines)
+
+    clients = {'anonymous': app.test_client(), 'member': app.test_client(), 'admin': app.test_client()}
+    clients['member'].post('/login', data={'username': fixtures['member'], 'password': 'password123'})
+    clients['admin'].post('/login', data={'username': 'bench_admin', 'password': 'password123'})
+
+    results = {}
+    for name, (role, method, path, data, needs_cart) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        path = path.format(**fixtures)
+        data = {key: value.format(**fixtures) for key, value in data.items()} if data is not None else None
+        timings, queries = [], []
+        for i in range(warmup + iterations):
+            if needs_cart:
+                fill_cart(app, fixtures)
+            counter.count = 0
+            counter.active = True
+            started = time.perf_counter()
+            response = clients[role].open(path, method=method, data=data)
+            elapsed = time.perf_counter() - started
+            counter.active = False
+            if response.status_code >= 400:
+                sys.exit(f"{name}: {method} {path} returned {response.status_code}")
+            if needs_cart and 300 <= response.status_code < 400 and response.location != REDIRECTS.get(name):
+                # e.g. the empty-cart redirect: the benchmark would time the wrong code path
+                sys.exit(f"{name}: {method} {path} redirected to {response.location}")
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(counter.count)
+        timings.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            # Toggling votes alternate between code paths; keep the worst case
+            'queries': max(queries),
+        }
+    return results
+
+
+def print_results(results, baseline=None):
+    header = f"{'endpoint':<18}{'median ms':>10}{'p95 ms':>9}{'queries':>9}"
+    print(header + (f"{'base ms':>10}{'base q':>8}" if baseline else ''))
+    for name, result in results.items():
+        line = f"{name:<18}{result['median_ms']:>10.1f}{result['p95_ms']:>9.1f}{result['queries']:>9}"
+        if baseline and name in baseline:
+            line += f"{baseline[name]['median_ms']:>10.1f}{baseline[name]['queries']:>8}"
+        print(line)
+
+
+def compare(results, baseline, time_threshold, query_threshold, min_ms):
+    """Return a list of regression messages"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries'] + query_threshold:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {base['queries']}")
+        slower = result['median_ms'] - base['median_ms']
+        if slower > min_ms and result['median_ms'] > base['median_ms'] * (1 + time_threshold):
+            regressions.append(
+                f"{name}: median {result['median_ms']:.1f} ms, baseline {base['median_ms']:.1f} ms "
+                f"(+{slower / base['median_ms']:.0%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='run only these endpoints')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a JSON baseline')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='allowed median slowdown as a fraction (default 0.25 = 25%%)')
+    parser.add_argument('--query-threshold', type=int, default=0, help='allowed extra queries per request')
+    parser.add_argument('--min-ms', type=float, default=2.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+        os.environ.pop('DATABASE_REPLICA', None)
+        results = run(args.iterations, args.warmup, args.only)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)['results']
+    print_results(results, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as fh:
+            json.dump({
+                'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'scale': SCALE,
+                'iterations': args.iterations,
+                'results': results,
+            }, fh, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.time_threshold, args.query_threshold, args.min_ms)
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(f"  ✗ {message}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+if __name__ == '__main__':
+    main()
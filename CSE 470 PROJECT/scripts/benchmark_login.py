@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Load-test the login path during a credential-stuffing burst. Legitimate visitors log
+in, each from an address of their own, and browse the home page while attackers post
+wrong passwords for real usernames, as fast as they can or at --attack-rate requests
+per second, from --attack-ips addresses (sent as X-Forwarded-For, so the server runs
+with PROXY_FIX_HOPS=1). The same legitimate load runs once without and once with the
+attack, and latencies are compared.
+
+    python scripts/benchmark_login.py
+    python scripts/benchmark_login.py --attack-rate 50
+    python scripts/benchmark_login.py --attackers 256 --attack-ips 64 --duration 30
+
+Targets the configured database (DATABASE_URL; generate data first with
+scripts/generate_data.py, whose users all have the password 'password123').
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from benchmark_async_votes import read_response
+from benchmark_servers import ROOT, free_port, wait_for
+
+PASSWORD = 'password123'
+
+
+def usernames():
+    from app import create_app
+    from extensions import db
+    from models import User
+
+    app = create_app(blueprints=())
+    with app.app_context():
+        names = db.session.execute(
+            select(User.username).where(User.is_admin == False, User.is_banned == False)  # noqa: E712
+        ).scalars().all()
+    if len(names) < 2:
+        sys.exit("Database has too few users; run scripts/generate_data.py first")
+    return names
+
+
+async def request(port, method, path, ip, body=None):
+    """One request on its own connection; returns (seconds, status)"""
+    started = time.perf_counter()
+    writer = None
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nX-Forwarded-For: {ip}\r\nConnection: close\r\n"
+        if body is not None:
+            payload = urlencode(body).encode()
+            head += f"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(payload)}\r\n"
+        writer.write(head.encode() + b"\r\n" + (payload if body is not None else b''))
+        status = await asyncio.wait_for(read_response(reader), timeout=60)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        status = 599
+    finally:
+        if writer is not None:
+            writer.close()
+    return time.perf_counter() - started, status
+
+
+async def legitimate(port, index, names, deadline, results, rng):
+    """One visitor after another: log in, then view ten pages"""
+    visit = 0
+    await asyncio.sleep(rng.uniform(0, 5))  # arrive spread out, not all at once
+    while time.perf_counter() < deadline:
+        ip = f'10.{index}.{visit // 250}.{visit % 250 + 1}'
+        visit += 1
+        results['login'].append(await request(port, 'POST', '/login', ip,
+                                              {'username': rng.choice(names), 'password': PASSWORD}))
+        for _ in range(10):
+            await asyncio.sleep(0.5)
+            results['page'].append(await request(port, 'GET', '/', ip))
+
+
+async def attacker(port, ips, names, interval, deadline, results, rng):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        body = {'username': rng.choice(names), 'password': f'guess{rng.randrange(10 ** 6)}'}
+        results['attack'].append(await request(port, 'POST', '/login', rng.choice(ips), body))
+        await asyncio.sleep(max(0, interval - (time.perf_counter() - started)))
+
+
+async def phase(port, names, args, attack):
+    rng = random.Random(args.seed)
+    rng.shuffle(names)
+    legit_names, target_names = names[:args.users], names[args.users:]
+    ips = [f'172.16.{i // 250}.{i % 250 + 1}' for i in range(args.attack_ips)]
+    results = {'page': [], 'login': [], 'attack': []}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tasks = [legitimate(port, i, legit_names, deadline, results, random.Random(args.seed + i))
+             for i in range(args.users)]
+    if attack:
+        interval = args.attackers / args.attack_rate if args.attack_rate else 0
+        tasks += [attacker(port, ips, target_names, interval, deadline, results, random.Random(-args.seed - i))
+                  for i in range(args.attackers)]
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def percentiles(samples, ok):
+    times = sorted(seconds for seconds, status in samples if status in ok)
+    if not times:
+        return float('nan'), float('nan')
+    return times[len(times) // 2] * 1000, times[min(len(times) - 1, int(len(times) * 0.99))] * 1000
+
+
+def report(name, results, elapsed):
+    page_p50, page_p99 = percentiles(results['page'], {200})
+    login_p50, login_p99 = percentiles(results['login'], {302})
+    failed = tally(status for _, status in results['page'] + results['login'] if status not in (200, 302))
+    failed = ' '.join(f"{count}x{status}" for status, count in sorted(failed.items())) or '0'
+    attack = tally(status for _, status in results['attack'])
+    attack = ', '.join(f"{status}: {count / elapsed:.1f}/s" for status, count in sorted(attack.items())) or '-'
+    print(f"{name:<8}{page_p50:>9.1f}{page_p99:>9.1f}{login_p50:>10.1f}{login_p99:>10.1f}{failed:>10}   {attack}")
+
+
+def tally(statuses):
+    counts = {}
+    for status in statuses:
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='legitimate clients')
+    parser.add_argument('--attackers', type=int, default=64, help='concurrent attacking connections')
+    parser.add_argument('--attack-rate', type=float, default=0,
+                        help='attack requests per second in total (default: as fast as the server answers)')
+    parser.add_argument('--attack-ips', type=int, default=16, help='addresses the attack comes from')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per phase')
+    parser.add_argument('--seed', type=int, default=470)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = (args.users + args.attackers) * 2 + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    names = usernames()
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PROXY_FIX_HOPS='1', GUNICORN_PIDFILE=os.path.join(tmp, 'gunicorn.pid'))
+        log_path = os.path.join(tmp, 'gunicorn.log')
+        with open(log_path, 'w') as log:
+            server = subprocess.Popen([sys.executable, 'scripts/serve.py', '--bind', f'127.0.0.1:{port}'],
+                                      cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            try:
+                wait_for(port)
+            except RuntimeError:
+                with open(log_path) as log:
+                    sys.exit(f"gunicorn did not start:\n{log.read()[-2000:]}")
+            rate = f"{args.attack_rate:g}/s" if args.attack_rate else 'unpaced'
+            print(f"{args.users} users, {args.attackers} attackers ({rate}) from {args.attack_ips} IPs, "
+                  f"{args.duration:g}s per phase, {os.cpu_count()} CPUs\n")
+            print(f"{'phase':<8}{'page p50':>9}{'p99 ms':>9}{'login p50':>10}{'p99 ms':>10}{'failed':>10}   attack responses")
+            for name, attack in (('quiet', False), ('attack', True)):
+                results, elapsed = asyncio.run(phase(port, list(names), args, attack))
+                report(name, results, elapsed)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark read throughput of the read-only pages with and without the read replica.
+A fresh WAL database is seeded, then N reader processes request the catalog, game
+detail, gallery and leaderboard pages through the app while one writer process
+keeps voting and sending notifications.
+
+    python scripts/benchmark_read_replica.py --processes 1 2 4 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+READ_URLS = ['/games', '/game/{id}', '/setups', '/setups?sort=top', '/leaderboard']
+
+def seed(rows):
+    """Create and fill the database named by DATABASE_URL (imports the app)"""
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from extensions import db
+    from models import Game, Review, SetupPost, User
+
+    with create_app(blueprints=()).app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        password = generate_password_hash('benchmark')
+        db.session.add_all(
+            User(username=f'user{i}', email=f'user{i}@example.com', password_hash=password,
+                 popularity_points=i, created_at=now)
+            for i in range(rows)
+        )
+        db.session.add_all(
+            Game(title=f'Game {i}', description='Benchmark game', price=9.99, genre='Action',
+                 platform='PC', is_available=True, created_at=now)
+            for i in range(rows)
+        )
+        db.session.flush()
+        db.session.add_all(
+            SetupPost(user_id=i % rows + 1, title=f'Setup {i}', image_url='/static/x.jpg',
+                      likes=i % 50, hot_score=float(i), created_at=now)
+            for i in range(rows)
+        )
+        db.session.add_all(
+            Review(user_id=i % rows + 1, game_id=i % rows + 1, rating=4, content='Good', created_at=now)
+            for i in range(rows * 3)
+        )
+        db.session.commit()
+
+def reader(start, seconds, rows, results):
+    from app import create_app
+    from extensions import fragment_cache
+
+    app = create_app()
+    fragment_cache.enabled = False  # measure the database, not the page cache
+    client = app.test_client()
+    rng = random.Random()
+    done = 0
+    start.wait()  # every process has imported the app
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        url = rng.choice(READ_URLS).format(id=rng.randint(1, rows))
+        if client.get(url).status_code == 200:
+            done += 1
+    results.put(done)
+
+def writer(db_path, start, seconds, rows, results):
+    conn = sqlite3.connect(db_path, timeout=5)
+    rng = random.Random()
+    done = 0
+    start.wait()
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            conn.execute("UPDATE setup_post SET likes = likes + 1 WHERE id = ?", (rng.randint(1, rows),))
+            conn.execute(
+                "INSERT INTO notification (user_id, title, message, is_read, notification_type, created_at) "
+                "VALUES (?, 'Benchmark', 'vote', 0, 'general', ?)",
+                (rng.randint(1, rows), datetime.utcnow())
+            )
+            conn.commit()
+            done += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+    conn.close()
+    results.put(done)
+
+def run(db_path, replica, processes, seconds, rows):
+    os.environ['DATABASE_REPLICA'] = replica or ''
+    ctx = multiprocessing.get_context('spawn')
+    results, write_results = ctx.Queue(), ctx.Queue()
+    start = ctx.Barrier(processes + 1)
+    workers = [ctx.Process(target=reader, args=(start, seconds, rows, results)) for _ in range(processes)]
+    workers.append(ctx.Process(target=writer, args=(db_path, start, seconds, rows, write_results)))
+    for worker in workers:
+        worker.start()
+    reads = sum(results.get() for _ in range(processes))
+    writes = write_results.get()
+    for worker in workers:
+        worker.join()
+    return reads, writes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        os.environ['DATABASE_PROFILE'] = 'production'
+        os.environ.pop('DATABASE_REPLICA', None)
+        ctx = multiprocessing.get_context('spawn')
+        seeder = ctx.Process(target=seed, args=(args.rows,))
+        seeder.start()
+        seeder.join()
+
+        print(f"{args.seconds:g}s per run, {args.rows} rows per table, 1 writer process\n")
+        print(f"{'replica':<10}{'readers':>8}{'reads/s':>10}{'writes/s':>10}")
+        for replica in (None, 'readonly'):
+            for processes in args.processes:
+                reads, writes = run(db_path, replica, processes, args.seconds, args.rows)
+                print(f"{replica or 'off':<10}{processes:>8}"
+                      f"{reads / args.seconds:>10.0f}{writes / args.seconds:>10.0f}")
+
+if __name__ == '__main__':
+    main()
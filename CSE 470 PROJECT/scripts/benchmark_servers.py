@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare throughput of the development server and the production servers on this machine.
+Each server is started in turn against the configured database (DATABASE_URL; generate
+data first with scripts/generate_data.py) and driven by scripts/load_test.py over HTTP.
+
+    python scripts/benchmark_servers.py --scenario browse --concurrency 16 --duration 20
+    python scripts/benchmark_servers.py --servers dev gunicorn
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> command; {port} is filled in
+SERVERS = {
+    'dev': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--debug', '--no-reload', '--port', '{port}'],
+    'gunicorn': [sys.executable, 'scripts/serve.py', '--server', 'gunicorn', '--bind', '127.0.0.1:{port}'],
+    'waitress': [sys.executable, 'scripts/serve.py', '--server', 'waitress', '--bind', '127.0.0.1:{port}'],
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def run(name, args, tmp):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PIDFILE=os.path.join(tmp, f'{name}.pid'))
+    command = [part.format(port=port) for part in SERVERS[name]]
+    log_path = os.path.join(tmp, f'{name}.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        try:
+            wait_for(port)
+        except RuntimeError:
+            with open(log_path) as log:
+                sys.exit(f"{name} did not start:\n{log.read()[-2000:]}")
+        output = subprocess.run(
+            [sys.executable, 'scripts/load_test.py', '--url', f'http://127.0.0.1:{port}',
+             '--scenario', args.scenario, '--concurrency', str(args.concurrency), '--duration', str(args.duration)],
+            cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    match = re.search(r'(\d+) requests in [\d.]+s: ([\d.]+) req/s', output)
+    errors = sum(int(line.split()[-5]) for line in output.splitlines() if re.match(r'^(GET|POST) ', line))
+    return float(match.group(2)), errors, output
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--scenario', default='browse')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--verbose', action='store_true', help='print the per-endpoint load test report too')
+    args = parser.parse_args()
+
+    print(f"Scenario '{args.scenario}', {args.concurrency} clients, {args.duration:g}s per server, {os.cpu_count()} CPUs\n")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.servers:
+            results[name] = run(name, args, tmp)
+            if args.verbose:
+                print(results[name][2])
+
+    base = results.get('dev', (None,))[0]
+    print(f"{'server':<10}{'req/s':>9}{'errors':>8}{'vs dev':>8}")
+    for name, (rate, errors, _) in results.items():
+        ratio = f"{rate / base:.2f}x" if base else '-'
+        print(f"{name:<10}{rate:>9.1f}{errors:>8}{ratio:>8}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent read/write throughput of the SQLite database profiles.
+Each profile gets a fresh database file with the app's schema; worker threads
+then run a mix of catalog/gallery reads and vote/notification writes.
+
+    python scripts/benchmark_sqlite_profile.py --threads 8 --seconds 10 --write-ratio 0.2
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import Game, Notification, SetupPost, User
+from database import SQLITE_PRAGMAS, engine_options, set_sqlite_pragmas
+
+def seed(engine, rows):
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x', 'created_at': now}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Game), [
+            {'title': f'Game {i}', 'price': 9.99, 'is_available': True, 'created_at': now}
+            for i in range(rows)
+        ])
+        conn.execute(insert(SetupPost), [
+            {'user_id': i % rows + 1, 'title': f'Setup {i}', 'image_url': '/static/x.jpg',
+             'likes': 0, 'hot_score': 0.0, 'created_at': now}
+            for i in range(rows)
+        ])
+
+def worker(engine, rows, write_ratio, deadline, stats, lock):
+    reads = writes = errors = 0
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    setup_id = rng.randint(1, rows)
+                    conn.execute(update(SetupPost).where(SetupPost.id == setup_id).values(likes=SetupPost.likes + 1))
+                    conn.execute(insert(Notification).values(
+                        user_id=rng.randint(1, rows), title='Benchmark', message='vote', created_at=datetime.utcnow()
+                    ))
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(select(Game).order_by(Game.created_at.desc()).limit(12)).all()
+                    conn.execute(
+                        select(SetupPost, User.username).join(User, SetupPost.user_id == User.id)
+                        .order_by(SetupPost.created_at.desc()).limit(12)
+                    ).all()
+                reads += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        stats['reads'] += reads
+        stats['writes'] += writes
+        stats['errors'] += errors
+
+def run_profile(profile, threads, seconds, write_ratio, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, **engine_options(profile, url))
+        set_sqlite_pragmas(engine, profile)
+        seed(engine, rows)
+
+        stats = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        pool = [
+            threading.Thread(target=worker, args=(engine, rows, write_ratio, deadline, stats, lock))
+            for _ in range(threads)
+        ]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        engine.dispose()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PRAGMAS))
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s, {args.write_ratio:.0%} writes, {args.rows} rows per table\n")
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'locked':>10}")
+    for profile in args.profiles:
+        stats = run_profile(profile, args.threads, args.seconds, args.write_ratio, args.rows)
+        print(f"{profile:<12}{stats['reads'] / args.seconds:>10.0f}{stats['writes'] / args.seconds:>10.0f}{stats['errors']:>10}")
+
+if __name__ == '__main__':
+    main()
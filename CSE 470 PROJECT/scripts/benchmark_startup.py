@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start time: each case runs in a fresh interpreter, so imports are not cached.
+
+    python scripts/benchmark_startup.py --runs 7
+
+"worker" is what a web worker pays before serving (the full app with every blueprint),
+"models" what scripts and tests pay when they only need the models and an app context.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('interpreter', 'pass'),
+    ('import models', 'import models'),
+    ('models app', 'from app import create_app; create_app(blueprints=())'),
+    ('worker', 'from app import create_app; create_app()'),
+    ('first request', 'from app import create_app; create_app().test_client().get("/games")'),
+]
+
+def measure(code, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'case':<16}{'median ms':>10}")
+    for name, code in CASES:
+        print(f"{name:<16}{measure(code, args.runs):>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed copies of the static assets.
+Run this before deploying; the app picks up static/manifest.json on startup
+and rewrites url_for('static', ...) to the hashed file names. Safe to run again:
+hashed copies the new manifest no longer uses stay for a week (assets.STALE_RETENTION)
+so pages cached before the deploy keep their CSS and JS.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from assets import build_manifest, brotli
+
+def main():
+    static_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+    manifest = build_manifest(static_folder)
+    for source, hashed in sorted(manifest.items()):
+        print(f"{source} -> {hashed}")
+    print(f"\n✓ Fingerprinted {len(manifest)} assets")
+    if brotli is None:
+        print("Note: brotli is not installed, only gzip variants were written")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Generate a large synthetic dataset for load and scale testing.
+Row counts grow linearly with --scale (scale 1 = 10,000 users, 500 games; scale 100
+is a million users). Popularity is Zipfian: a few games, setups and users get most of
+the purchases, reviews, votes and activity. Rows are written with bulk inserts in
+batches, into the database the app is configured for (DATABASE_URL).
+
+    python scripts/generate_data.py --scale 1
+    python scripts/generate_data.py --scale 100 --reset --batch-size 20000
+
+Every generated user's password is "password123" (as in seed_database.py).
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from extensions import db
+from models import (
+    Cart, Game, GameLending, Notification, Purchase, Review, ReviewComment, ReviewVote, SetupPost, SetupVote, User
+)
+
+# Rows per unit of scale
+BASE_COUNTS = {
+    'users': 10000,
+    'games': 500,
+    'setups': 2000,
+}
+PURCHASES_PER_USER = 5      # mean; heavy users buy far more
+REVIEW_RATE = 0.3           # share of purchases that get reviewed
+LENDING_RATE = 0.05         # share of purchases offered for lending
+NOTIFICATIONS_PER_USER = 4  # mean
+COMMENT_RATE = 0.2          # share of reviews with comments
+
+GENRES = ['RPG', 'Adventure', 'Racing', 'Strategy', 'Sports', 'Puzzle', 'Action', 'Shooter', 'Simulation', 'Horror']
+PLATFORMS = ['PC', 'Multi-platform', 'Mobile', 'Console']
+WORDS = ('epic fun grind story combat graphics music boss loot co-op controls puzzle speed world '
+         'quest tactics retro open physics multiplayer').split()
+DAYS_OF_HISTORY = 730
+
+
+class Zipf:
+    """Draws 1-based ranks 1..n with P(k) proportional to 1/k**s, mapped through a shuffled id list"""
+
+    def __init__(self, ids, rng, s=1.1):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        total = 0.0
+        self.cum = []
+        for k in range(1, len(self.ids) + 1):
+            total += 1.0 / k ** s
+            self.cum.append(total)
+        self.rng = rng
+
+    def draw(self):
+        return self.ids[bisect.bisect_left(self.cum, self.rng.random() * self.cum[-1])]
+
+    def draw_distinct(self, k):
+        """Up to k distinct ids (fewer if the draws keep colliding)"""
+        seen = set()
+        for _ in range(k * 3):
+            seen.add(self.draw())
+            if len(seen) >= k:
+                break
+        return seen
+
+
+class BulkWriter:
+    """Buffers rows per table and inserts them in batches, parents before children"""
+
+    ORDER = [User, Game, Purchase, Review, ReviewVote, ReviewComment, SetupPost, SetupVote,
+             GameLending, Cart, Notification]
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.buffers = {model: [] for model in self.ORDER}
+        self.counts = {model.__tablename__: 0 for model in self.ORDER}
+
+    def add(self, model, row):
+        self.buffers[model].append(row)
+        if len(self.buffers[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model in self.ORDER:
+            rows = self.buffers[model]
+            if rows:
+                self.conn.execute(model.__table__.insert(), rows)
+                self.counts[model.__tablename__] += len(rows)
+                rows.clear()
+        self.conn.commit()
+
+
+def next_ids(conn, models):
+    """First free id per model, so generated rows can reference each other without RETURNING"""
+    return {model: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1 for model in models}
+
+
+def random_time(rng, now):
+    # Skewed towards recent activity
+    return now - timedelta(days=DAYS_OF_HISTORY * rng.random() ** 2, seconds=rng.randint(0, 86399))
+
+
+def sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize() + '.'
+
+
+def activity(rng, mean):
+    """Per-user activity count: most users do little, a few do a lot"""
+    return min(int(rng.paretovariate(1.5) * mean / 3), mean * 50)
+
+
+def generate(scale, batch_size, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n_users = int(BASE_COUNTS['users'] * scale)
+    n_games = max(int(BASE_COUNTS['games'] * scale), 10)
+    n_setups = int(BASE_COUNTS['setups'] * scale)
+    password_hash = generate_password_hash('password123')  # hashing per user would dominate the run
+
+    with db.engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            # Bulk load: skip fsyncs; the data is synthetic
+            conn.execute(text("PRAGMA synchronous=OFF"))
+        ids = next_ids(conn, BulkWriter.ORDER)
+        out = BulkWriter(conn, batch_size)
+
+        user_ids = range(ids[User], ids[User] + n_users)
+        for i, user_id in enumerate(user_ids):
+            out.add(User, {
+                'id': user_id, 'username': f'player{user_id}', 'email': f'player{user_id}@example.com',
+                'password_hash': password_hash, 'is_admin': False, 'popularity_points': 0,
+                'profile_picture': 'default.jpg', 'bio': sentence(rng, 6) if i % 3 == 0 else None,
+                'created_at': random_time(rng, now), 'is_banned': False,
+            })
+
+        game_ids = range(ids[Game], ids[Game] + n_games)
+        prices = {game_id: rng.choice([4.99, 9.99, 19.99, 29.99, 49.99, 59.99]) for game_id in game_ids}
+        for game_id in game_ids:
+            out.add(Game, {
+                'id': game_id, 'title': f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {game_id}',
+                'description': sentence(rng, 20), 'price': prices[game_id],
+                'genre': rng.choice(GENRES), 'platform': rng.choice(PLATFORMS),
+                'release_date': date(2015, 1, 1) + timedelta(days=rng.randint(0, 3650)),
+                'image_url': '/placeholder.svg?height=300&width=400', 'is_available': rng.random() > 0.05,
+                'created_at': random_time(rng, now),
+            })
+        out.flush()
+
+        games = Zipf(game_ids, rng)
+        users = Zipf(user_ids, rng)
+        review_id = itertools.count(ids[Review])
+        setup_id = itertools.count(ids[SetupPost])
+
+        # Purchases, reviews (with their votes and comments), lendings, carts, notifications
+        for user_id in user_ids:
+            owned = games.draw_distinct(activity(rng, PURCHASES_PER_USER))
+            for game_id in owned:
+                bought = random_time(rng, now)
+                out.add(Purchase, {'user_id': user_id, 'game_id': game_id, 'price_paid': prices[game_id], 'purchase_date': bought})
+                if rng.random() < REVIEW_RATE:
+                    rid = next(review_id)
+                    votes = [
+                        {'user_id': voter, 'review_id': rid, 'vote_type': 'like' if rng.random() < 0.8 else 'dislike'}
+                        for voter in users.draw_distinct(activity(rng, 3)) - {user_id}
+                    ]
+                    likes = sum(vote['vote_type'] == 'like' for vote in votes)
+                    review = {
+                        'id': rid, 'user_id': user_id, 'game_id': game_id, 'rating': rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 6, 5])[0],
+                        'content': sentence(rng, rng.randint(8, 40)), 'likes': likes, 'dislikes': len(votes) - likes,
+                        'created_at': bought + timedelta(days=rng.random() * 30),
+                    }
+                    comments = []
+                    if rng.random() < COMMENT_RATE:
+                        comments = [{
+                            'user_id': users.draw(), 'review_id': rid,
+                            'content': sentence(rng, rng.randint(3, 15)), 'created_at': random_time(rng, now),
+                        } for _ in range(activity(rng, 2) + 1)]
+                    out.add(Review, dict(review, comment_count=len(comments)))
+                    for vote in votes:
+                        out.add(ReviewVote, vote)
+                    for comment in comments:
+                        out.add(ReviewComment, comment)
+                if rng.random() < LENDING_RATE:
+                    lent = random_time(rng, now)
+                    borrower = users.draw() if rng.random() < 0.6 else None
+                    if borrower == user_id:
+                        borrower = None
+                    returned = borrower is not None and rng.random() < 0.7
+                    due = lent + timedelta(days=rng.choice([3, 7, 14]))
+                    out.add(GameLending, {
+                        'lender_id': user_id, 'borrower_id': borrower,
+                        'game_id': game_id, 'lend_date': lent, 'return_date': due if borrower else None,
+                        'is_returned': returned, 'is_overdue': bool(borrower) and not returned and due < now,
+                        'overdue_notification_sent': False,
+                    })
+            if rng.random() < 0.1:
+                for game_id in games.draw_distinct(rng.randint(1, 3)):
+                    out.add(Cart, {'user_id': user_id, 'game_id': game_id, 'quantity': 1})
+            for _ in range(activity(rng, NOTIFICATIONS_PER_USER)):
+                out.add(Notification, {
+                    'user_id': user_id, 'title': 'Update', 'message': sentence(rng, 10),
+                    'is_read': rng.random() < 0.7, 'notification_type': 'general',
+                    'created_at': random_time(rng, now),
+                })
+
+        # Setups with their votes; counters and hot score match the votes
+        for _ in range(n_setups):
+            sid = next(setup_id)
+            counts = {'likes': 0, 'dislikes': 0, 'cleanest_votes': 0, 'rgb_votes': 0, 'budget_votes': 0}
+            votes = []
+            for voter in users.draw_distinct(activity(rng, 10)):
+                vote = 'like' if rng.random() < 0.85 else 'dislike'
+                counts['likes' if vote == 'like' else 'dislikes'] += 1
+                votes.append({'user_id': voter, 'setup_id': sid, 'vote_type': vote})
+                if rng.random() < 0.2:
+                    badge = rng.choice(['cleanest', 'rgb', 'budget'])
+                    counts[f'{badge}_votes'] += 1
+                    votes.append({'user_id': voter, 'setup_id': sid, 'vote_type': badge})
+            setup = SetupPost(created_at=random_time(rng, now), **counts)
+            out.add(SetupPost, {
+                'id': sid, 'user_id': users.draw(), 'title': f'{rng.choice(WORDS).title()} setup {sid}',
+                'description': sentence(rng, 15), 'image_url': '/placeholder.svg?height=400&width=600',
+                'is_featured': False, 'hot_score': setup.update_hot_score(), 'created_at': setup.created_at, **counts,
+            })
+            for vote in votes:
+                out.add(SetupVote, vote)
+        out.flush()
+
+        # Same rule as seed_database.py: 10 points per review
+        conn.execute(text(
+            "UPDATE \"user\" SET popularity_points = 10 * "
+            "(SELECT COUNT(*) FROM review WHERE review.user_id = \"user\".id) "
+            "WHERE id >= :first"
+        ), {'first': ids[User]})
+        conn.commit()
+    return out.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='1 = 10,000 users; 100 = 1,000,000 users')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per INSERT batch')
+    parser.add_argument('--seed', type=int, default=470, help='random seed, for repeatable datasets')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+
+    with create_app(blueprints=()).app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+        print(f"Generating scale {args.scale:g} into {db.engine.url.render_as_string(hide_password=True)}")
+        started = time.perf_counter()
+        counts = generate(args.scale, args.batch_size, args.seed)
+        elapsed = time.perf_counter() - started
+
+    for table, count in counts.items():
+        print(f"  {table:<16}{count:>12,}")
+    total = sum(counts.values())
+    print(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Drive the real Flask routes with a weighted scenario and report latency percentiles per endpoint.
+Targets the database the app is configured for (DATABASE_URL); generate one first with
+scripts/generate_data.py. Logged-in scenarios sign in as generated users (password123).
+
+    python scripts/load_test.py --scenario browse --concurrency 8 --duration 30
+    python scripts/load_test.py --scenario mixed --serve           # local threaded WSGI server
+    python scripts/load_test.py --scenario member --url http://127.0.0.1:8000
+
+Without --serve or --url the app is called in-process through the Flask test client.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from sqlalchemy import select
+from werkzeug.serving import make_server
+
+from app import create_app
+from extensions import db, fragment_cache
+from generate_data import Zipf
+from models import Game, Review, SetupPost, User
+
+app = create_app()
+
+# (weight, label, method, path, form data); {game}, {setup}, {review}, {page} are drawn per request
+SCENARIOS = {
+    'browse': [
+        (10, 'GET /', 'GET', '/', None),
+        (20, 'GET /games', 'GET', '/games?page={page}', None),
+        (30, 'GET /game/<id>', 'GET', '/game/{game}', None),
+        (15, 'GET /setups', 'GET', '/setups?sort={sort}', None),
+        (10, 'GET /setups/page', 'GET', '/setups/page?sort={sort}', None),
+        (5, 'GET /leaderboard', 'GET', '/leaderboard', None),
+    ],
+    'member': [
+        (15, 'GET /games', 'GET', '/games?page={page}', None),
+        (25, 'GET /game/<id>', 'GET', '/game/{game}', None),
+        (10, 'GET /profile', 'GET', '/profile', None),
+        (10, 'GET /notifications', 'GET', '/notifications', None),
+        (5, 'GET /cart', 'GET', '/cart', None),
+        (10, 'GET /setups', 'GET', '/setups?sort={sort}', None),
+        (15, 'POST /vote_setup', 'POST', '/vote_setup', {'setup_id': '{setup}', 'vote_type': 'like'}),
+        (10, 'POST /vote_review', 'POST', '/vote_review', {'review_id': '{review}', 'vote_type': 'like'}),
+    ],
+}
+SCENARIOS['mixed'] = [(w * 3, *rest) for w, *rest in SCENARIOS['browse']] + SCENARIOS['member']
+MEMBER_LABELS = {label for _, label, _, _, _ in SCENARIOS['member']} - {label for _, label, _, _, _ in SCENARIOS['browse']}
+SETUP_SORTS = ['newest', 'hot', 'top']
+
+
+class Targets:
+    """Zipf-skewed ids to request, read once from the database"""
+
+    def __init__(self, seed):
+        rng = random.Random(seed)
+        with app.app_context():
+            ids = {model: db.session.execute(select(model.id)).scalars().all()
+                   for model in (Game, SetupPost, Review)}
+            self.usernames = db.session.execute(
+                select(User.username).where(User.is_admin == False, User.username.like('player%'))  # noqa: E712
+            ).scalars().all()
+            self.pages = max(1, len(ids[Game]) // 12)
+        if not all(ids.values()):
+            sys.exit("Database has no games, setups or reviews; run scripts/generate_data.py first")
+        self.games, self.setups, self.reviews = (Zipf(ids[m], rng) for m in (Game, SetupPost, Review))
+
+    def fill(self, rng, text):
+        return text.format(
+            game=self.games.draw(), setup=self.setups.draw(), review=self.reviews.draw(),
+            page=min(int(rng.paretovariate(1.2)), self.pages), sort=rng.choice(SETUP_SORTS)
+        )
+
+
+class TestClientSession:
+    def __init__(self):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        return self.client.open(path, method=method, data=data).status_code
+
+
+class HTTPSession:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None):
+        return self.session.request(method, self.base_url + path, data=data, allow_redirects=False, timeout=30).status_code
+
+
+def needs_login(scenario):
+    return any(label in MEMBER_LABELS for _, label, _, _, _ in scenario)
+
+
+def worker(make_session, scenario, targets, deadline, results, seed):
+    rng = random.Random(seed)
+    session = make_session()
+    weights = [step[0] for step in scenario]
+    if needs_login(scenario):
+        session.request('POST', '/login', {'username': rng.choice(targets.usernames), 'password': 'password123'})
+
+    while time.perf_counter() < deadline:
+        _, label, method, path, data = rng.choices(scenario, weights)[0]
+        path = targets.fill(rng, path)
+        data = {key: targets.fill(rng, value) for key, value in data.items()} if data else None
+        started = time.perf_counter()
+        try:
+            status = session.request(method, path, data)
+        except requests.RequestException:
+            status = 599
+        results[label].append((time.perf_counter() - started, status))
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def report(results, elapsed):
+    print(f"\n{'endpoint':<22}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    total = 0
+    for label in sorted(results):
+        if not results[label]:
+            continue
+        values = sorted(seconds for seconds, _ in results[label])
+        errors = sum(status >= 400 for _, status in results[label])
+        total += len(values)
+        print(f"{label:<22}{len(values):>9}{errors:>8}"
+              + ''.join(f"{percentile(values, p) * 1000:>9.1f}" for p in (50, 95, 99))
+              + f"{values[-1] * 1000:>9.1f}")
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='browse')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel virtual users (threads)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to run')
+    parser.add_argument('--url', help='base URL of a running server instead of the in-process test client')
+    parser.add_argument('--serve', action='store_true', help='start a local threaded WSGI server and target it')
+    parser.add_argument('--no-cache', action='store_true', help='disable the rendered-page cache (in-process only)')
+    parser.add_argument('--seed', type=int, default=470)
+    args = parser.parse_args()
+
+    if args.no_cache:
+        fragment_cache.enabled = False
+    targets = Targets(args.seed)
+    if needs_login(SCENARIOS[args.scenario]) and not targets.usernames:
+        sys.exit("No generated users to sign in as; run scripts/generate_data.py first")
+
+    server = None
+    if args.serve:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no access log per request
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        args.url = f"http://127.0.0.1:{server.server_port}"
+    if args.url:
+        make_session = lambda: HTTPSession(args.url)  # noqa: E731
+        target = args.url
+    else:
+        make_session = TestClientSession
+        target = 'Flask test client'
+    print(f"Scenario '{args.scenario}': {args.concurrency} users for {args.duration:g}s against {target}")
+
+    # One list per endpoint, created up front so worker threads only append
+    results = {label: [] for _, label, _, _, _ in SCENARIOS[args.scenario]}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(make_session, SCENARIOS[args.scenario], targets,
+                                              deadline, results, args.seed + i))
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if server is not None:
+        server.shutdown()
+    report(results, time.perf_counter() - started)
+
+if __name__ == '__main__':
+    main()
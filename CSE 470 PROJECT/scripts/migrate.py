@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema migrations (see migrations.py) to the configured database.
+Uses DATABASE_URL like the app; safe to re-run, and interrupted backfills resume.
+
+    python scripts/migrate.py --status
+    python scripts/migrate.py --dry-run
+    python scripts/migrate.py [--target VERSION] [--batch-size 1000] [--pause 0.05]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from migrations import MIGRATIONS, Migrator
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='list migrations and whether they are applied')
+    parser.add_argument('--dry-run', action='store_true', help='print what would run without changing anything')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per backfill transaction')
+    parser.add_argument('--pause', type=float, default=0.05, help='seconds to sleep between backfill batches')
+    args = parser.parse_args()
+
+    with create_app(blueprints=()).app_context():
+        migrator = Migrator(db.engine, db.metadata, dry_run=args.dry_run,
+                            batch_size=args.batch_size, pause=args.pause)
+        print(f"Database: {db.engine.url.render_as_string(hide_password=True)}")
+
+        if args.status:
+            applied = migrator.applied()
+            for version, name, _ in MIGRATIONS:
+                state = f"applied {applied[version]:%Y-%m-%d %H:%M}" if version in applied else 'pending'
+                print(f"{version:04d}  {name:<50}{state}")
+            return
+
+        try:
+            done = migrator.run(args.target)
+        except Exception as e:
+            print(f"\nMigration failed: {e}")
+            print("Fix the problem and re-run; completed steps and backfill batches are kept.")
+            sys.exit(1)
+        if not done:
+            print("Database is up to date.")
+
+if __name__ == '__main__':
+    main()
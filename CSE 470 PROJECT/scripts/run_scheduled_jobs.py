@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Run the periodic background jobs once: featured setup rotation, overdue lendings,
+expired temporary bans and uploads a restarted worker left unfinished. Requests do not run these sweeps, so schedule this from cron
+(or any scheduler), e.g. every 15 minutes:
+
+    */15 * * * * cd /path/to/project && python scripts/run_scheduled_jobs.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services import (
+    schedule_ban_expiry_check, schedule_featured_rotation, schedule_overdue_check, schedule_pending_upload_check
+)
+
+def run_scheduled_jobs():
+    with create_app(blueprints=()).app_context():
+        schedule_featured_rotation()
+        schedule_overdue_check()
+        schedule_ban_expiry_check()
+        schedule_pending_upload_check()
+
+if __name__ == '__main__':
+    run_scheduled_jobs()
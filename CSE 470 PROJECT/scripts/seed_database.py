@@ -4,12 +4,14 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app import app, db, User, Game, Review, SetupPost
+from app import create_app
+from extensions import db
+from models import User, Game, Review, SetupPost
 from werkzeug.security import generate_password_hash
 from datetime import datetime, date
 
 def seed_database():
-    with app.app_context():
+    with create_app(blueprints=()).app_context():
         # Create tables
         db.create_all()
         
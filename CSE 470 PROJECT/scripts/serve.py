@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Start the production server: gunicorn with gunicorn.conf.py (preloaded app, gthread
+workers sized from the CPU count), or waitress where gunicorn does not run (Windows).
+Settings default to gunicorn.conf.py and the environment (BIND, WEB_CONCURRENCY,
+GUNICORN_THREADS); the options below override them. uvicorn serves asgi.py, where the
+vote and notification JSON routes run as coroutines on an async engine.
+
+    python scripts/serve.py
+    python scripts/serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8
+    python scripts/serve.py --server waitress --threads 16
+    python scripts/serve.py --server uvicorn --workers 2
+
+Run `flask --app app init-db` (or scripts/migrate.py) first on a new database.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+def serve_gunicorn(args):
+    command = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(ROOT, 'gunicorn.conf.py')]
+    if args.bind:
+        command += ['--bind', args.bind]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    if args.threads:
+        command += ['--threads', str(args.threads)]
+    os.chdir(ROOT)
+    # Replace this process so signals (HUP, USR2, TERM) reach the gunicorn master directly
+    os.execv(sys.executable, command + ['wsgi:app'])
+
+def serve_waitress(args):
+    import waitress
+
+    # One process: threads are the only concurrency, so allow more of them than gunicorn's per-worker 4.
+    # The password hashing pools keep their CPU-sized defaults, which stay well below that.
+    os.environ.setdefault('DATABASE_PROFILE', 'production')
+    from wsgi import app
+
+    threads = args.threads or int(os.environ.get('WAITRESS_THREADS', multiprocessing.cpu_count() * 8))
+    bind = args.bind or os.environ.get('BIND', '127.0.0.1:8000')
+    print(f"Serving on http://{bind} with waitress, {threads} threads")
+    waitress.serve(app, listen=bind, threads=threads)
+
+def serve_uvicorn(args):
+    bind = args.bind or os.environ.get('BIND', '127.0.0.1:8000')
+    host, port = bind.rsplit(':', 1)
+    workers = args.workers or int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+    command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', host, '--port', port,
+               '--workers', str(workers), '--no-access-log']
+    if args.threads:
+        os.environ['ASGI_WSGI_THREADS'] = str(args.threads)
+    # Same defaults as gunicorn.conf.py; every worker imports asgi.py itself (no preload, no fork)
+    os.environ.setdefault('DATABASE_PROFILE', 'production')
+    os.environ.setdefault('FRAGMENT_CACHE_BACKEND', 'sqlite')
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+    os.environ.setdefault('PASSWORD_HASH_BACKLOG', '0')
+    os.environ.setdefault('PASSWORD_HASH_PRIORITY_WORKERS', '1')
+    os.environ.setdefault('PASSWORD_HASH_PRIORITY_BACKLOG', '1')
+    os.chdir(ROOT)
+    os.execv(sys.executable, command)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['gunicorn', 'waitress', 'uvicorn'],
+                        default='waitress' if os.name == 'nt' else 'gunicorn')
+    parser.add_argument('--bind', help='host:port (default 127.0.0.1:8000)')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes (default 2 x CPUs + 1 for gunicorn, one per CPU for uvicorn)')
+    parser.add_argument('--threads', type=int,
+                        help='threads per worker (gunicorn), in total (waitress) or for the Flask routes (uvicorn)')
+    args = parser.parse_args()
+
+    if args.server == 'gunicorn':
+        serve_gunicorn(args)
+    elif args.server == 'uvicorn':
+        serve_uvicorn(args)
+    else:
+        serve_waitress(args)
+
+if __name__ == '__main__':
+    main()
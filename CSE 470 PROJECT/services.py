@@ -0,0 +1,505 @@
+# Background jobs and helpers shared by the blueprints: overdue, ban and upload sweeps, uploads, votes, vouchers, the library
+
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import joinedload
+
+from extensions import db, metrics
+from models import (
+    User, GameLending, Purchase, Review, ReviewVote, SetupPost, SetupVote, Notification, AdminNotification, Voucher,
+    VoucherLedgerEntry
+)
+from uploads import (
+    pending_digest, prepare_upload, process_upload_async, remove_stale_staged, resolve_pending_upload
+)
+
+# Utility functions for overdue games and notifications
+@metrics.timed_job('overdue_check')
+def check_overdue_games():
+    """Check for overdue games and send notifications"""
+    current_time = datetime.utcnow()
+    overdue_lendings = GameLending.query.filter(
+        GameLending.borrower_id.isnot(None),
+        GameLending.is_returned == False,
+        GameLending.return_date < current_time,
+        GameLending.overdue_notification_sent == False
+    ).all()
+    
+    for lending in overdue_lendings:
+        # Mark as overdue
+        lending.is_overdue = True
+        lending.overdue_notification_sent = True
+        
+        # Send notification to borrower
+        borrower_notification = Notification(
+            user_id=lending.borrower_id,
+            title="Game Overdue - Return Required",
+            message=f"Your borrowed game '{lending.game.title}' is overdue. Please return it immediately to avoid penalties.",
+            notification_type='overdue'
+        )
+        db.session.add(borrower_notification)
+        
+        # Send notification to admin
+        admin_notification = AdminNotification(
+            title="User Overdue - Action Required",
+            message=f"User {lending.borrower.username} has not returned '{lending.game.title}' on time. Consider banning if this continues.",
+            notification_type='overdue_user',
+            related_user_id=lending.borrower_id
+        )
+        db.session.add(admin_notification)
+    
+    db.session.commit()
+    return len(overdue_lendings)
+
+def send_overdue_warning(user_id, game_title):
+    """Send a warning notification to a user about an overdue game"""
+    notification = Notification(
+        user_id=user_id,
+        title="Final Warning - Game Overdue",
+        message=f"Your borrowed game '{game_title}' is still overdue. This is your final warning before potential account suspension.",
+        notification_type='overdue'
+    )
+    db.session.add(notification)
+    db.session.commit()
+
+def ban_user(user_id, admin_id, reason, duration_days=None):
+    """Ban a user from the system"""
+    user = User.query.get(user_id)
+    if user and not user.is_admin:
+        user.is_banned = True
+        user.banned_at = datetime.utcnow()
+        user.banned_by = admin_id
+        user.ban_reason = reason
+        user.ban_duration_days = duration_days  # None for permanent, number for temporary
+        
+        # Send notification to banned user
+        if duration_days:
+            ban_message = f"Your account has been temporarily banned for {duration_days} days. Reason: {reason}. Contact support for more information."
+        else:
+            ban_message = f"Your account has been permanently banned. Reason: {reason}. Contact support for more information."
+        
+        notification = Notification(
+            user_id=user_id,
+            title="Account Banned",
+            message=ban_message,
+            notification_type='admin'
+        )
+        db.session.add(notification)
+        
+        # Send notification to admin
+        duration_text = f"for {duration_days} days" if duration_days else "permanently"
+        admin_notification = AdminNotification(
+            title="User Banned Successfully",
+            message=f"User {user.username} has been banned {duration_text}. Reason: {reason}",
+            notification_type='system',
+            related_user_id=user_id
+        )
+        db.session.add(admin_notification)
+        
+        db.session.commit()
+        return True
+    return False
+
+def unban_user(user_id, admin_id):
+    """Unban a user from the system"""
+    user = User.query.get(user_id)
+    if user and user.is_banned:
+        user.is_banned = False
+        user.banned_at = None
+        user.banned_by = None
+        user.ban_reason = None
+        user.ban_duration_days = None
+        
+        # Send notification to unbanned user
+        notification = Notification(
+            user_id=user_id,
+            title="Account Unbanned",
+            message="Your account has been unbanned. You can now access the platform again.",
+            notification_type='admin'
+        )
+        db.session.add(notification)
+        
+        # Send notification to admin
+        admin_notification = AdminNotification(
+            title="User Unbanned Successfully",
+            message=f"User {user.username} has been unbanned.",
+            notification_type='system',
+            related_user_id=user_id
+        )
+        db.session.add(admin_notification)
+        
+        db.session.commit()
+        return True
+    return False
+
+@metrics.timed_job('featured_rotation')
+def rotate_featured_setup():
+    """Feature the setup with the highest hot score and unfeature the rest"""
+    top_setup = SetupPost.query.order_by(SetupPost.hot_score.desc(), SetupPost.id.desc()).first()
+    if not top_setup:
+        return None
+    SetupPost.query.filter(
+        SetupPost.is_featured == True,
+        SetupPost.id != top_setup.id
+    ).update({'is_featured': False}, synchronize_session=False)
+    top_setup.is_featured = True
+    db.session.commit()
+    return top_setup
+
+def schedule_featured_rotation():
+    """Scheduled task to rotate the featured setup (can be called by a cron job or scheduler)"""
+    try:
+        featured = rotate_featured_setup()
+        print(f"Scheduled featured rotation completed. Featured setup: {featured.id if featured else None}")
+        return featured
+    except Exception as e:
+        print(f"Error in scheduled featured rotation: {e}")
+        return None
+
+def schedule_overdue_check():
+    """Scheduled task to check for overdue games (can be called by a cron job or scheduler)"""
+    try:
+        overdue_count = check_overdue_games()
+        print(f"Scheduled overdue check completed. Found {overdue_count} overdue items.")
+        return overdue_count
+    except Exception as e:
+        print(f"Error in scheduled overdue check: {e}")
+        return 0
+
+def schedule_ban_expiry_check():
+    """Scheduled task to lift expired temporary bans (can be called by a cron job or scheduler)"""
+    try:
+        unbanned_count = check_expired_bans()
+        print(f"Scheduled ban expiry check completed. Unbanned {unbanned_count} users.")
+        return unbanned_count
+    except Exception as e:
+        print(f"Error in scheduled ban expiry check: {e}")
+        return 0
+
+@metrics.timed_job('ban_expiry')
+def check_expired_bans():
+    """Clear expired temporary bans in one batch and notify the users; returns how many were lifted.
+
+    Requests never need this to run first: User.ban_in_effect() already ignores an expired ban.
+    """
+    current_time = datetime.utcnow()
+    temporary_bans = User.query.filter(
+        User.is_banned == True,
+        User.ban_duration_days.isnot(None),
+        User.banned_at.isnot(None)
+    ).all()
+    expired = [user for user in temporary_bans if not user.ban_in_effect(current_time)]
+    
+    for user in expired:
+        user.is_banned = False
+        user.banned_at = None
+        user.banned_by = None
+        user.ban_reason = None
+        user.ban_duration_days = None
+        
+        # Send notification to user
+        db.session.add(Notification(
+            user_id=user.id,
+            title="Account Unbanned",
+            message="Your temporary ban has expired. Your account is now active again.",
+            notification_type='admin'
+        ))
+        
+        # Send notification to admin
+        db.session.add(AdminNotification(
+            title="User Auto-Unbanned",
+            message=f"User {user.username} has been automatically unbanned after their temporary ban expired.",
+            notification_type='system',
+            related_user_id=user.id
+        ))
+    
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+# Upload processing helpers
+
+def stage_image_upload(file, subdir):
+    """Stage an uploaded image; returns (final_path, pending_path) relative to UPLOAD_FOLDER"""
+    return prepare_upload(
+        file,
+        current_app.config['UPLOAD_FOLDER'],
+        current_app.config['UPLOAD_STAGING_FOLDER'],
+        subdir,
+        inline=current_app.config['UPLOAD_WORKERS'] == 0
+    )
+
+def process_image_upload(model, record_id, field, pending_path, final_path, fallback, url_prefix=''):
+    """Resize a staged upload in the worker pool, then swap the placeholder for the real image.
+
+    Must be called after the record pointing at the placeholder is committed.
+    If processing fails the record falls back to its previous image. Identical
+    uploads share a placeholder, so only the row ``record_id`` is updated.
+    """
+    app = current_app._get_current_object()  # on_done runs on a pool thread, outside the request
+    column = getattr(model, field)
+    pending_value = url_prefix + pending_path
+    final_value = url_prefix + final_path
+
+    def on_done(future):
+        value = final_value if future.exception() is None else fallback
+        with app.app_context():
+            model.query.filter(model.id == record_id, column == pending_value).update(
+                {field: value}, synchronize_session=False
+            )
+            db.session.commit()
+
+    process_upload_async(
+        current_app.config['UPLOAD_FOLDER'],
+        current_app.config['UPLOAD_STAGING_FOLDER'],
+        pending_path,
+        on_done,
+        current_app.config['UPLOAD_WORKERS']
+    )
+
+# (model, column, URL prefix, image used when an upload is lost) for every column that can hold a placeholder
+PENDING_UPLOAD_COLUMNS = (
+    (User, 'profile_picture', '', 'default.jpg'),
+    (SetupPost, 'image_url', '/static/uploads/', '/static/uploads/setups/default_setup.jpg'),
+)
+
+@metrics.timed_job('pending_uploads')
+def resolve_pending_uploads():
+    """Settle placeholders left behind when a worker crashed or restarted mid-upload.
+
+    Rows point at the processed image if its variants exist (a staged file older than
+    UPLOAD_PENDING_TIMEOUT is processed here first) or at the default image if the upload
+    is lost; uploads younger than that are left to the worker pool. Staged files no row
+    is waiting for are deleted. Returns how many rows were updated.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    staging_folder = current_app.config['UPLOAD_STAGING_FOLDER']
+    max_age = current_app.config['UPLOAD_PENDING_TIMEOUT']
+    updated = 0
+    waiting = set()
+    for model, field, url_prefix, default in PENDING_UPLOAD_COLUMNS:
+        column = getattr(model, field)
+        values = db.session.execute(
+            select(column).where(column.like(f'{url_prefix}%pending\\_%.svg', escape='\\')).distinct()
+        ).scalars().all()
+        for value in values:
+            pending_path = value[len(url_prefix):]
+            if pending_digest(pending_path) is None:
+                continue
+            resolved = resolve_pending_upload(upload_folder, staging_folder, pending_path, max_age)
+            if resolved == pending_path:
+                waiting.add(pending_digest(pending_path))
+                continue
+            new_value = default if resolved is None else url_prefix + resolved
+            updated += model.query.filter(column == value).update({field: new_value}, synchronize_session=False)
+    db.session.commit()
+    remove_stale_staged(staging_folder, max_age, keep=waiting)
+    return updated
+
+def schedule_pending_upload_check():
+    """Scheduled task to settle uploads stuck on their placeholder (can be called by a cron job or scheduler)"""
+    try:
+        resolved_count = resolve_pending_uploads()
+        print(f"Scheduled pending upload check completed. Settled {resolved_count} records.")
+        return resolved_count
+    except Exception as e:
+        print(f"Error in scheduled pending upload check: {e}")
+        return 0
+
+def build_ban_context(user: User):
+    reason = user.ban_reason or 'No reason provided'
+    is_permanent = user.ban_duration_days is None
+    remaining_days = None
+    until_date_str = None
+    ban_end_date = user.ban_expires_at
+    if ban_end_date is not None:
+        delta = ban_end_date - datetime.utcnow()
+        # Ceiling of days remaining
+        remaining_days = max(1, delta.days + (1 if delta.seconds > 0 else 0))
+        until_date_str = ban_end_date.strftime('%Y-%m-%d')
+    return {
+        'reason': reason,
+        'is_permanent': is_permanent,
+        'remaining_days': remaining_days,
+        'until_date': until_date_str,
+    }
+
+# Votes and notification updates, shared by the Flask views and the async routes in asgi.py.
+# They take the session to work in and leave committing to the caller.
+REACTION_TYPES = ['like', 'dislike']
+BADGE_TYPES = ['cleanest', 'rgb', 'budget']
+
+def apply_review_vote(session, user, review_id, vote_type):
+    """Toggle ``user``'s like/dislike on a review; returns ``(json body, status)``"""
+    if vote_type not in REACTION_TYPES:
+        return {'success': False, 'message': 'Invalid vote type'}, 400
+    review = session.get(Review, review_id)
+    if not review:
+        return {'success': False, 'message': 'Review not found'}, 404
+    existing_vote = session.query(ReviewVote).filter_by(user_id=user.id, review_id=review_id).first()
+    
+    if existing_vote:
+        # Remove old vote
+        if existing_vote.vote_type == 'like':
+            review.likes -= 1
+        else:
+            review.dislikes -= 1
+        
+        if existing_vote.vote_type == vote_type:
+            # Remove vote entirely
+            session.delete(existing_vote)
+        else:
+            # Change vote
+            existing_vote.vote_type = vote_type
+            if vote_type == 'like':
+                review.likes += 1
+            else:
+                review.dislikes += 1
+    else:
+        # New vote
+        session.add(ReviewVote(user_id=user.id, review_id=review_id, vote_type=vote_type))
+        if vote_type == 'like':
+            review.likes += 1
+        else:
+            review.dislikes += 1
+    
+    # Award points to review author
+    if vote_type == 'like':
+        review.user.popularity_points = User.popularity_points + 5
+    
+    # Create notification
+    if review.user_id != user.id:
+        session.add(Notification(
+            user_id=review.user_id,
+            title='Review Interaction',
+            message=f'{user.username} {vote_type}d your review'
+        ))
+    return {'success': True}, 200
+
+def apply_setup_vote(session, user, setup_id, vote_type):
+    """Toggle a reaction (like/dislike) or badge vote (cleanest/rgb/budget) on a setup;
+    returns ``(json body, status)``. Reactions and badges are independent of each other."""
+    if user.is_admin:
+        return {'success': False, 'message': 'Admins cannot vote on setups.'}, 403
+    if vote_type in REACTION_TYPES:
+        group = REACTION_TYPES
+    elif vote_type in BADGE_TYPES:
+        group = BADGE_TYPES
+    else:
+        return {'success': False, 'message': 'Invalid vote type'}, 400
+    setup = session.get(SetupPost, setup_id)
+    if not setup:
+        return {'success': False, 'message': 'Setup not found'}, 404
+
+    # vote type -> counter column; counters may be None on old rows
+    counters = {'like': 'likes', 'dislike': 'dislikes', 'cleanest': 'cleanest_votes',
+                'rgb': 'rgb_votes', 'budget': 'budget_votes'}
+    for attr in counters.values():
+        setattr(setup, attr, getattr(setup, attr) or 0)
+
+    existing = session.query(SetupVote).filter(
+        SetupVote.user_id == user.id,
+        SetupVote.setup_id == setup_id,
+        SetupVote.vote_type.in_(group)
+    ).first()
+    if existing:
+        # Take back the previous vote of this group
+        attr = counters[existing.vote_type]
+        setattr(setup, attr, max(getattr(setup, attr) - 1, 0))
+        if existing.vote_type == vote_type:
+            # toggle off
+            session.delete(existing)
+        else:
+            existing.vote_type = vote_type
+            setattr(setup, counters[vote_type], getattr(setup, counters[vote_type]) + 1)
+    else:
+        session.add(SetupVote(user_id=user.id, setup_id=setup_id, vote_type=vote_type))
+        setattr(setup, counters[vote_type], getattr(setup, counters[vote_type]) + 1)
+
+    setup.update_hot_score()
+    return {'success': True}, 200
+
+def mark_notifications_read(session, user_id):
+    """Mark all of a user's notifications read; returns how many changed"""
+    return session.query(Notification).filter_by(user_id=user_id, is_read=False).update(
+        {'is_read': True}, synchronize_session=False
+    )
+
+# Vouchers. Points and vouchers change through conditional UPDATEs, so two concurrent
+# requests cannot both spend the same points or the same voucher; every change is
+# appended to the voucher ledger. They leave committing to the caller.
+
+def redeem_points_for_voucher(session, user_id, cost, amount):
+    """Trade ``cost`` popularity points for a voucher; returns ``(voucher, points left)``,
+    or ``None`` (and changes nothing) if the user has fewer than ``cost`` points"""
+    balance = session.execute(
+        update(User)
+        .where(User.id == user_id, User.popularity_points >= cost)
+        .values(popularity_points=User.popularity_points - cost)
+        .returning(User.popularity_points)
+    ).scalar()
+    if balance is None:
+        return None
+    voucher = Voucher(user_id=user_id, discount_amount=amount)
+    session.add(voucher)
+    session.flush()
+    session.add(VoucherLedgerEntry(user_id=user_id, voucher_id=voucher.id, event='redeemed',
+                                   points=-cost, amount=amount, balance=balance))
+    return voucher, balance
+
+def use_voucher(session, user_id, voucher_id):
+    """Mark the user's unused voucher used; returns its discount, or ``None`` if it is not available"""
+    discount = session.execute(
+        update(Voucher)
+        .where(Voucher.id == voucher_id, Voucher.user_id == user_id, Voucher.is_used == False)  # noqa: E712
+        .values(is_used=True, used_at=datetime.utcnow())
+        .returning(Voucher.discount_amount)
+    ).scalar()
+    if discount is not None:
+        session.add(VoucherLedgerEntry(user_id=user_id, voucher_id=voucher_id, event='used', amount=discount))
+    return discount
+
+# The user's library: owned games a page at a time, newest purchase first, and totals
+# from one aggregate query, so pages cost the same for ten games or ten thousand
+LIBRARY_PER_PAGE = 24
+
+def library_summary(user_id):
+    """Games owned, total spent and reviews written, in one query"""
+    reviews_written = select(func.count(Review.id)).where(Review.user_id == user_id).scalar_subquery()
+    games_owned, total_spent, reviews = db.session.execute(
+        select(func.count(Purchase.id), func.coalesce(func.sum(Purchase.price_paid), 0), reviews_written)
+        .where(Purchase.user_id == user_id)
+    ).one()
+    return {'games_owned': games_owned, 'total_spent': total_spent, 'reviews_written': reviews}
+
+def encode_library_cursor(purchase):
+    return base64.urlsafe_b64encode(json.dumps([purchase.purchase_date.isoformat(), purchase.id]).encode()).decode()
+
+def decode_library_cursor(cursor):
+    """Return (purchase date, id) from a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(value), int(last_id)
+    except (ValueError, TypeError):
+        return None
+
+def get_library_page(user_id, cursor=None, per_page=LIBRARY_PER_PAGE):
+    """Fetch one page of the user's purchases (with their games) and the cursor for the next page"""
+    query = Purchase.query.options(joinedload(Purchase.game)).filter(Purchase.user_id == user_id).order_by(
+        Purchase.purchase_date.desc(), Purchase.id.desc()
+    )
+    position = decode_library_cursor(cursor)
+    if position:
+        query = query.filter(db.tuple_(Purchase.purchase_date, Purchase.id) < position)
+    purchases = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(purchases) > per_page:
+        purchases = purchases[:per_page]
+        next_cursor = encode_library_cursor(purchases[-1])
+    return purchases, next_cursor
@@ -8,6 +8,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // Check for notifications
   checkNotifications()
+  listenForNotifications()
 
   // Auto-hide alerts after 5 seconds
   // setTimeout(() => {
@@ -32,6 +33,36 @@ function checkNotifications() {
   }
 }
 
+// Live notifications over server-sent events: bump the badge and show each one as an alert
+function listenForNotifications() {
+  const badge = document.getElementById("notificationBadge")
+  if (!badge || !badge.dataset.stream || !window.EventSource) return
+
+  const source = new EventSource(badge.dataset.stream)
+  source.addEventListener("notification", (event) => {
+    const notification = JSON.parse(event.data)
+    badge.textContent = (parseInt(badge.textContent, 10) || 0) + 1
+    badge.style.display = "inline"
+    showNotification(notification)
+  })
+}
+
+function showNotification(notification) {
+  const alert = document.createElement("div")
+  alert.className = "alert alert-info alert-dismissible fade show"
+  const title = document.createElement("strong")
+  title.textContent = notification.title
+  alert.append(title, " ", notification.message)
+  const close = document.createElement("button")
+  close.type = "button"
+  close.className = "btn-close"
+  close.dataset.bsDismiss = "alert"
+  alert.appendChild(close)
+
+  const container = document.querySelector(".container")
+  container.insertBefore(alert, container.firstChild)
+}
+
 // Voice preview functionality
 function playVoicePreview(audioUrl) {
   const audio = new Audio(audioUrl)
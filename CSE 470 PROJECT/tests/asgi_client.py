@@ -0,0 +1,42 @@
+# Minimal ASGI client for the coroutine routes in asgi.py (no HTTP client library needed)
+
+import asyncio
+from urllib.parse import urlencode
+
+
+def session_cookie(flask_app, user_id):
+    """Cookie header carrying a Flask-Login session for ``user_id``"""
+    interface = flask_app.session_interface
+    value = interface.get_signing_serializer(flask_app).dumps({'_user_id': str(user_id), '_fresh': True})
+    return f"{interface.get_cookie_name(flask_app)}={value}"
+
+
+def scope(method, path, user_id=None, flask_app=None, headers=()):
+    headers = [(b'host', b'localhost'), *headers]
+    if user_id is not None:
+        headers.append((b'cookie', session_cookie(flask_app, user_id).encode()))
+    return {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': headers, 'client': ('127.0.0.1', 1234), 'server': ('localhost', 80),
+    }
+
+
+async def request(routes, method, path, form=None, user_id=None):
+    """``(status, headers, body)`` of one request to the ASGI app ``routes``"""
+    body = urlencode(form or {}).encode()
+    headers = [(b'content-type', b'application/x-www-form-urlencoded')] if form is not None else []
+    received = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    messages = []
+
+    async def receive():
+        if received:
+            return received.pop()
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        messages.append(message)
+
+    await routes(scope(method, path, user_id, routes.flask_app, headers), receive, send)
+    start = messages[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
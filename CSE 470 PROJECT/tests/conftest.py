@@ -0,0 +1,59 @@
+# Shared fixtures: an app on a throwaway database with a few rows to render.
+# Set TEST_DATABASE_URL (e.g. a scratch PostgreSQL database) to run the suite there instead of SQLite.
+
+import os
+
+import pytest
+from dotenv import load_dotenv
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from database import database_url
+from extensions import db
+from models import Game, SetupPost, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    load_dotenv()
+    url = os.environ.get('TEST_DATABASE_URL')
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': database_url(url) if url else f"sqlite:///{tmp_path / 'test.db'}",
+        'FRAGMENT_CACHE_BACKEND': 'lru',
+        'NOTIFICATION_FANOUT_DIR': '',
+        'UPLOAD_WORKERS': 0,
+        'QUERY_STATS_SLOW_MS': None,
+    })
+    with app.app_context():
+        db.create_all()
+        password = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+        db.session.add_all([
+            User(username='alice', email='alice@example.com', password_hash=password, popularity_points=10),
+            User(username='bob', email='bob@example.com', password_hash=password, popularity_points=20),
+        ])
+        db.session.add(Game(title='Test Game', description='A game', price=19.99, genre='Action', platform='PC'))
+        db.session.flush()
+        db.session.add(SetupPost(user_id=1, title='Desk', image_url='/static/x.jpg'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        if url:
+            db.drop_all()  # the next test starts from empty tables (and sequences) again
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def sign_in(client, username):
+    """Put ``username`` in the client's session, as Flask-Login does at login"""
+    with client.application.app_context():
+        user_id = db.session.execute(db.select(User.id).where(User.username == username)).scalar_one()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return user_id
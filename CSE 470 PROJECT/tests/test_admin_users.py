@@ -0,0 +1,104 @@
+# Admin user page (views/admin.py) reads only; the overdue sweep runs on POST and in the scheduled jobs.
+# Banned users are sent to the ban page and their writes refused (views/account.enforce_ban).
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from conftest import sign_in
+from extensions import db
+from models import AdminNotification, GameLending, Notification, SetupVote, User
+
+
+@pytest.fixture
+def admin_client(app, client):
+    with app.app_context():
+        db.session.get(User, 1).is_admin = True
+        db.session.commit()
+    sign_in(client, 'alice')
+    return client
+
+
+def add_borrowers(app, count, flagged=True):
+    """``count`` users, each with two unreturned loans past their return date"""
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    with app.app_context():
+        password = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+        start = db.session.query(User).count()
+        users = [User(username=f'user{start + n}', email=f'user{start + n}@example.com', password_hash=password)
+                 for n in range(count)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(
+            GameLending(lender_id=2, borrower_id=user.id, game_id=1, return_date=yesterday,
+                        is_overdue=flagged, overdue_notification_sent=flagged)
+            for user in users for _ in range(2)
+        )
+        db.session.commit()
+
+
+def statements_of(app, client, url):
+    """``(response, SQL statements run)`` for one GET"""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+    return response, statements
+
+
+def test_user_page_does_not_write(app, admin_client):
+    add_borrowers(app, 1, flagged=False)
+    response, statements = statements_of(app, admin_client, '/admin/users')
+    assert response.status_code == 200
+    assert all(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+    with app.app_context():
+        assert db.session.query(GameLending).filter_by(is_overdue=True).count() == 0
+        assert db.session.query(Notification).count() == 0
+
+
+def test_user_page_query_count_does_not_grow_with_borrowers(app, admin_client):
+    add_borrowers(app, 2)
+    response, few = statements_of(app, admin_client, '/admin/users')
+    assert b'2 overdue' in response.data and b'Total overdue games: <strong>4</strong>' in response.data
+    add_borrowers(app, 6)
+    response, many = statements_of(app, admin_client, '/admin/users')
+    assert b'Total overdue games: <strong>16</strong>' in response.data
+    assert len(many) == len(few)
+
+
+def test_overdue_check_runs_on_post_only(app, admin_client):
+    add_borrowers(app, 1, flagged=False)
+    assert admin_client.get('/admin/check_overdue').status_code == 405
+    assert admin_client.post('/admin/check_overdue').status_code == 302
+    with app.app_context():
+        assert db.session.query(GameLending).filter_by(is_overdue=True).count() == 2
+        assert db.session.query(Notification).filter_by(notification_type='overdue').count() == 2
+        assert db.session.query(AdminNotification).count() == 2
+
+
+def test_banned_users_are_refused_writes(app, client):
+    with app.app_context():
+        db.session.get(User, 2).is_banned = True
+        db.session.add(Notification(user_id=2, title='Banned', message='You are banned'))
+        db.session.commit()
+    sign_in(client, 'bob')
+
+    response = client.post('/vote_setup', data={'setup_id': 1, 'vote_type': 'like'})
+    assert response.status_code == 403
+    assert response.get_json() == {'success': False, 'message': 'Account banned'}
+    assert client.get('/').headers['Location'].endswith('/banned')
+    # Reading and clearing their notifications is still allowed
+    assert client.post('/mark_notifications_read').status_code == 200
+    with app.app_context():
+        assert db.session.query(SetupVote).count() == 0
+        assert db.session.query(Notification).filter_by(is_read=False).count() == 0
@@ -0,0 +1,104 @@
+# Read-only JSON API (views/api.py): field selection, batch fetch, keyset pages, scopes and errors
+
+import gzip
+
+import pytest
+
+from extensions import db
+from models import Game, GameLending, Notification, Review
+from views.api import RESOURCES
+
+from conftest import sign_in
+
+
+@pytest.fixture
+def games(app):
+    """Ids of eight games, Test Game (id 1) included"""
+    with app.app_context():
+        db.session.add_all([Game(title=f'Game {n}', price=n, genre='Puzzle', platform='PC') for n in range(2, 9)])
+        db.session.commit()
+        return db.session.execute(db.select(Game.id).order_by(Game.id)).scalars().all()
+
+
+def test_fields_select_columns(client):
+    assert client.get('/api/v1/games?fields=title').get_json()['data'] == [{'id': 1, 'title': 'Test Game'}]
+    default = client.get('/api/v1/games').get_json()['data'][0]
+    assert list(default) == list(RESOURCES['games'].default)
+
+
+def test_joined_fields_join_only_when_asked(client):
+    reviews = RESOURCES['reviews']
+    assert 'JOIN' not in str(reviews.statement(('id', 'rating')))
+    assert 'JOIN' in str(reviews.statement(('id', 'username')))
+    with client.application.app_context():
+        db.session.add(Review(user_id=2, game_id=1, rating=4, content='Fine'))
+        db.session.commit()
+    data = client.get('/api/v1/reviews?fields=username,rating').get_json()['data']
+    assert data == [{'id': 1, 'username': 'bob', 'rating': 4}]
+
+
+def test_keyset_pages_cover_every_row_once(client, games):
+    for order, expected in (('desc', games[::-1]), ('asc', games)):
+        seen, after = [], None
+        while True:
+            url = f'/api/v1/games?fields=id&limit=3&order={order}' + (f'&after={after}' if after else '')
+            page = client.get(url).get_json()
+            assert len(page['data']) <= 3
+            seen += [row['id'] for row in page['data']]
+            after = page['next']
+            if after is None:
+                break
+        assert seen == expected
+
+
+def test_filters_apply_before_the_page(client, games):
+    data = client.get('/api/v1/games?fields=genre&genre=puz&limit=200').get_json()['data']
+    assert len(data) == 7 and {row['genre'] for row in data} == {'Puzzle'}
+
+
+def test_batch_fetch_lists_missing_ids(client, games):
+    body = client.get(f'/api/v1/games?fields=title&ids={games[2]},999,{games[0]},999').get_json()
+    assert [row['id'] for row in body['data']] == [games[0], games[2]]
+    assert body['missing'] == [999]
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/v1/widgets', 404),
+    ('/api/v1/games/999', 404),
+    ('/api/v1/games?fields=title,secret', 400),
+    ('/api/v1/games?ids=1,x', 400),
+    ('/api/v1/games?ids=' + ','.join(['1'] * 201), 400),
+    ('/api/v1/reviews?game_id=abc', 400),
+    ('/api/v1/notifications', 401),
+])
+def test_errors_are_json(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['error']
+
+
+def test_scopes_limit_rows_to_the_user(client):
+    with client.application.app_context():
+        db.session.add_all([
+            Notification(user_id=1, title='Mine', message='for alice'),
+            Notification(user_id=2, title='Theirs', message='for bob'),
+            GameLending(lender_id=2, game_id=1),                   # open offer
+            GameLending(lender_id=2, borrower_id=2, game_id=1),    # someone else's loan
+        ])
+        db.session.commit()
+    sign_in(client, 'alice')
+    assert [row['title'] for row in client.get('/api/v1/notifications').get_json()['data']] == ['Mine']
+    assert client.get('/api/v1/notifications/2').status_code == 404
+    assert [row['id'] for row in client.get('/api/v1/lendings').get_json()['data']] == [1]
+
+
+def test_large_bodies_are_compressed(client, games):
+    with client.application.app_context():
+        db.session.execute(db.update(Game).values(description='A long description. ' * 20))
+        db.session.commit()
+    response = client.get('/api/v1/games?fields=id,title,description,genre,platform',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'"Game 8"' in gzip.decompress(response.get_data())
+    assert 'Content-Encoding' not in client.get('/api/v1/games?fields=id').headers
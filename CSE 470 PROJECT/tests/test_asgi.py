@@ -0,0 +1,102 @@
+# Coroutine write routes of asgi.py: same results as the Flask views, on the async engine
+
+import asyncio
+import json
+
+import pytest
+
+from asgi import create_asgi_app
+from extensions import db
+from models import Notification, SetupPost, SetupVote, User
+
+from asgi_client import request
+
+
+@pytest.fixture
+def routes(app):
+    return create_asgi_app(app)
+
+
+def run(routes, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await routes.engine.dispose()  # its connections belong to this event loop
+    return asyncio.run(main())
+
+
+def test_votes_need_a_signed_in_user(routes):
+    async def scenario():
+        return await request(routes, 'POST', '/vote_setup', {'setup_id': 1, 'vote_type': 'like'})
+    status, headers, body = run(routes, scenario)
+    assert status == 401
+    assert headers[b'content-type'] == b'application/json'
+    assert json.loads(body) == {'success': False, 'message': 'Login required'}
+
+
+def test_setup_vote_is_stored_and_toggles(app, routes):
+    async def scenario():
+        first = await request(routes, 'POST', '/vote_setup', {'setup_id': 1, 'vote_type': 'cleanest'}, user_id=2)
+        with app.app_context():
+            vote = db.session.query(SetupVote).one()
+            after_first = (vote.user_id, vote.vote_type, db.session.get(SetupPost, 1).cleanest_votes)
+        second = await request(routes, 'POST', '/vote_setup', {'setup_id': 1, 'vote_type': 'cleanest'}, user_id=2)
+        return first, after_first, second
+
+    first, after_first, second = run(routes, scenario)
+    assert first[0] == 200 and json.loads(first[2]) == {'success': True}
+    assert after_first == (2, 'cleanest', 1)
+    assert second[0] == 200
+    with app.app_context():
+        assert db.session.query(SetupVote).count() == 0
+
+
+def test_errors_come_back_as_json(routes):
+    async def scenario():
+        return [
+            await request(routes, 'POST', '/vote_setup', {'vote_type': 'like'}, user_id=2),
+            await request(routes, 'POST', '/vote_setup', {'setup_id': 'x', 'vote_type': 'like'}, user_id=2),
+            await request(routes, 'POST', '/vote_setup', {'setup_id': 1, 'vote_type': 'shiny'}, user_id=2),
+            await request(routes, 'POST', '/vote_setup', {'setup_id': 99, 'vote_type': 'like'}, user_id=2),
+            await request(routes, 'POST', '/vote_review', {'review_id': 99, 'vote_type': 'like'}, user_id=2),
+        ]
+    assert [status for status, _, _ in run(routes, scenario)] == [400, 400, 400, 404, 404]
+
+
+def test_banned_users_cannot_write(app, routes):
+    with app.app_context():
+        db.session.get(User, 2).is_banned = True
+        db.session.commit()
+
+    async def scenario():
+        return await request(routes, 'POST', '/vote_setup', {'setup_id': 1, 'vote_type': 'like'}, user_id=2)
+    status, _, body = run(routes, scenario)
+    assert status == 403
+    assert json.loads(body)['message'] == 'Account banned'
+    with app.app_context():
+        assert db.session.query(SetupVote).count() == 0
+
+
+def test_mark_notifications_read(app, routes):
+    with app.app_context():
+        db.session.add_all([Notification(user_id=1, title='Hi', message='one'),
+                            Notification(user_id=1, title='Hi', message='two'),
+                            Notification(user_id=2, title='Hi', message='not yours')])
+        db.session.commit()
+
+    async def scenario():
+        return await request(routes, 'POST', '/mark_notifications_read', {}, user_id=1)
+    status, _, body = run(routes, scenario)
+    assert (status, json.loads(body)) == (200, {'success': True, 'updated': 2})
+    with app.app_context():
+        unread = db.session.query(Notification.user_id).filter_by(is_read=False).all()
+        assert unread == [(2,)]
+
+
+def test_other_requests_go_to_flask(routes):
+    async def scenario():
+        return await request(routes, 'GET', '/leaderboard')
+    status, headers, body = run(routes, scenario)
+    assert status == 200
+    assert b'text/html' in headers[b'content-type']
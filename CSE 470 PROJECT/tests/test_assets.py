@@ -0,0 +1,111 @@
+# Static asset fingerprinting (assets.py): hashed URLs and far-future immutable caching
+
+import hashlib
+import os
+import shutil
+
+import pytest
+from flask import Flask, render_template_string
+
+from assets import build_manifest, init_assets
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    folder = tmp_path / 'static'
+    shutil.copytree(os.path.join(STATIC, 'css'), folder / 'css')
+    shutil.copytree(os.path.join(STATIC, 'js'), folder / 'js')
+    return folder
+
+
+def make_app(static_folder):
+    app = Flask(__name__, static_folder=str(static_folder))
+    init_assets(app)
+    return app
+
+
+def content_hash(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+
+
+def asset_url(app, filename):
+    with app.test_request_context():
+        return render_template_string("{{ url_for('static', filename=filename) }}", filename=filename)
+
+
+def test_static_urls_carry_the_content_hash(static_folder):
+    build_manifest(str(static_folder))
+    app = make_app(static_folder)
+
+    assert asset_url(app, 'css/style.css') == f"/static/css/style.{content_hash(static_folder / 'css/style.css')}.css"
+    assert asset_url(app, 'js/main.js') == f"/static/js/main.{content_hash(static_folder / 'js/main.js')}.js"
+
+
+def test_fingerprinted_assets_are_cached_as_immutable(static_folder):
+    build_manifest(str(static_folder))
+    client = make_app(static_folder).test_client()
+
+    response = client.get(asset_url(client.application, 'css/style.css'))
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE
+    assert response.data == (static_folder / 'css/style.css').read_bytes()
+
+    compressed = client.get(asset_url(client.application, 'js/main.js'), headers={'Accept-Encoding': 'gzip'})
+    assert compressed.content_encoding == 'gzip'
+    assert compressed.headers['Cache-Control'] == IMMUTABLE
+    assert 'Accept-Encoding' in compressed.vary
+
+
+@pytest.mark.parametrize('reverse', [False, True], ids=['ascending', 'descending'])
+def test_rebuilding_unchanged_sources_keeps_every_file(static_folder, monkeypatch, reverse):
+    walk = os.walk
+
+    def ordered_walk(top):
+        # os.walk lists files in directory order, which differs between file systems
+        for dirpath, dirnames, filenames in walk(top):
+            filenames.sort(reverse=reverse)
+            yield dirpath, dirnames, filenames
+
+    monkeypatch.setattr('assets.os.walk', ordered_walk)
+    client = make_app(static_folder).test_client()
+    manifests = []
+    for _ in range(3):
+        manifest = build_manifest(str(static_folder))
+        manifests.append(manifest)
+        for hashed in manifest.values():
+            assert (static_folder / hashed).is_file()
+            assert client.get(f'/static/{hashed}').status_code == 200
+    assert manifests[0] == manifests[1] == manifests[2]
+
+
+def test_changed_file_gets_a_new_url(static_folder):
+    build_manifest(str(static_folder), now=1000)
+    old_url = asset_url(make_app(static_folder), 'css/style.css')
+
+    with open(static_folder / 'css/style.css', 'a') as fh:
+        fh.write('\nbody { margin: 0; }\n')
+    build_manifest(str(static_folder), retention=3600, now=2000)
+    app = make_app(static_folder)
+
+    new_url = asset_url(app, 'css/style.css')
+    assert new_url != old_url
+    assert app.test_client().get(new_url).status_code == 200
+    # Pages cached before the deploy still get the old copy for a while
+    assert app.test_client().get(old_url).status_code == 200
+    build_manifest(str(static_folder), retention=3600, now=2000 + 3599)
+    assert app.test_client().get(old_url).status_code == 200
+    build_manifest(str(static_folder), retention=3600, now=2000 + 3600)
+    assert app.test_client().get(old_url).status_code == 404
+    assert app.test_client().get(new_url).status_code == 200
+
+
+def test_unfingerprinted_names_are_not_immutable(static_folder):
+    client = make_app(static_folder).test_client()
+
+    assert asset_url(client.application, 'css/style.css') == '/static/css/style.css'  # no manifest yet
+    response = client.get('/static/css/style.css')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
@@ -0,0 +1,91 @@
+# ETag revalidation (fragment_cache.conditional): 304 without rendering, and new ETags after writes
+
+import pytest
+from flask import template_rendered
+
+from conftest import sign_in
+from extensions import db
+from models import Review, SetupPost, User
+
+PAGES = ['/game/1', '/setups', '/leaderboard']
+
+
+def bump(path):
+    """Commit a change to a row the page at ``path`` depends on"""
+    if path.startswith('/game/'):
+        db.session.add(Review(user_id=2, game_id=1, rating=5, content='Great'))
+    elif path == '/setups':
+        db.session.add(SetupPost(user_id=2, title='Another desk', image_url='/static/y.jpg'))
+    else:
+        db.session.get(User, 2).popularity_points += 5
+    db.session.commit()
+
+
+@pytest.fixture
+def rendered(app):
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield templates
+    template_rendered.disconnect(record, app)
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_repeat_request_gets_304_without_rendering(client, rendered, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert rendered
+
+    rendered.clear()
+    again = client.get(path, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+    assert rendered == []
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_write_to_a_dependency_changes_the_etag(app, client, path):
+    etag = client.get(path).headers['ETag']
+    with app.app_context():
+        bump(path)
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_pending_flash_is_rendered_not_304(client, path):
+    etag = client.get(path).headers['ETag']
+    with client.session_transaction() as session:
+        session['_flashes'] = [('message', 'Saved')]
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Saved' in response.data
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_etag_differs_per_viewer(app, path):
+    anonymous, alice, bob = app.test_client(), app.test_client(), app.test_client()
+    sign_in(alice, 'alice')
+    sign_in(bob, 'bob')
+
+    etags = {client.get(path).headers['ETag'] for client in (anonymous, alice, bob)}
+    assert len(etags) == 3
+
+    # One viewer's ETag does not revalidate another viewer's page
+    response = bob.get(path, headers={'If-None-Match': alice.get(path).headers['ETag']})
+    assert response.status_code == 200
+
+
+def test_response_must_be_revalidated(client):
+    response = client.get('/leaderboard')
+    assert response.cache_control.private
+    assert response.cache_control.no_cache
+    assert 'Cookie' in response.vary
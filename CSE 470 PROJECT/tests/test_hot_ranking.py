@@ -0,0 +1,60 @@
+# Hot score (SetupPost.update_hot_score) and the scheduled featured-setup rotation
+
+from datetime import datetime, timedelta
+
+from conftest import sign_in
+from extensions import db
+from models import HOT_SCORE_DECAY_SECONDS, SetupPost
+from services import rotate_featured_setup
+
+
+def setup_post(title, created_at, likes=0, **votes):
+    setup = SetupPost(user_id=1, title=title, image_url='/static/x.jpg', created_at=created_at, likes=likes, **votes)
+    setup.update_hot_score()
+    db.session.add(setup)
+    return setup
+
+
+def test_votes_count_logarithmically_against_age(app):
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        old = setup_post('Old', start, likes=100)
+        newer = setup_post('Newer', start + timedelta(seconds=HOT_SCORE_DECAY_SECONDS), likes=10)
+        newest = setup_post('Newest', start + timedelta(seconds=2 * HOT_SCORE_DECAY_SECONDS), likes=1)
+        # Each decay period is worth ten times the votes
+        assert old.hot_score == newer.hot_score == newest.hot_score
+        assert setup_post('Disliked', start, dislikes=5).hot_score < setup_post('Unvoted', start).hot_score
+        # Badge votes weigh more than likes
+        assert setup_post('Badged', start, cleanest_votes=10).hot_score > setup_post('Liked', start, likes=10).hot_score
+
+
+def test_vote_moves_a_setup_up_the_hot_sort(app, client):
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        first, second = setup_post('First', start + timedelta(minutes=1)), setup_post('Second', start)
+        db.session.commit()
+        first, second, before = first.id, second.id, second.hot_score
+
+    sign_in(client, 'bob')
+    for vote_type in ('like', 'cleanest'):  # a single point is log10(1) = 0
+        assert client.post('/vote_setup', data={'setup_id': second, 'vote_type': vote_type}).get_json()['success']
+
+    with app.app_context():
+        assert db.session.get(SetupPost, second).hot_score > before
+        ranked = db.session.execute(
+            db.select(SetupPost.id).order_by(SetupPost.hot_score.desc(), SetupPost.id.desc())
+        ).scalars().all()
+        assert ranked.index(second) < ranked.index(first)
+
+
+def test_rotation_features_only_the_hottest_setup(app):
+    start = datetime(2026, 1, 1)
+    with app.app_context():
+        stale = setup_post('Was featured', start, is_featured=True)
+        hot = setup_post('Hot', start + timedelta(days=1), likes=5)
+        db.session.commit()
+
+        assert rotate_featured_setup().id == hot.id
+        featured = db.session.execute(db.select(SetupPost.id).where(SetupPost.is_featured == True)).scalars().all()  # noqa: E712
+        assert featured == [hot.id]
+        assert not db.session.get(SetupPost, stale.id).is_featured
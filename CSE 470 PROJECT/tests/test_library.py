@@ -0,0 +1,102 @@
+# Game library (account.library, account.profile) and the ownership check on the game page
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import sign_in
+from extensions import db
+from models import Game, Purchase, Review
+from services import LIBRARY_PER_PAGE, get_library_page, library_summary
+
+OWNED = 30
+
+
+@pytest.fixture
+def library(app):
+    """Alice owns OWNED games, bought in pairs on the same second (ties for the cursor); bob owns one"""
+    with app.app_context():
+        games = [Game(title=f'Owned {n:02d}', price=n, genre='Action', platform='PC') for n in range(OWNED)]
+        db.session.add_all(games)
+        db.session.flush()
+        start = datetime(2024, 1, 1)
+        db.session.add_all(
+            Purchase(user_id=1, game_id=game.id, price_paid=game.price, purchase_date=start + timedelta(seconds=n // 2))
+            for n, game in enumerate(games)
+        )
+        db.session.add(Purchase(user_id=2, game_id=1, price_paid=99, purchase_date=start))
+        db.session.add(Review(user_id=1, game_id=games[0].id, rating=5, content='Great'))
+        db.session.commit()
+        return [game.id for game in games]
+
+
+def test_pages_list_every_purchase_once_newest_first(app, library):
+    with app.app_context():
+        expected = [purchase.id for purchase in Purchase.query.filter_by(user_id=1).order_by(
+            Purchase.purchase_date.desc(), Purchase.id.desc())]
+        seen, cursor = [], None
+        while True:
+            page, cursor = get_library_page(1, cursor, per_page=4)
+            seen += [purchase.id for purchase in page]
+            if cursor is None:
+                break
+    assert seen == expected and len(seen) == OWNED
+
+
+def test_library_view_follows_the_cursor(client, library):
+    sign_in(client, 'alice')
+    first = client.get('/library').get_data(as_text=True)
+    assert first.count('Owned ') == LIBRARY_PER_PAGE
+    cursor = re.search(r'cursor=([^"&]+)', first).group(1)
+    second = client.get(f'/library?cursor={cursor}').get_data(as_text=True)
+    assert second.count('Owned ') == OWNED - LIBRARY_PER_PAGE
+    assert 'Older purchases' not in second
+    titles = set(re.findall(r'Owned \d\d', first)) | set(re.findall(r'Owned \d\d', second))
+    assert len(titles) == OWNED
+
+
+@pytest.mark.parametrize('cursor', ['garbage', 'WzEsMl0=', 'bnVsbA==', 'WyJ4Il0='])  # [1,2], null, ["x"]
+def test_bad_cursors_start_from_the_newest_page(client, library, cursor):
+    sign_in(client, 'alice')
+    response = client.get(f'/library?cursor={cursor}')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('Owned ') == LIBRARY_PER_PAGE
+
+
+def test_summary_counts_only_the_users_rows(app, library):
+    with app.app_context():
+        assert library_summary(1) == {'games_owned': OWNED, 'total_spent': sum(range(OWNED)), 'reviews_written': 1}
+        assert library_summary(2) == {'games_owned': 1, 'total_spent': 99, 'reviews_written': 0}
+
+
+def test_profile_links_to_the_full_library(client, library):
+    sign_in(client, 'alice')
+    assert f'View all {OWNED} games' in client.get('/profile').get_data(as_text=True)
+
+
+def test_game_page_knows_who_owns_the_game(app, client, library):
+    sign_in(client, 'alice')
+    assert 'Already Owned' in client.get(f'/game/{library[0]}').get_data(as_text=True)
+    assert 'Add to Cart' in client.get('/game/1').get_data(as_text=True)
+    sign_in(client, 'bob')
+    assert 'Already Owned' in client.get('/game/1').get_data(as_text=True)
+
+
+def test_ownership_check_does_not_load_purchases(app, client, library):
+    sign_in(client, 'alice')
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        client.get(f'/game/{library[0]}')
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+    assert any('EXISTS' in statement.upper() for statement in statements)
+    assert not any(re.match(r'\s*SELECT purchase\.id', statement, re.I) for statement in statements)
@@ -0,0 +1,52 @@
+# Prometheus exposition on /metrics (metrics.Metrics). Counters live for the whole test session, so tests compare deltas.
+
+import re
+
+from services import rotate_featured_setup
+
+
+def sample(client, name, **labels):
+    """Value of one series on /metrics, 0 if it is not there yet"""
+    text = client.get('/metrics').get_data(as_text=True)
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}{{{re.escape(wanted)}}} (\S+)$', text, re.M) if labels else \
+        re.search(rf'^{re.escape(name)} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else 0
+
+
+def test_requests_are_counted_and_timed_per_endpoint(client):
+    labels = {'endpoint': 'social.leaderboard', 'method': 'GET', 'status': '200'}
+    requests_before = sample(client, 'http_requests_total', **labels)
+    timed_before = sample(client, 'http_request_duration_seconds_count', endpoint='social.leaderboard')
+    queries_before = sample(client, 'http_request_queries_total', endpoint='social.leaderboard')
+
+    client.get('/leaderboard')
+    client.get('/leaderboard')
+
+    assert sample(client, 'http_requests_total', **labels) == requests_before + 2
+    assert sample(client, 'http_request_duration_seconds_count', endpoint='social.leaderboard') == timed_before + 2
+    assert sample(client, 'http_request_queries_total', endpoint='social.leaderboard') > queries_before
+
+
+def test_exposition_format(client):
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert '# TYPE db_pool_size gauge' in text
+    assert 'le="+Inf"' in text
+
+
+def test_scheduled_jobs_report_runs_and_last_success(app, client):
+    runs_before = sample(client, 'job_runs_total', job='featured_rotation', outcome='success')
+    with app.app_context():
+        rotate_featured_setup()
+    assert sample(client, 'job_runs_total', job='featured_rotation', outcome='success') == runs_before + 1
+    assert sample(client, 'job_last_success_timestamp_seconds', job='featured_rotation') > 0
+
+
+def test_token_protects_the_endpoint(app, client):
+    app.config['METRICS_TOKEN'] = 'secret'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
@@ -0,0 +1,92 @@
+# Schema migrations (migrations.py): the runner on fresh SQLite files, and column widening on the test database
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, inspect, text
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from migrations import MIGRATIONS, Migrator
+
+
+def test_widen_column_makes_room_for_scrypt_hashes(app):
+    # A table as old databases have it, and as the models declare it now
+    legacy, current = MetaData(), MetaData()
+    for metadata, length in ((legacy, 120), (current, 255)):
+        Table('widen_test', metadata, Column('id', Integer, primary_key=True),
+              Column('password_hash', String(length), nullable=False))
+    with app.app_context():
+        engine = db.engine
+        legacy.create_all(engine)
+        try:
+            migrator = Migrator(engine, current, log=lambda *args: None)
+            migrator.widen_column('widen_test', 'password_hash')
+            migrator.widen_column('widen_test', 'password_hash')  # already wide: nothing to do
+
+            if engine.dialect.name != 'sqlite':  # SQLite does not enforce VARCHAR lengths
+                live = {c['name']: c['type'] for c in inspect(engine).get_columns('widen_test')}
+                assert live['password_hash'].length == 255
+            scrypt_hash = generate_password_hash('password123')
+            assert len(scrypt_hash) > 120
+            with engine.begin() as conn:
+                conn.execute(current.tables['widen_test'].insert().values(id=1, password_hash=scrypt_hash))
+        finally:
+            legacy.drop_all(engine)
+
+
+def all_index_names(engine):
+    inspector = inspect(engine)
+    return {ix['name'] for table in inspector.get_table_names() for ix in inspector.get_indexes(table)}
+
+
+def test_migrations_build_the_declared_schema_and_rerun_cleanly(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    log = []
+    migrator = Migrator(engine, db.metadata, pause=0, log=log.append)
+
+    assert migrator.run() == [version for version, _, _ in MIGRATIONS]
+    declared = {ix.name for table in db.metadata.tables.values() for ix in table.indexes}
+    assert declared <= all_index_names(engine)
+
+    # Already applied: nothing pending; re-running every step by hand changes nothing either
+    assert migrator.run() == []
+    before = all_index_names(engine)
+    for version, _, fn in MIGRATIONS:
+        migrator.version = version
+        fn(migrator)
+    assert all_index_names(engine) == before
+    engine.dispose()
+
+
+def test_interrupted_backfill_resumes_after_its_checkpoint(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    migrator = Migrator(engine, db.metadata, batch_size=2, pause=0, log=lambda *args: None)
+    migrator.run(target=8)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, username, email, password_hash) VALUES (1, 'a', 'a@x', 'x')"))
+        conn.execute(text("INSERT INTO game (id, title, price) VALUES (1, 'G', 1)"))
+        for review_id in range(1, 6):
+            conn.execute(text("INSERT INTO review (id, user_id, game_id, rating, content, comment_count) "
+                              "VALUES (:id, 1, 1, 5, 'ok', 0)"), {'id': review_id})
+            conn.execute(text("INSERT INTO review_comment (review_id, user_id, content) VALUES (:id, 1, 'hi')"),
+                         {'id': review_id})
+
+    # Pretend an earlier run counted the first two reviews and then stopped
+    migrator.version = 8
+    with engine.begin() as conn:
+        migrator._save_checkpoint(conn, 'review.comment_count', 2)
+    migrator.backfill(
+        'review.comment_count', 'review', "id IN (SELECT review_id FROM review_comment)",
+        set_sql="comment_count = (SELECT COUNT(*) FROM review_comment WHERE review_comment.review_id = review.id)"
+    )
+    with engine.connect() as conn:
+        counts = conn.execute(text("SELECT id, comment_count FROM review ORDER BY id")).all()
+    assert counts == [(1, 0), (2, 0), (3, 1), (4, 1), (5, 1)]
+    engine.dispose()
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dry.db'}")
+    log = []
+    Migrator(engine, db.metadata, dry_run=True, log=log.append).run()
+    assert inspect(engine).get_table_names() == []
+    assert any('CREATE INDEX' in line for line in log)
+    engine.dispose()
@@ -0,0 +1,129 @@
+# Server-sent notification stream (GET /notifications/stream in asgi.py, fed by notification_hub)
+
+import asyncio
+import json
+
+import pytest
+
+from asgi import create_asgi_app
+from extensions import db, notification_hub
+from models import Notification
+
+from asgi_client import request, scope
+
+TIMEOUT = 5
+
+
+@pytest.fixture
+def routes(app):
+    return create_asgi_app(app)
+
+
+def notify(app, *user_ids):
+    """Commit one notification per user id, as any view or job would; returns their ids"""
+    with app.app_context():
+        rows = [Notification(user_id=user_id, title='Heads up', message=f'for {user_id}') for user_id in user_ids]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def events(chunk):
+    """Notification payloads in a chunk of the stream"""
+    return [json.loads(line[len('data: '):]) for line in chunk.decode().splitlines() if line.startswith('data: ')]
+
+
+class Stream:
+    """One open stream: ``next()`` returns the body of each chunk the server sends"""
+
+    def __init__(self, routes, user_id, last_event_id=None):
+        headers = [(b'last-event-id', str(last_event_id).encode())] if last_event_id is not None else []
+        self.sent = asyncio.Queue()
+        self.closed = asyncio.Event()
+        self.task = asyncio.ensure_future(routes(
+            scope('GET', '/notifications/stream', user_id, routes.flask_app, headers), self._receive, self.sent.put))
+
+    async def _receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def start(self):
+        return await asyncio.wait_for(self.sent.get(), TIMEOUT)
+
+    async def next(self):
+        return (await asyncio.wait_for(self.sent.get(), TIMEOUT))['body']
+
+    async def close(self):
+        self.closed.set()
+        await asyncio.wait_for(self.task, TIMEOUT)
+
+
+def run(routes, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await routes.engine.dispose()
+    return asyncio.run(main())
+
+
+def test_stream_needs_a_signed_in_user(routes):
+    async def scenario():
+        return await request(routes, 'GET', '/notifications/stream')
+    status, _, _ = run(routes, scenario)
+    assert status == 401
+
+
+def test_new_notifications_reach_only_their_user(app, routes):
+    async def scenario():
+        stream = Stream(routes, user_id=1)
+        start = await stream.start()
+        opening = await stream.next()
+        # Committed on another thread, like a Flask view or a job
+        _, alice_id = await asyncio.to_thread(notify, app, 2, 1)
+        live = await stream.next()
+        await stream.close()
+        return start, opening, live, alice_id
+
+    start, opening, live, alice_id = run(routes, scenario)
+    assert start['status'] == 200
+    assert dict(start['headers'])[b'content-type'] == b'text/event-stream'
+    assert opening.startswith(b'retry: ') and events(opening) == []
+    assert [(item['id'], item['user_id'], item['message']) for item in events(live)] == [(alice_id, 1, 'for 1')]
+    assert f'id: {alice_id}\n'.encode() in live
+    assert notification_hub.subscriber_count() == 0
+
+
+def test_reconnecting_replays_what_was_missed(app, routes):
+    seen, _, missed, later = notify(app, 1, 2, 1, 1)
+
+    async def scenario():
+        stream = Stream(routes, user_id=1, last_event_id=seen)
+        await stream.start()
+        opening = await stream.next()
+        await stream.close()
+        return opening
+
+    assert [item['id'] for item in events(run(routes, scenario))] == [missed, later]
+    assert notification_hub.subscriber_count() == 0
+
+
+def test_rolled_back_notifications_are_not_sent(app, routes):
+    def rolled_back():
+        with app.app_context():
+            db.session.add(Notification(user_id=1, title='Draft', message='never sent'))
+            db.session.flush()
+            db.session.rollback()
+        return notify(app, 1)[0]
+
+    async def scenario():
+        stream = Stream(routes, user_id=1)
+        await stream.start()
+        await stream.next()
+        sent_id = await asyncio.to_thread(rolled_back)
+        live = await stream.next()
+        await stream.close()
+        return live, sent_id
+
+    live, sent_id = run(routes, scenario)
+    assert [item['id'] for item in events(live)] == [sent_id]
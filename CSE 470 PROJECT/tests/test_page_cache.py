@@ -0,0 +1,82 @@
+# Anonymous page cache (fragment_cache.cached_for_anonymous) and its shared version counters
+
+import logging
+
+import pytest
+from flask import template_rendered
+
+from app import create_app
+from conftest import sign_in
+from extensions import db
+from fragment_cache import SQLiteBackend
+from models import Game, Review
+
+
+@pytest.fixture
+def rendered(app):
+    templates = []
+
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+
+    template_rendered.connect(record, app)
+    yield templates
+    template_rendered.disconnect(record, app)
+
+
+@pytest.mark.parametrize('path', ['/', '/games', '/game/1'])
+def test_anonymous_pages_are_served_from_the_cache_until_a_commit(app, client, rendered, path):
+    first = client.get(path)
+    rendered.clear()
+    assert client.get(path).data == first.data
+    assert rendered == []
+
+    with app.app_context():
+        db.session.get(Game, 1).title = 'Renamed Game'
+        db.session.commit()
+    assert b'Renamed Game' in client.get(path).data
+    assert rendered
+
+
+def test_new_review_invalidates_the_game_page(app, client):
+    client.get('/game/1')
+    with app.app_context():
+        db.session.add(Review(user_id=2, game_id=1, rating=4, content='Solid shooter'))
+        db.session.commit()
+    assert b'Solid shooter' in client.get('/game/1').data
+
+
+def test_signed_in_visitors_always_get_a_fresh_render(client, rendered):
+    sign_in(client, 'alice')
+    client.get('/games')
+    rendered.clear()
+    client.get('/games')
+    assert rendered
+
+
+def test_sqlite_versions_are_shared_between_processes(tmp_path):
+    # Two backends on one file stand in for two worker processes
+    path = str(tmp_path / 'cache.db')
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+    assert worker_b.get_versions(['Game', 'Game:1']) == [0, 0]
+    worker_a.incr_versions(['Game', 'Game:1'])
+    assert worker_b.get_versions(['Game', 'Game:1']) == [1, 1]
+
+
+def test_sqlite_is_the_default_backend(tmp_path, monkeypatch):
+    monkeypatch.delenv('FRAGMENT_CACHE_BACKEND', raising=False)
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'FRAGMENT_CACHE_PATH': str(tmp_path / 'fragment_cache.db'),
+        'NOTIFICATION_FANOUT_DIR': '',
+    })
+    assert isinstance(app.extensions['fragment_cache'].backend, SQLiteBackend)
+
+
+def test_lru_under_a_multiprocess_server_logs_a_warning(client, caplog):
+    with caplog.at_level(logging.WARNING, logger='fragment_cache'):
+        client.get('/games', environ_overrides={'wsgi.multiprocess': False})
+        assert not caplog.records
+        client.get('/games', environ_overrides={'wsgi.multiprocess': True})
+    assert 'FRAGMENT_CACHE_BACKEND=lru' in caplog.text
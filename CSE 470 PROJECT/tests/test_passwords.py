@@ -0,0 +1,70 @@
+# Hashing lanes: priority clients queue on their own lane instead of getting "busy, retry"
+
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from passwords import HasherBusy, PasswordHasher
+
+
+def make_hasher(priority_backlog):
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_BACKLOG=0, PASSWORD_HASH_PRIORITY_WORKERS=1,
+                      PASSWORD_HASH_PRIORITY_BACKLOG=priority_backlog, PASSWORD_HASH_NICE=0)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    return hasher
+
+
+def occupy(hasher, priority, release):
+    """Start a job that holds a hashing thread until ``release`` is set"""
+    started = threading.Event()
+
+    def job():
+        started.set()
+        release.wait(5)
+        return 'held'
+
+    thread = threading.Thread(target=hasher._run, args=(priority, job))
+    thread.start()
+    assert started.wait(5)
+    return thread
+
+
+def test_defaults_are_sized_from_the_cpu_count(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 8)
+    hasher = PasswordHasher()
+    hasher.init_app(Flask(__name__))
+    assert (hasher.workers, hasher.backlog, hasher.priority_workers, hasher.priority_backlog) == (8, 16, 4, 8)
+
+
+def test_priority_job_waits_in_its_own_queue():
+    hasher = make_hasher(priority_backlog=1)
+    release = threading.Event()
+    threads = [occupy(hasher, False, release), occupy(hasher, True, release)]
+    with pytest.raises(HasherBusy):
+        hasher._run(False, lambda: 'shared')  # shared lane full, and it has no queue
+
+    result = []
+    waiting = threading.Thread(target=lambda: result.append(hasher._run(True, lambda: 'priority')))
+    waiting.start()
+    deadline = time.monotonic() + 5
+    while hasher._priority.slots._value and time.monotonic() < deadline:  # until it is queued
+        time.sleep(0.01)
+    assert not result
+    release.set()
+    for thread in threads + [waiting]:
+        thread.join(5)
+    assert result == ['priority']
+
+
+def test_full_priority_lane_spills_over_to_the_shared_lane():
+    hasher = make_hasher(priority_backlog=0)
+    release = threading.Event()
+    threads = [occupy(hasher, True, release)]
+    assert hasher._run(True, lambda: 'shared') == 'shared'
+    release.set()
+    for thread in threads:
+        thread.join(5)
@@ -0,0 +1,56 @@
+# Per-request SQL instrumentation (query_stats.QueryStats): counts, headers, slow-query log and summary
+
+import logging
+
+from sqlalchemy import event
+
+from conftest import sign_in
+from extensions import db
+from models import User
+
+
+def test_header_counts_every_statement_of_the_request(app, client):
+    app.config['QUERY_STATS_HEADERS'] = True
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', record)
+    try:
+        response = client.get('/leaderboard')
+    finally:
+        event.remove(engine, 'after_cursor_execute', record)
+    assert int(response.headers['X-DB-Queries']) == len(statements) > 0
+    assert response.headers['X-DB-Time'].endswith('ms')
+
+
+def test_headers_are_off_outside_debug_by_default(client):
+    assert 'X-DB-Queries' not in client.get('/leaderboard').headers
+
+
+def test_slow_statements_are_logged_with_their_call_site(app, client, caplog):
+    app.extensions['query_stats'].slow_ms = 0  # every statement is "slow"
+    with caplog.at_level(logging.WARNING, logger='query_stats'):
+        client.get('/leaderboard')
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('views/social.py' in message and 'in leaderboard' in message for message in messages)
+
+
+def test_admin_summary_groups_requests_by_endpoint(app, client):
+    with app.app_context():
+        db.session.get(User, 1).is_admin = True
+        db.session.commit()
+    for _ in range(3):
+        client.get('/leaderboard')
+    sign_in(client, 'alice')
+    summary = client.get('/admin/query_stats').get_json()
+
+    leaderboard = next(e for e in summary['endpoints'] if e['endpoint'] == 'social.leaderboard')
+    assert leaderboard['requests'] >= 3
+    assert leaderboard['max_queries'] >= leaderboard['avg_queries'] > 0
+
+    sign_in(client, 'bob')
+    assert client.get('/admin/query_stats').status_code == 302  # admins only
@@ -0,0 +1,76 @@
+# Read-replica routing (database.RoutingSession / @read_replica) and read-your-writes pinning
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from conftest import sign_in
+from extensions import db
+from models import Game, SetupPost, User
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    # The "replica" is a second file holding different data, so each page shows where it read from
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'primary.db'}",
+        'DATABASE_REPLICA': replica_url,
+        'DATABASE_REPLICA_PIN_SECONDS': 60,
+        'FRAGMENT_CACHE_BACKEND': 'lru',
+        'FRAGMENT_CACHE_ENABLED': False,
+        'NOTIFICATION_FANOUT_DIR': '',
+        'QUERY_STATS_SLOW_MS': None,
+    })
+    password = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(create_engine(replica_url))
+        for engine, title in ((db.engine, 'Primary Game'), (app.extensions['database_replica'], 'Replica Game')):
+            with Session(engine) as session:
+                session.add_all([
+                    User(username='alice', email='alice@example.com', password_hash=password),
+                    User(username='bob', email='bob@example.com', password_hash=password),
+                    Game(title=title, description='A game', price=19.99, genre='Action', platform='PC'),
+                ])
+                session.flush()
+                session.add(SetupPost(user_id=1, title='Desk', image_url='/static/x.jpg'))
+                session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+        app.extensions['database_replica'].dispose()
+
+
+def test_read_only_pages_read_from_the_replica(replica_app):
+    client = replica_app.test_client()
+    assert b'Replica Game' in client.get('/game/1').data
+    assert b'Replica Game' in client.get('/games').data
+
+
+def test_requests_without_the_decorator_read_from_the_primary(replica_app):
+    with replica_app.test_request_context('/'):
+        assert db.session.get(Game, 1).title == 'Primary Game'
+
+
+def test_a_write_pins_the_user_to_the_primary(replica_app, monkeypatch):
+    client = replica_app.test_client()
+    sign_in(client, 'bob')
+    assert b'Replica Game' in client.get('/game/1').data
+
+    assert client.post('/vote_setup', data={'setup_id': 1, 'vote_type': 'like'}).get_json()['success']
+    with replica_app.app_context():
+        assert db.session.get(SetupPost, 1).likes == 1  # written to the primary
+
+    assert b'Primary Game' in client.get('/game/1').data
+    # Once the pin expires, reads go back to the replica
+    with client.session_transaction() as session:
+        session['db_primary_until'] = 0
+    assert b'Replica Game' in client.get('/game/1').data
+
+    other = replica_app.test_client()  # another visitor was never pinned
+    assert b'Replica Game' in other.get('/game/1').data
@@ -0,0 +1,119 @@
+# Review comments (views/social.py): the stored comment_count and the on-demand comment pages
+
+import re
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from conftest import sign_in
+from extensions import db
+from models import Notification, Review, ReviewComment
+from views.social import COMMENTS_PER_PAGE
+
+JSON = {'Accept': 'application/json'}
+
+
+@pytest.fixture
+def review(app):
+    """Id of a review by alice"""
+    with app.app_context():
+        row = Review(user_id=1, game_id=1, rating=4, content='Solid')
+        db.session.add(row)
+        db.session.commit()
+        return row.id
+
+
+def counts(app, review_id):
+    """``(stored comment_count, actual number of comments)``"""
+    with app.app_context():
+        stored = db.session.get(Review, review_id).comment_count
+        actual = db.session.execute(
+            select(func.count()).select_from(ReviewComment).where(ReviewComment.review_id == review_id)
+        ).scalar()
+    return stored, actual
+
+
+def comment_ids(html):
+    return [int(value) for value in re.findall(r'id="review-comment-(\d+)"', html)]
+
+
+def test_count_follows_adds_and_deletes(app, client, review):
+    sign_in(client, 'bob')
+    body = client.post('/comment_review', data={'review_id': review, 'content': 'First'}, headers=JSON).get_json()
+    assert body['success'] and body['comment_count'] == 1
+    assert client.post('/comment_review', data={'review_id': review, 'content': 'Second'}).status_code == 302
+    assert counts(app, review) == (2, 2)
+
+    sign_in(client, 'alice')
+    client.post('/comment_review', data={'review_id': review, 'content': 'Thanks'})
+    assert counts(app, review) == (3, 3)
+    with app.app_context():
+        bobs, alices = (db.session.execute(select(ReviewComment.id).where(ReviewComment.user_id == user_id)
+                                           .order_by(ReviewComment.id)).scalars().all() for user_id in (2, 1))
+        # Only comments by others notify the review's author
+        assert db.session.query(Notification).filter_by(user_id=1, title='New Comment').count() == 2
+
+    client.post(f'/delete_comment/{bobs[0]}')  # not alice's: refused
+    assert counts(app, review) == (3, 3)
+    client.post(f'/delete_comment/{alices[0]}')
+    assert counts(app, review) == (2, 2)
+    sign_in(client, 'bob')
+    for comment_id in bobs:
+        client.post(f'/delete_comment/{comment_id}')
+    assert counts(app, review) == (0, 0)
+
+
+def test_concurrent_comments_are_all_counted(app, review):
+    clients = [app.test_client() for _ in range(8)]
+    for client in clients:
+        sign_in(client, 'bob')
+    barrier = threading.Barrier(len(clients))
+
+    def post(client):
+        barrier.wait()
+        for n in range(5):
+            client.post('/comment_review', data={'review_id': review, 'content': f'Comment {n}'})
+
+    threads = [threading.Thread(target=post, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counts(app, review) == (40, 40)
+
+
+def test_comment_on_a_missing_review(app, client):
+    sign_in(client, 'bob')
+    response = client.post('/comment_review', data={'review_id': 999, 'content': 'Hello?'}, headers=JSON)
+    assert response.status_code == 404 and response.get_json()['success'] is False
+    assert client.post('/comment_review', data={'review_id': 999, 'content': 'Hello?'}).status_code == 404
+    with app.app_context():
+        assert db.session.query(ReviewComment).count() == 0
+
+
+def test_comment_pages_cover_the_thread_oldest_first(app, client, review):
+    total = 2 * COMMENTS_PER_PAGE + 5
+    with app.app_context():
+        db.session.add_all(ReviewComment(user_id=2, review_id=review, content=f'Comment {n}') for n in range(total))
+        db.session.add(Review(user_id=2, game_id=1, rating=3, content='Other'))
+        db.session.flush()
+        db.session.add(ReviewComment(user_id=1, review_id=review + 1, content='Elsewhere'))
+        db.session.commit()
+        expected = db.session.execute(select(ReviewComment.id).where(ReviewComment.review_id == review)
+                                      .order_by(ReviewComment.id)).scalars().all()
+
+    assert client.get(f'/review/{review}/comments').status_code == 302  # sign-in required
+    sign_in(client, 'alice')
+    seen, sizes, after = [], [], None
+    while True:
+        body = client.get(f'/review/{review}/comments' + (f'?after={after}' if after else '')).get_json()
+        page = comment_ids(body['html'])
+        seen += page
+        sizes.append(len(page))
+        after = body['next_cursor']
+        if after is None:
+            break
+        assert after == page[-1]
+    assert seen == expected
+    assert sizes == [COMMENTS_PER_PAGE, COMMENTS_PER_PAGE, 5]
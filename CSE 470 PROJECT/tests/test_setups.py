@@ -0,0 +1,100 @@
+# Setups gallery (views/social.py): keyset pages, cursor validation and a fixed number of queries per page
+
+import base64
+import json
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import sign_in
+from extensions import db
+from models import SetupPost, User
+from views.social import SETUP_SORTS, SETUPS_PER_PAGE
+
+
+def cursor(value, last_id):
+    return base64.urlsafe_b64encode(json.dumps([value, last_id]).encode()).decode()
+
+
+def add_setups(count, start=datetime(2026, 1, 1)):
+    """``count`` setups by as many users, with ties on every vote counter"""
+    for i in range(count):
+        user = User(username=f'poster{i}', email=f'poster{i}@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(SetupPost(user_id=user.id, title=f'Setup {i}', image_url='/static/x.jpg',
+                                 likes=i % 3, cleanest_votes=i % 2, rgb_votes=0, budget_votes=i % 4,
+                                 hot_score=float(i % 5), created_at=start + timedelta(minutes=i // 2)))
+    db.session.commit()
+
+
+def page_ids(client, sort):
+    """Follow next_cursor through /setups/page; returns the ids on every page (from the vote buttons)"""
+    pages, next_cursor = [], None
+    while True:
+        body = client.get('/setups/page', query_string={'sort': sort, 'cursor': next_cursor or ''}).get_json()
+        pages.append([int(setup_id) for setup_id in re.findall(r"voteSetup\((\d+), 'cleanest'\)", body['html'])])
+        next_cursor = body['next_cursor']
+        if not next_cursor:
+            return pages
+
+
+@pytest.mark.parametrize('sort', sorted(SETUP_SORTS))
+def test_pages_cover_every_setup_once_across_ties(app, client, sort):
+    with app.app_context():
+        add_setups(2 * SETUPS_PER_PAGE + 5)
+        column = SETUP_SORTS[sort]
+        expected = db.session.execute(
+            db.select(SetupPost.id).order_by(column.desc(), SetupPost.id.desc())
+        ).scalars().all()
+    sign_in(client, 'bob')  # only signed-in visitors get the vote buttons
+    pages = page_ids(client, sort)
+
+    assert [len(page) for page in pages] == [SETUPS_PER_PAGE, SETUPS_PER_PAGE, 6]
+    assert [setup_id for page in pages for setup_id in page] == expected
+
+
+@pytest.mark.parametrize('sort, value', [
+    ('top', {'likes': 1}),
+    ('top', [1, 2]),
+    ('top', 'many'),
+    ('top', True),
+    ('hot', 'NaN'),
+    ('hot', None),
+    ('newest', 5),
+    ('newest', {'$gt': ''}),
+    ('newest', 'not a date'),
+])
+def test_hostile_cursor_values_start_from_the_first_page(client, sort, value):
+    raw = cursor(value, 1).replace('"NaN"', 'NaN')
+    for path in ('/setups', '/setups/page'):
+        response = client.get(path, query_string={'sort': sort, 'cursor': raw})
+        assert response.status_code == 200
+
+
+@pytest.mark.parametrize('raw', [
+    'not base64!', cursor(1, 'x'), cursor(1, [1]), cursor(1, 2.5),
+    base64.urlsafe_b64encode(b'{"a": 1, "b": 2}').decode(),
+    base64.urlsafe_b64encode(b'[1, 2, 3]').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+])
+def test_malformed_cursors_start_from_the_first_page(client, raw):
+    response = client.get('/setups/page', query_string={'sort': 'top', 'cursor': raw})
+    assert response.status_code == 200
+    assert response.get_json()['success']
+
+
+def test_query_count_does_not_grow_with_the_page(app, client):
+    app.config['QUERY_STATS_HEADERS'] = True
+
+    def queries(path):
+        response = client.get(path)
+        assert response.status_code == 200
+        return int(response.headers['X-DB-Queries'])
+
+    small = (queries('/setups'), queries('/setups/page?sort=hot'))
+    with app.app_context():
+        add_setups(3 * SETUPS_PER_PAGE)  # every setup by a different author
+    full = (queries('/setups'), queries('/setups/page?sort=hot'))
+    assert full == small
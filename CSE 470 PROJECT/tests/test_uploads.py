@@ -0,0 +1,132 @@
+# Bad image uploads get the "must be a valid image" flash, not a 500
+
+import io
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from conftest import sign_in
+from uploads import PLACEHOLDER_NAME
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def png(size=(64, 64)):
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(buffer, 'PNG')  # noise, so it doesn't compress away
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_client(app, client, tmp_path):
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    shutil.copy(os.path.join(STATIC, 'uploads', PLACEHOLDER_NAME), app.config['UPLOAD_FOLDER'])
+    app.config['UPLOAD_STAGING_FOLDER'] = str(tmp_path / 'staging')
+    sign_in(client, 'alice')
+    return client
+
+
+def post_setup(client, data):
+    return client.post('/post_setup', data={
+        'title': 'Desk', 'description': 'Mine', 'image': (io.BytesIO(data), 'desk.png'),
+    }, content_type='multipart/form-data')
+
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.get('_flashes', [])]
+
+
+@pytest.mark.parametrize('data', [
+    pytest.param(b'not an image at all', id='unidentified'),
+    pytest.param(png()[:6000], id='truncated')  # valid header, pixel data cut short,
+])
+def test_bad_setup_image_is_rejected(upload_client, data):
+    response = post_setup(upload_client, data)
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/post_setup')
+    assert flashes(upload_client) == ['Setup image must be a valid image file']
+
+
+def test_decompression_bomb_is_rejected(upload_client, monkeypatch):
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)  # a 64x64 image is over twice the limit
+    response = upload_client.post('/edit_profile', data={
+        'bio': '', 'profile_picture': (io.BytesIO(png()), 'me.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    assert flashes(upload_client) == ['Profile picture must be a valid image file']
+
+
+def test_staged_file_is_removed_when_rejected(upload_client, app):
+    post_setup(upload_client, b'not an image at all')
+    staging = app.config['UPLOAD_STAGING_FOLDER']
+    assert not any(name.startswith('incoming_') for name in os.listdir(staging))
+
+
+def test_valid_image_is_accepted(upload_client):
+    response = post_setup(upload_client, png())
+    assert response.headers['Location'].endswith('/setups')
+    assert flashes(upload_client) == ['Setup posted successfully']
+
+
+class FailedFuture:
+    def exception(self):
+        return OSError('worker died')
+
+
+def test_failed_upload_restores_each_uploaders_own_picture(upload_client, app, monkeypatch):
+    from extensions import db
+    from models import User
+
+    # The pool fails every job, once both uploads are waiting on the same placeholder
+    callbacks = []
+    monkeypatch.setattr('services.process_upload_async',
+                        lambda upload_folder, staging_folder, pending_path, on_done, workers: callbacks.append(on_done))
+    app.config['UPLOAD_WORKERS'] = None
+    with app.app_context():
+        db.session.get(User, 1).profile_picture = 'alice.jpg'
+        db.session.get(User, 2).profile_picture = 'bob.jpg'
+        db.session.commit()
+    image = png()
+    for username in ('alice', 'bob'):
+        sign_in(upload_client, username)
+        upload_client.post('/edit_profile', data={'bio': '', 'profile_picture': (io.BytesIO(image), 'me.png')},
+                           content_type='multipart/form-data')
+    for on_done in callbacks:
+        on_done(FailedFuture())
+    with app.app_context():
+        assert [db.session.get(User, user_id).profile_picture for user_id in (1, 2)] == ['alice.jpg', 'bob.jpg']
+
+
+def test_sweep_settles_placeholders_left_by_a_dead_worker(upload_client, app):
+    from extensions import db
+    from models import SetupPost, User
+    from services import resolve_pending_uploads
+    from uploads import prepare_upload
+
+    class Upload:
+        def __init__(self, data):
+            self.stream = io.BytesIO(data)
+
+    staging = app.config['UPLOAD_STAGING_FOLDER']
+    with app.app_context():
+        # A setup whose staged file is still there, and an avatar whose staged file is gone
+        final_path, pending_path = prepare_upload(Upload(png()), app.config['UPLOAD_FOLDER'], staging, 'setups')
+        db.session.add(SetupPost(user_id=1, title='Stuck', image_url='/static/uploads/' + pending_path))
+        db.session.get(User, 2).profile_picture = 'avatars/pending_' + '0' * 32 + '.svg'
+        db.session.commit()
+        # The lost avatar goes back to the default; the setup is young enough to still be in a worker
+        assert resolve_pending_uploads() == 1
+        assert db.session.get(User, 2).profile_picture == 'default.jpg'
+        setup = db.session.execute(db.select(SetupPost).where(SetupPost.title == 'Stuck')).scalar_one()
+        assert setup.image_url == '/static/uploads/' + pending_path
+
+        app.config['UPLOAD_PENDING_TIMEOUT'] = 0
+        assert resolve_pending_uploads() == 1
+        db.session.refresh(setup)
+        assert setup.image_url == '/static/uploads/' + final_path
+        assert os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], final_path))
+    assert os.listdir(staging) == []
@@ -0,0 +1,117 @@
+# Voucher redemption and spending under concurrency: the conditional UPDATEs in
+# services.redeem_points_for_voucher / use_voucher and the append-only ledger.
+# Threads share the file-backed test database, as worker threads share a real one.
+
+import random
+import threading
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+
+from conftest import sign_in
+from extensions import db
+from models import User, Voucher, VoucherLedgerEntry
+from services import use_voucher
+from views.store import VOUCHER_TYPES
+
+CLIENTS = 12
+ROUNDS = 10
+POINTS = 1500  # runs out part way: the last rounds race for the remaining points
+
+
+@pytest.fixture
+def collector(app):
+    with app.app_context():
+        db.session.get(User, 1).popularity_points = POINTS
+        db.session.commit()
+    return 1
+
+
+def in_threads(count, target):
+    """Run ``target(index, barrier)`` on ``count`` threads and re-raise the first failure"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def run(index):
+        try:
+            target(index, barrier)
+        except BaseException as error:  # noqa: B902 - reported on the main thread
+            errors.append(error)
+            barrier.abort()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def redeem_race(app):
+    """Every client posts one redemption per round, all released together; returns status counts"""
+    clients = [app.test_client() for _ in range(CLIENTS)]
+    for client in clients:
+        sign_in(client, 'alice')
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def redeem(index, barrier):
+        rng = random.Random(470 + index)
+        for _ in range(ROUNDS):
+            barrier.wait()
+            response = clients[index].post('/redeem_voucher', data={'voucher_type': rng.choice(list(VOUCHER_TYPES))})
+            with lock:
+                statuses[response.status_code] += 1
+
+    in_threads(CLIENTS, redeem)
+    return statuses
+
+
+def test_concurrent_redemptions_keep_points_and_ledger_consistent(app, collector):
+    statuses = redeem_race(app)
+    assert set(statuses) == {302}  # redirected back, whether or not the points sufficed
+
+    with app.app_context():
+        left = db.session.get(User, collector).popularity_points
+        spent = -db.session.execute(
+            select(func.coalesce(func.sum(VoucherLedgerEntry.points), 0)).where(VoucherLedgerEntry.user_id == collector)
+        ).scalar()
+        vouchers = db.session.execute(select(Voucher.id).where(Voucher.user_id == collector)).scalars().all()
+        redeemed = Counter(db.session.execute(
+            select(VoucherLedgerEntry.voucher_id).where(VoucherLedgerEntry.event == 'redeemed')
+        ).scalars())
+
+    assert 0 <= left < min(kind['cost'] for kind in VOUCHER_TYPES.values())  # spent down, never below zero
+    assert POINTS - spent == left
+    assert vouchers and all(redeemed[voucher_id] == 1 for voucher_id in vouchers)
+    assert sum(redeemed.values()) == len(vouchers)
+
+
+def test_a_voucher_is_spent_once(app, collector):
+    redeem_race(app)
+    with app.app_context():
+        voucher_id = db.session.execute(
+            select(Voucher.id).where(Voucher.user_id == collector).order_by(Voucher.id).limit(1)
+        ).scalar_one()
+    spent = []
+
+    def spend(index, barrier):
+        with app.app_context():
+            barrier.wait()
+            if use_voucher(db.session, collector, voucher_id) is not None:
+                db.session.commit()
+                spent.append(index)
+            else:
+                db.session.rollback()
+
+    in_threads(CLIENTS, spend)
+
+    assert len(spent) == 1
+    with app.app_context():
+        assert db.session.get(Voucher, voucher_id).is_used
+        events = Counter(db.session.execute(
+            select(VoucherLedgerEntry.event).where(VoucherLedgerEntry.voucher_id == voucher_id)
+        ).scalars())
+    assert events == {'redeemed': 1, 'used': 1}
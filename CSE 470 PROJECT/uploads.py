@@ -0,0 +1,300 @@
+# Image upload pipeline: content hashing, size variants and re-encoding
+
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, ImageSequence
+
+# Variant name -> maximum width in pixels (images are never upscaled)
+VARIANTS = {
+    'thumb': 160,
+    'card': 640,
+    'full': 1600,
+}
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+# Decompression bomb guard: refuse anything above ~50 megapixels
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+_VARIANT_RE = re.compile(r'^(?P<prefix>.*/)?(?P<digest>[0-9a-f]{32})_(?P<variant>[a-z]+)\.(?P<ext>webp|jpg)$')
+_PENDING_RE = re.compile(r'^(?P<prefix>.*/)?pending_(?P<digest>[0-9a-f]{32})\.svg$')
+# Shipped in every upload subdirectory; shown while variants are being generated
+PLACEHOLDER_NAME = 'processing.svg'
+
+_executor = None
+_executor_lock = threading.RLock()
+_inflight = {}
+
+
+class InvalidImage(Exception):
+    """Raised when an upload is not a usable image: unrecognised, truncated or too large"""
+
+
+def variant_name(digest, variant, ext):
+    return f"{digest}_{variant}.{ext}"
+
+
+def variants_exist(dest_dir, digest):
+    return all(
+        os.path.exists(os.path.join(dest_dir, variant_name(digest, variant, ext)))
+        for variant in VARIANTS
+        for ext in FORMATS
+    )
+
+
+def _resize(frame, max_width):
+    if frame.width <= max_width:
+        return frame.copy()
+    height = max(1, round(frame.height * max_width / frame.width))
+    return frame.resize((max_width, height), Image.LANCZOS)
+
+
+def _flatten(frame):
+    """Convert a frame to RGB, compositing any transparency onto white for JPEG"""
+    if frame.mode in ('RGBA', 'LA') or (frame.mode == 'P' and 'transparency' in frame.info):
+        frame = frame.convert('RGBA')
+        background = Image.new('RGB', frame.size, (255, 255, 255))
+        background.paste(frame, mask=frame.getchannel('A'))
+        return background
+    return frame.convert('RGB')
+
+
+def _atomic_save(path, save):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        save(fh)
+    os.replace(tmp_path, path)
+
+
+def write_variants(source, dest_dir, digest):
+    """Decode an image and write every size variant as WebP and JPEG.
+
+    Metadata (EXIF, ICC, comments) is dropped by re-encoding from pixel data;
+    EXIF orientation is applied first so rotated phone photos stay upright.
+    Animated images keep their animation in the WebP variants and fall back
+    to the first frame for JPEG.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    with Image.open(source) as image:
+        animated = getattr(image, 'is_animated', False)
+        if animated:
+            frames = [frame.convert('RGBA') for frame in ImageSequence.Iterator(image)]
+            durations = image.info.get('duration', 100)
+            loop = image.info.get('loop', 0)
+        else:
+            frames = [ImageOps.exif_transpose(image).convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')]
+
+        for variant, max_width in VARIANTS.items():
+            resized = [_resize(frame, max_width) for frame in frames]
+            webp_path = os.path.join(dest_dir, variant_name(digest, variant, 'webp'))
+            jpg_path = os.path.join(dest_dir, variant_name(digest, variant, 'jpg'))
+            if animated:
+                _atomic_save(webp_path, lambda fh: resized[0].save(
+                    fh, save_all=True, append_images=resized[1:], duration=durations, loop=loop,
+                    **FORMATS['webp']))
+            else:
+                _atomic_save(webp_path, lambda fh: resized[0].save(fh, **FORMATS['webp']))
+            _atomic_save(jpg_path, lambda fh: _flatten(resized[0]).save(fh, **FORMATS['jpg']))
+
+
+def stage_upload(file_storage, staging_folder):
+    """Stream an upload to the staging area, hashing it on the way.
+
+    Only the image header is parsed here so invalid files are rejected
+    without paying for a full decode on the request thread. Returns
+    ``(digest, staged_path)``; raises ``InvalidImage`` if the file is not
+    an image, is cut short or is over the pixel limit.
+    """
+    os.makedirs(staging_folder, exist_ok=True)
+    tmp_path = os.path.join(staging_folder, f"incoming_{uuid.uuid4().hex}")
+    hasher = hashlib.sha256()
+    with open(tmp_path, 'wb') as fh:
+        for chunk in iter(lambda: file_storage.stream.read(64 * 1024), b''):
+            hasher.update(chunk)
+            fh.write(chunk)
+    try:
+        with Image.open(tmp_path):
+            pass
+    except (Image.DecompressionBombError, OSError) as exc:  # UnidentifiedImageError is an OSError
+        os.remove(tmp_path)
+        raise InvalidImage(str(exc)) from exc
+    digest = hasher.hexdigest()[:32]
+    staged_path = os.path.join(staging_folder, digest)
+    os.replace(tmp_path, staged_path)
+    return digest, staged_path
+
+
+def process_staged(staged_path, dest_dir, digest):
+    """Worker entry point: generate the variants for a staged upload"""
+    try:
+        if not variants_exist(dest_dir, digest):
+            write_variants(staged_path, dest_dir, digest)
+    finally:
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+    return digest
+
+
+def get_executor(max_workers=None):
+    """Return the shared process pool, creating it on first use.
+
+    Workers are spawned rather than forked so they never inherit the
+    parent's threads, sockets or database connections.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _forget(digest):
+    def callback(future):
+        with _executor_lock:
+            _inflight.pop(digest, None)
+    return callback
+
+
+def prepare_upload(file_storage, upload_folder, staging_folder, subdir, inline=False):
+    """Stage an upload and work out what the owning record should point to.
+
+    Returns ``(final_path, pending_path)`` relative to ``upload_folder``.
+    ``pending_path`` is a placeholder unique to this upload that callers
+    store until ``process_upload_async`` reports completion. It is ``None``
+    when ``final_path`` can be used straight away: either the variants
+    already exist (a duplicate upload) or ``inline`` processing was asked for.
+    Raises ``InvalidImage`` for files that cannot be decoded.
+    """
+    digest, staged_path = stage_upload(file_storage, staging_folder)
+    dest_dir = os.path.join(upload_folder, subdir)
+    final_path = f"{subdir}/{variant_name(digest, 'full', 'jpg')}"
+    if variants_exist(dest_dir, digest):
+        os.remove(staged_path)
+        return final_path, None
+    if inline:
+        try:
+            process_staged(staged_path, dest_dir, digest)
+        except (Image.DecompressionBombError, OSError) as exc:
+            # A full decode can still find a truncated file the header check let through
+            raise InvalidImage(str(exc)) from exc
+        return final_path, None
+
+    os.makedirs(dest_dir, exist_ok=True)
+    placeholder = os.path.join(dest_dir, PLACEHOLDER_NAME)
+    if not os.path.exists(placeholder):
+        shutil.copyfile(os.path.join(upload_folder, PLACEHOLDER_NAME), placeholder)
+    return final_path, f"{subdir}/pending_{digest}.svg"
+
+
+def process_upload_async(upload_folder, staging_folder, pending_path, on_done, max_workers=None):
+    """Generate the variants for a staged upload in the process pool.
+
+    ``on_done(future)`` runs on a pool management thread once the variants
+    are written (or processing failed). Submit only after the record that
+    stores ``pending_path`` has been committed so the callback can find it.
+    """
+    match = _PENDING_RE.match(pending_path)
+    digest = match.group('digest')
+    dest_dir = os.path.join(upload_folder, match.group('prefix').rstrip('/'))
+    staged_path = os.path.join(staging_folder, digest)
+
+    executor = get_executor(max_workers)
+    with _executor_lock:
+        # Identical uploads in flight share one job (and one staged file)
+        future = _inflight.get(digest)
+        if future is None:
+            future = executor.submit(process_staged, staged_path, dest_dir, digest)
+            _inflight[digest] = future
+            future.add_done_callback(_forget(digest))
+    future.add_done_callback(on_done)
+    return future
+
+
+def pending_digest(pending_path):
+    """The content digest in a placeholder path, or None if it is not one"""
+    match = _PENDING_RE.match(pending_path or '')
+    return match.group('digest') if match else None
+
+
+def resolve_pending_upload(upload_folder, staging_folder, pending_path, max_age, now=None):
+    """Work out what a record still pointing at ``pending_path`` should point to.
+
+    Returns the final path once the variants exist, processing the staged
+    file here first if it has waited more than ``max_age`` seconds (its
+    worker is gone); ``None`` if the upload is lost (no variants, no staged
+    file, or it does not decode); or ``pending_path`` itself while a worker
+    may still be on it.
+    """
+    match = _PENDING_RE.match(pending_path)
+    digest = match.group('digest')
+    prefix = match.group('prefix') or ''
+    dest_dir = os.path.join(upload_folder, prefix.rstrip('/'))
+    final_path = f"{prefix}{variant_name(digest, 'full', 'jpg')}"
+    if variants_exist(dest_dir, digest):
+        return final_path
+    staged_path = os.path.join(staging_folder, digest)
+    try:
+        age = (now or time.time()) - os.path.getmtime(staged_path)
+    except FileNotFoundError:
+        return None
+    if age < max_age:
+        return pending_path
+    try:
+        process_staged(staged_path, dest_dir, digest)
+    except (Image.DecompressionBombError, OSError):
+        return None
+    return final_path
+
+
+def remove_stale_staged(staging_folder, max_age, keep=(), now=None):
+    """Delete staged files older than ``max_age`` seconds whose digest is not in ``keep``"""
+    if not os.path.isdir(staging_folder):
+        return 0
+    cutoff = (now or time.time()) - max_age
+    removed = 0
+    for name in os.listdir(staging_folder):
+        path = os.path.join(staging_folder, name)
+        if name in keep or not os.path.isfile(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass  # processed or removed meanwhile
+    return removed
+
+
+def variant_url(url, variant, ext='jpg'):
+    """Return the URL of another size/format of a processed upload.
+
+    Uploads that are still processing map to the placeholder image;
+    legacy uploads that were stored before the pipeline existed are
+    returned unchanged.
+    """
+    pending = _PENDING_RE.match(url or '')
+    if pending:
+        return f"{pending.group('prefix') or ''}{PLACEHOLDER_NAME}"
+    match = _VARIANT_RE.match(url or '')
+    if not match:
+        return url
+    return f"{match.group('prefix') or ''}{variant_name(match.group('digest'), variant, ext)}"
+
+
+def variant_srcset(url, ext='jpg'):
+    """Build a ``srcset`` attribute value for a processed upload ('' for legacy files)"""
+    if not _VARIANT_RE.match(url or ''):
+        return ''
+    return ', '.join(f"{variant_url(url, variant, ext)} {width}w" for variant, width in VARIANTS.items())
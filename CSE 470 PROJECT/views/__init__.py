@@ -0,0 +1,4 @@
+# Route blueprints. create_app() imports and registers only the ones listed in BLUEPRINTS,
+# so scripts that just need the models never load the views.
+
+BLUEPRINTS = ('account', 'store', 'social', 'lending', 'admin', 'notifications', 'api')
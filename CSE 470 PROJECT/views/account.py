@@ -0,0 +1,212 @@
+# Account blueprint: registration, login, profile, the game library and the ban page
+
+from flask import Blueprint, flash, jsonify, make_response, redirect, render_template, request, url_for
+from flask_login import current_user, login_required, login_user, logout_user
+
+from database import read_replica
+from extensions import db, password_hasher, rate_limiter
+from models import User, Notification, Voucher
+from passwords import HasherBusy
+from services import (
+    build_ban_context, get_library_page, library_summary, process_image_upload, stage_image_upload
+)
+from uploads import InvalidImage
+
+bp = Blueprint('account', __name__)
+
+# Clients past this many attempts in the 'ip' rate-limit window, or with a recent failed login,
+# no longer get the hashing threads kept for priority jobs (see passwords.PasswordHasher)
+PRIORITY_ATTEMPTS = 3
+
+# Latest purchases shown on the profile; the rest are on the library page
+PROFILE_LIBRARY_GAMES = 8
+
+# What a banned user may still reach
+BANNED_ALLOWED_ENDPOINTS = frozenset({
+    'account.logout', 'account.banned', 'static',
+    'notifications.mark_notification_read', 'notifications.mark_all_notifications_read',
+    'notifications.clear_all_notifications', 'notifications.notification_stream'
+})
+
+@bp.route('/banned')
+@login_required
+def banned():
+    if not current_user.ban_in_effect():
+        return redirect(url_for('store.index'))
+    ctx = build_ban_context(current_user)
+    return render_template(
+        'banned.html',
+        user=current_user,
+        reason=ctx['reason'],
+        is_permanent=ctx['is_permanent'],
+        remaining_days=ctx['remaining_days'],
+        until_date=ctx['until_date']
+    )
+
+@bp.before_app_request
+def enforce_ban():
+    """Send banned users to the ban page, and refuse their writes with 403 (as asgi.py does).
+    Read-only: expired bans are cleared and overdue lendings flagged by the scheduled jobs
+    (scripts/run_scheduled_jobs.py), not by requests"""
+    if request.endpoint in BANNED_ALLOWED_ENDPOINTS or request.endpoint is None:
+        return
+    if current_user.is_authenticated and current_user.ban_in_effect():
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return jsonify({'success': False, 'message': 'Account banned'}), 403
+        return redirect(url_for('account.banned'))
+
+def is_priority(ip):
+    return not rate_limiter.count('ip_failures', ip) and rate_limiter.count('ip', ip) <= PRIORITY_ATTEMPTS
+
+def try_again_later(template, status, retry_after, message):
+    """Re-render a form with ``message`` and a Retry-After header (429 throttled, 503 hashing backlog full)"""
+    flash(message)
+    response = make_response(render_template(template), status)
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        email = request.form['email']
+        password = request.form['password']
+
+        ip = request.remote_addr
+        retry_after = rate_limiter.retry_after('ip', ip)
+        if retry_after:
+            return try_again_later('register.html', 429, retry_after, 'Too many attempts. Please try again later.')
+        rate_limiter.hit('ip', ip)
+        
+        if User.query.filter_by(username=username).first():
+            flash('Username already exists')
+            return redirect(url_for('account.register'))
+        
+        if User.query.filter_by(email=email).first():
+            flash('Email already exists')
+            return redirect(url_for('account.register'))
+        
+        try:
+            password_hash = password_hasher.hash(password, priority=is_priority(ip))
+        except HasherBusy:
+            return try_again_later('register.html', 503, 1, 'The server is busy. Please try again in a moment.')
+        user = User(
+            username=username,
+            email=email,
+            password_hash=password_hash
+        )
+        db.session.add(user)
+        db.session.commit()
+        
+        flash('Registration successful')
+        return redirect(url_for('account.login'))
+    
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+
+        # Throttled clients are turned away before any hashing is done
+        ip = request.remote_addr
+        retry_after = max(rate_limiter.retry_after('ip', ip), rate_limiter.retry_after('ip_failures', ip),
+                          rate_limiter.retry_after('username_failures', username))
+        if retry_after:
+            return try_again_later('login.html', 429, retry_after, 'Too many login attempts. Please try again later.')
+        rate_limiter.hit('ip', ip)
+        
+        user = User.query.filter_by(username=username).first()
+        try:
+            # Unknown usernames are checked against a dummy hash so they take as long
+            valid, new_hash = password_hasher.verify(user.password_hash if user else None, password,
+                                                     priority=is_priority(ip))
+        except HasherBusy:
+            return try_again_later('login.html', 503, 1, 'The server is busy. Please try again in a moment.')
+        
+        if valid:
+            rate_limiter.reset('username_failures', username)
+            if new_hash:
+                # Stored with older hash parameters: upgrade it now that we have the password
+                user.password_hash = new_hash
+                db.session.commit()
+
+            # If still banned, show banned notice page and block login (an expired ban no longer counts)
+            if user.ban_in_effect():
+                ctx = build_ban_context(user)
+                return render_template(
+                    'banned.html',
+                    user=user,
+                    reason=ctx['reason'],
+                    is_permanent=ctx['is_permanent'],
+                    remaining_days=ctx['remaining_days'],
+                    until_date=ctx['until_date']
+                )
+            
+            login_user(user)
+            return redirect(url_for('store.index'))
+        else:
+            rate_limiter.hit('ip_failures', ip)
+            rate_limiter.hit('username_failures', username)
+            flash('Invalid username or password')
+    
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('store.index'))
+
+@bp.route('/profile')
+@login_required
+def profile():
+    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
+    recent_purchases, more_purchases = get_library_page(current_user.id, per_page=PROFILE_LIBRARY_GAMES)
+    
+    # Get user's active vouchers (not used)
+    active_vouchers = Voucher.query.filter_by(
+        user_id=current_user.id, 
+        is_used=False
+    ).order_by(Voucher.created_at.desc()).all()
+    
+    return render_template('profile.html', 
+                         notifications=notifications, 
+                         recent_purchases=recent_purchases,
+                         more_purchases=more_purchases is not None,
+                         summary=library_summary(current_user.id),
+                         active_vouchers=active_vouchers)
+
+@bp.route('/library')
+@read_replica
+@login_required
+def library():
+    purchases, next_cursor = get_library_page(current_user.id, request.args.get('cursor'))
+    return render_template('library.html', purchases=purchases, next_cursor=next_cursor,
+                           summary=library_summary(current_user.id))
+
+@bp.route('/edit_profile', methods=['GET', 'POST'])
+@login_required
+def edit_profile():
+    if request.method == 'POST':
+        current_user.bio = request.form.get('bio', '')
+        previous_picture = current_user.profile_picture
+        pending_path = None
+        # Handle profile picture upload
+        if 'profile_picture' in request.files:
+            file = request.files['profile_picture']
+            if file and file.filename:
+                try:
+                    upload_path, pending_path = stage_image_upload(file, 'avatars')
+                except InvalidImage:
+                    flash('Profile picture must be a valid image file')
+                    return redirect(url_for('account.edit_profile'))
+                current_user.profile_picture = pending_path or upload_path
+        db.session.commit()
+        if pending_path:
+            process_image_upload(User, current_user.id, 'profile_picture', pending_path, upload_path, previous_picture)
+        flash('Profile updated successfully')
+        return redirect(url_for('account.profile'))
+    
+    return render_template('edit_profile.html')
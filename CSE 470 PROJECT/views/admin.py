@@ -0,0 +1,302 @@
+# Admin blueprint: catalog management, users, bans and admin notifications
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload
+
+from extensions import db, query_stats
+from models import User, Game, GameLending, Notification, AdminNotification, NotifyRequest
+from services import ban_user, check_expired_bans, check_overdue_games, unban_user
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin')
+@login_required
+def admin():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    games = Game.query.order_by(Game.created_at.desc()).all()
+    users = User.query.all()
+    notify_counts = {g.id: NotifyRequest.query.filter_by(game_id=g.id).count() for g in games}
+    return render_template('admin.html', games=games, users=users, notify_counts=notify_counts)
+
+@bp.route('/admin/query_stats')
+@login_required
+def admin_query_stats():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    return jsonify(query_stats.summary())
+
+@bp.route('/admin/add_game', methods=['GET', 'POST'])
+@login_required
+def add_game():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    if request.method == 'POST':
+        genre = request.form.getlist('genre')
+        genre_str = ', '.join(genre)
+        game = Game(
+            title=request.form['title'],
+            description=request.form['description'],
+            price=float(request.form['price']),
+            genre=genre_str,
+            platform=request.form['platform'],
+            image_url=request.form.get('image_url', '/static/images/default_game.jpg'),
+            voice_preview_url=request.form.get('voice_preview_url', '')
+        )
+        db.session.add(game)
+        db.session.commit()
+        # Send notification to all users
+        users = User.query.all()
+        for user in users:
+            notification = Notification(
+                user_id=user.id,
+                title='New Game Added!',
+                message=f'Check out the new game: {game.title}'
+            )
+            db.session.add(notification)
+        db.session.commit()
+        flash('Game added successfully and notifications sent')
+        return redirect(url_for('admin.admin'))
+    return render_template('add_game.html')
+
+@bp.route('/admin/edit_game/<int:game_id>', methods=['GET', 'POST'])
+@login_required
+def edit_game(game_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    game = Game.query.get_or_404(game_id)
+    if request.method == 'POST':
+        genre = request.form.getlist('genre')
+        genre_str = ', '.join(genre)
+        game.genre = genre_str
+        game.price = float(request.form['price'])
+        game.platform = request.form['platform']
+        game.description = request.form['description']
+        game.image_url = request.form['image_url']
+        game.voice_preview_url = request.form['voice_preview_url']
+        prev_available = game.is_available
+        game.is_available = request.form['is_available'] == 'True'
+        db.session.commit()
+        # Notify users if status changed from not available to available
+        if not prev_available and game.is_available:
+            notify_requests = NotifyRequest.query.filter_by(game_id=game.id).all()
+            for req in notify_requests:
+                notification = Notification(
+                    user_id=req.user_id,
+                    title='Game Available!',
+                    message=f'The game "{game.title}" is now available!'
+                )
+                db.session.add(notification)
+                db.session.delete(req)
+            db.session.commit()
+        flash('Game updated successfully')
+        return redirect(url_for('admin.admin'))
+    return render_template('edit_game.html', game=game)
+
+@bp.route('/admin/notify_users/<int:game_id>', methods=['POST'])
+@login_required
+def admin_notify_users(game_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('admin.admin'))
+    
+    game = Game.query.get_or_404(game_id)
+    users = User.query.filter_by(is_banned=False).all()
+    for user in users:
+        notification = Notification(
+            user_id=user.id,
+            title='Game Update',
+            message=f'Check out updates for: {game.title}'
+        )
+        db.session.add(notification)
+    db.session.commit()
+    flash(f'Notifications sent to {len(users)} users')
+    return redirect(url_for('admin.admin'))
+
+@bp.route('/admin/users')
+@login_required
+def admin_users():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    users = User.query.all()
+
+    # Lendings flagged by the overdue sweep (scripts/run_scheduled_jobs.py or the button
+    # posting to admin_check_overdue), grouped by borrower; this page only reads them
+    overdue_lendings = GameLending.query.options(joinedload(GameLending.game)).filter(
+        GameLending.borrower_id.isnot(None),
+        GameLending.is_overdue == True,
+        GameLending.is_returned == False
+    ).order_by(GameLending.borrower_id, GameLending.return_date).all()
+    overdue_count = len(overdue_lendings)
+    by_borrower = {}
+    for lending in overdue_lendings:
+        by_borrower.setdefault(lending.borrower_id, []).append(lending)
+    overdue_users = [
+        {'user': user, 'overdue_games': by_borrower[user.id], 'overdue_count': len(by_borrower[user.id])}
+        for user in users if user.id in by_borrower
+    ]
+    
+    return render_template('admin_users.html', users=users, overdue_users=overdue_users, overdue_count=overdue_count, timedelta=timedelta)
+
+@bp.route('/admin/ban_user/<int:user_id>', methods=['POST'])
+@login_required
+def admin_ban_user(user_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    reason = request.form.get('reason', 'No reason provided')
+    ban_type = request.form.get('ban_type', 'permanent')
+    duration_days = None
+    
+    if ban_type == 'temporary':
+        duration_days = request.form.get('duration_days', type=int)
+        if not duration_days or duration_days < 1 or duration_days > 365:
+            flash('Please enter a valid duration between 1 and 365 days')
+            return redirect(url_for('admin.admin_users'))
+    
+    if ban_user(user_id, current_user.id, reason, duration_days):
+        if duration_days:
+            flash(f'User banned successfully for {duration_days} days')
+        else:
+            flash('User banned permanently')
+    else:
+        flash('Failed to ban user')
+    
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/ban_user_page/<int:user_id>')
+@login_required
+def admin_ban_user_page(user_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    user = User.query.get_or_404(user_id)
+    if user.is_admin:
+        flash('Cannot ban admin users')
+        return redirect(url_for('admin.admin_users'))
+    
+    return render_template('ban_user.html', user=user)
+
+@bp.route('/admin/unban_user/<int:user_id>', methods=['POST'])
+@login_required
+def admin_unban_user(user_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    if unban_user(user_id, current_user.id):
+        flash('User unbanned successfully')
+    else:
+        flash('Failed to unban user')
+    
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/notifications')
+@login_required
+def admin_notifications():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    notifications = AdminNotification.query.order_by(AdminNotification.created_at.desc()).all()
+    return render_template('admin_notifications.html', notifications=notifications)
+
+@bp.route('/admin/mark_notification_read/<int:notification_id>', methods=['POST'])
+@login_required
+def admin_mark_notification_read(notification_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    notification = AdminNotification.query.get_or_404(notification_id)
+    notification.is_read = True
+    db.session.commit()
+    
+    return redirect(url_for('admin.admin_notifications'))
+
+@bp.route('/admin/check_overdue', methods=['POST'])
+@login_required
+def admin_check_overdue():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    overdue_count = check_overdue_games()
+    flash(f'Checked for overdue games. Found {overdue_count} overdue items.')
+    
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/check_expired_bans')
+@login_required
+def admin_check_expired_bans():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    expired_count = check_expired_bans()
+    flash(f'Checked for expired bans. Unbanned {expired_count} users.')
+    
+    return redirect(url_for('admin.admin_users'))
+
+@bp.route('/admin/send_global_notification', methods=['POST'])
+@login_required
+def send_global_notification():
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    message = request.form.get('message', '').strip()
+    if not message:
+        flash('Please enter a message for the notification')
+        return redirect(url_for('admin.admin'))
+    
+    # Get all non-banned users
+    users = User.query.filter_by(is_banned=False).all()
+    
+    # Create notification for each user
+    for user in users:
+        notification = Notification(
+            user_id=user.id,
+            title='Global Notification',
+            message=message,
+            notification_type='general'
+        )
+        db.session.add(notification)
+    
+    db.session.commit()
+    flash(f'Global notification sent to {len(users)} users')
+    return redirect(url_for('admin.admin'))
+
+# Test route for creating overdue games (remove in production)
+@bp.route('/test/create_overdue/<int:lending_id>')
+@login_required
+def test_create_overdue(lending_id):
+    if not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('store.index'))
+    
+    lending = GameLending.query.get_or_404(lending_id)
+    if lending.borrower_id and not lending.is_returned:
+        # Set return date to yesterday to make it overdue
+        lending.return_date = datetime.utcnow() - timedelta(days=1)
+        lending.overdue_notification_sent = False
+        db.session.commit()
+        
+        # Trigger overdue check
+        check_overdue_games()
+        flash(f'Made game "{lending.game.title}" overdue for testing')
+    else:
+        flash('Game is not currently borrowed')
+    
+    return redirect(url_for('admin.admin_users'))
@@ -0,0 +1,289 @@
+# API blueprint: versioned read-only JSON over the catalog, reviews, setups, lendings and notifications
+
+import gzip
+import json
+
+from flask import Blueprint, current_app, request
+from flask_login import current_user
+from sqlalchemy import and_, or_, select
+from werkzeug.exceptions import HTTPException
+
+from database import read_replica
+from extensions import db
+from models import Game, GameLending, Notification, Review, SetupPost, User
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is several times slower on large pages
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is still offered
+    brotli = None
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+MAX_IDS = 200
+COMPRESS_MIN_BYTES = 1024  # smaller bodies gain less than the headers and CPU cost
+
+
+class Resource:
+    """A model exposed by the API.
+
+    ``fields`` maps each public field name to a column expression; a
+    request selects only the columns of the fields it asks for and turns
+    the rows straight into dicts, so no ORM objects are built. Fields of
+    a ``joins`` model add that join only when requested. ``scope(user)``
+    returns the WHERE clause limiting which rows the user may read
+    (resources with a scope need a signed-in user).
+    """
+
+    def __init__(self, model, fields, default, filters=None, joins=None, scope=None):
+        self.model = model
+        self.fields = fields
+        self.default = default
+        self.filters = filters or {}
+        self.joins = joins or {}
+        self.scope = scope
+        self._statements = {}
+
+    def statement(self, names):
+        """SELECT of the given fields; built once per field combination"""
+        statement = self._statements.get(names)
+        if statement is None:
+            statement = select(*(self.fields[name].label(name) for name in names)).select_from(self.model)
+            for target, onclause in self.joins.items():
+                if any(self.fields[name].table is target.__table__ for name in names):
+                    statement = statement.outerjoin(target, onclause)
+            self._statements[names] = statement
+        return statement
+
+
+def _flag(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _lendings_scope(user):
+    if user.is_admin:
+        return None
+    # Open offers, and the user's own loans either way
+    return or_(
+        and_(GameLending.borrower_id.is_(None), GameLending.is_returned == False),  # noqa: E712
+        GameLending.lender_id == user.id,
+        GameLending.borrower_id == user.id,
+    )
+
+
+RESOURCES = {
+    'games': Resource(
+        Game,
+        fields={
+            'id': Game.id, 'title': Game.title, 'description': Game.description, 'price': Game.price,
+            'genre': Game.genre, 'platform': Game.platform, 'release_date': Game.release_date,
+            'image_url': Game.image_url, 'is_available': Game.is_available, 'created_at': Game.created_at,
+        },
+        default=('id', 'title', 'price', 'genre', 'platform', 'image_url', 'is_available'),
+        filters={
+            'genre': lambda value: Game.genre.ilike(f'%{value.strip()}%'),
+            'platform': lambda value: Game.platform == value,
+            'available': lambda value: Game.is_available == _flag(value),
+        },
+    ),
+    'reviews': Resource(
+        Review,
+        fields={
+            'id': Review.id, 'game_id': Review.game_id, 'user_id': Review.user_id, 'username': User.username,
+            'rating': Review.rating, 'content': Review.content, 'likes': Review.likes,
+            'dislikes': Review.dislikes, 'comment_count': Review.comment_count, 'created_at': Review.created_at,
+        },
+        default=('id', 'game_id', 'username', 'rating', 'content', 'likes', 'dislikes', 'comment_count', 'created_at'),
+        filters={
+            'game_id': lambda value: Review.game_id == int(value),
+            'user_id': lambda value: Review.user_id == int(value),
+        },
+        joins={User: User.id == Review.user_id},
+    ),
+    'setups': Resource(
+        SetupPost,
+        fields={
+            'id': SetupPost.id, 'user_id': SetupPost.user_id, 'username': User.username,
+            'title': SetupPost.title, 'description': SetupPost.description, 'image_url': SetupPost.image_url,
+            'likes': SetupPost.likes, 'dislikes': SetupPost.dislikes, 'cleanest_votes': SetupPost.cleanest_votes,
+            'rgb_votes': SetupPost.rgb_votes, 'budget_votes': SetupPost.budget_votes,
+            'is_featured': SetupPost.is_featured, 'hot_score': SetupPost.hot_score, 'created_at': SetupPost.created_at,
+        },
+        default=('id', 'username', 'title', 'image_url', 'likes', 'dislikes', 'is_featured', 'created_at'),
+        filters={
+            'user_id': lambda value: SetupPost.user_id == int(value),
+            'featured': lambda value: SetupPost.is_featured == _flag(value),
+        },
+        joins={User: User.id == SetupPost.user_id},
+    ),
+    'lendings': Resource(
+        GameLending,
+        fields={
+            'id': GameLending.id, 'game_id': GameLending.game_id, 'game_title': Game.title,
+            'lender_id': GameLending.lender_id, 'borrower_id': GameLending.borrower_id,
+            'lend_date': GameLending.lend_date, 'return_date': GameLending.return_date,
+            'is_returned': GameLending.is_returned, 'is_overdue': GameLending.is_overdue,
+        },
+        default=('id', 'game_id', 'game_title', 'lender_id', 'borrower_id', 'lend_date', 'return_date',
+                 'is_returned', 'is_overdue'),
+        filters={
+            'game_id': lambda value: GameLending.game_id == int(value),
+            'lender_id': lambda value: GameLending.lender_id == int(value),
+            'borrower_id': lambda value: GameLending.borrower_id == int(value),
+            'returned': lambda value: GameLending.is_returned == _flag(value),
+        },
+        joins={Game: Game.id == GameLending.game_id},
+        scope=_lendings_scope,
+    ),
+    'notifications': Resource(
+        Notification,
+        fields={
+            'id': Notification.id, 'title': Notification.title, 'message': Notification.message,
+            'type': Notification.notification_type, 'is_read': Notification.is_read,
+            'created_at': Notification.created_at,
+        },
+        default=('id', 'title', 'message', 'type', 'is_read', 'created_at'),
+        filters={'unread': lambda value: Notification.is_read == (not _flag(value))},
+        scope=lambda user: Notification.user_id == user.id,
+    ),
+}
+
+
+class APIError(HTTPException):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+@bp.errorhandler(HTTPException)
+def api_error(error):
+    return json_response({'error': error.description}, error.code or 500)
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=lambda value: value.isoformat()).encode()
+
+
+def json_response(payload, status=200):
+    """JSON body, brotli- or gzip-compressed when the client accepts it and it is worth it"""
+    body = dumps(payload)
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None and request.accept_encodings['br']:
+            response.set_data(brotli.compress(body, quality=4))  # fast settings; this runs per request
+            response.content_encoding = 'br'
+        elif request.accept_encodings['gzip']:
+            response.set_data(gzip.compress(body, compresslevel=5))
+            response.content_encoding = 'gzip'
+    return response
+
+
+def _resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise APIError(404, f"Unknown resource '{name}'; see /api/v1/")
+    if resource.scope is not None and not current_user.is_authenticated:
+        raise APIError(401, 'Login required')
+    return resource
+
+
+def _fields(resource):
+    """Requested field names as a tuple (id always included: cursors and batches key on it)"""
+    requested = request.args.get('fields')
+    if not requested:
+        return resource.default
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise APIError(400, f"Unknown fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(['id'] + names))
+
+
+def _int_list(value, limit):
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise APIError(400, 'ids must be integers')
+    if len(ids) > limit:
+        raise APIError(400, f"At most {limit} ids per request")
+    return ids
+
+
+def _scoped(resource, names):
+    statement = resource.statement(names)
+    if resource.scope is not None:
+        clause = resource.scope(current_user)
+        if clause is not None:
+            statement = statement.where(clause)
+    return statement
+
+
+def _rows(statement, names):
+    return [dict(zip(names, row)) for row in db.session.execute(statement)]
+
+
+@bp.route('/')
+def index():
+    """What each resource offers"""
+    return json_response({
+        name: {'fields': list(resource.fields), 'default': list(resource.default),
+               'filters': list(resource.filters), 'login_required': resource.scope is not None}
+        for name, resource in RESOURCES.items()
+    })
+
+
+@bp.route('/<name>')
+@read_replica
+def collection(name):
+    """A page of rows, newest first (``order=asc`` for oldest first).
+
+    ``?ids=1,2,3`` fetches those rows instead (ids not found, or not
+    visible to the user, are listed under ``missing``). Otherwise pass
+    the returned ``next`` as ``after`` to get the following page.
+    """
+    resource = _resource(name)
+    names = _fields(resource)
+    statement = _scoped(resource, names)
+    model_id = resource.model.id
+
+    if 'ids' in request.args:
+        ids = _int_list(request.args['ids'], MAX_IDS)
+        rows = _rows(statement.where(model_id.in_(ids)).order_by(model_id), names) if ids else []
+        found = {row['id'] for row in rows}
+        return json_response({'data': rows, 'missing': [i for i in dict.fromkeys(ids) if i not in found]})
+
+    for key, value in request.args.items():
+        if key in resource.filters:
+            try:
+                statement = statement.where(resource.filters[key](value))
+            except ValueError:
+                raise APIError(400, f"Invalid value for {key}")
+    limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+    ascending = request.args.get('order') == 'asc'
+    after = request.args.get('after', type=int)
+    if after is not None:
+        statement = statement.where(model_id > after if ascending else model_id < after)
+    statement = statement.order_by(model_id.asc() if ascending else model_id.desc()).limit(limit)
+
+    rows = _rows(statement, names)
+    return json_response({'data': rows, 'next': rows[-1]['id'] if len(rows) == limit else None})
+
+
+@bp.route('/<name>/<int:item_id>')
+@read_replica
+def item(name, item_id):
+    resource = _resource(name)
+    names = _fields(resource)
+    rows = _rows(_scoped(resource, names).where(resource.model.id == item_id), names)
+    if not rows:
+        raise APIError(404, f"No {name} with id {item_id}")
+    return json_response({'data': rows[0]})
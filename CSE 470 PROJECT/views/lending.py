@@ -0,0 +1,182 @@
+# Lending blueprint: offering, borrowing and returning games
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from extensions import db
+from models import Game, Purchase, GameLending
+
+bp = Blueprint('lending', __name__)
+
+@bp.route('/lend_games')
+@login_required
+def lend_games():
+    # Get user's purchased games that are PS3, PS4, or PS5
+    purchased_games = db.session.query(Game).join(Purchase).filter(
+        Purchase.user_id == current_user.id
+    ).all()
+    
+    # Filter games by platform (PS3, PS4, PS5)
+    ps_games = []
+    for game in purchased_games:
+        if game.platform:
+            platforms = [p.strip() for p in game.platform.split(',')]
+            if any(p in ['PS3', 'PS4', 'PS5'] for p in platforms):
+                ps_games.append(game)
+    
+    # Get available lendings (not borrowed yet)
+    available_lendings = GameLending.query.filter_by(borrower_id=None).all()
+    
+    # Get user's current lending posts
+    user_lendings = GameLending.query.filter_by(lender_id=current_user.id).all()
+    
+    # Get borrowed games (games borrowed by current user)
+    borrowed_games = GameLending.query.filter_by(borrower_id=current_user.id, is_returned=False).all()
+    
+    return render_template('lend_games.html', 
+                         ps_games=ps_games, 
+                         available_lendings=available_lendings,
+                         user_lendings=user_lendings,
+                         borrowed_games=borrowed_games)
+
+@bp.route('/lend_game/<int:game_id>')
+@login_required
+def lend_game(game_id):
+    # Check if user owns the game
+    purchase = Purchase.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if not purchase:
+        flash('You do not own this game')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Check if game is already being lent
+    existing_lending = GameLending.query.filter_by(
+        lender_id=current_user.id, 
+        game_id=game_id,
+        borrower_id=None
+    ).first()
+    
+    if existing_lending:
+        flash('This game is already available for lending')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Check if game is currently borrowed
+    borrowed_lending = GameLending.query.filter_by(
+        lender_id=current_user.id, 
+        game_id=game_id,
+        is_returned=False
+    ).filter(GameLending.borrower_id.isnot(None)).first()
+    
+    if borrowed_lending:
+        flash('This game is currently borrowed and cannot be lent again')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Check if game platform is supported (PS3, PS4, PS5)
+    game = Game.query.get(game_id)
+    if not game.platform:
+        flash('This game does not have a platform specified')
+        return redirect(url_for('lending.lend_games'))
+    
+    platforms = [p.strip() for p in game.platform.split(',')]
+    if not any(p in ['PS3', 'PS4', 'PS5'] for p in platforms):
+        flash('Only PS3, PS4, and PS5 games can be lent')
+        return redirect(url_for('lending.lend_games'))
+    
+    lending = GameLending(lender_id=current_user.id, game_id=game_id)
+    db.session.add(lending)
+    db.session.commit()
+    
+    flash('Game is now available for lending')
+    return redirect(url_for('lending.lend_games'))
+
+@bp.route('/borrow_game/<int:lending_id>')
+@login_required
+def borrow_game(lending_id):
+    lending = GameLending.query.get_or_404(lending_id)
+    
+    # Check if user is trying to borrow their own game
+    if lending.lender_id == current_user.id:
+        flash('You cannot borrow your own game')
+        return redirect(url_for('lending.lend_games'))
+    
+    if lending.borrower_id:
+        flash('Game is already borrowed')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Redirect to duration selection page
+    return render_template('select_duration.html', lending=lending)
+
+@bp.route('/process_borrow/<int:lending_id>', methods=['POST'])
+@login_required
+def process_borrow(lending_id):
+    lending = GameLending.query.get_or_404(lending_id)
+    
+    # Check if user is trying to borrow their own game
+    if lending.lender_id == current_user.id:
+        flash('You cannot borrow your own game')
+        return redirect(url_for('lending.lend_games'))
+    
+    if lending.borrower_id:
+        flash('Game is already borrowed')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Get duration from form
+    duration_days = request.form.get('duration_days', type=int)
+    if not duration_days or duration_days < 1 or duration_days > 30:
+        flash('Please select a valid duration between 1 and 30 days')
+        return redirect(url_for('lending.borrow_game', lending_id=lending_id))
+    
+    # Calculate return date
+    return_date = datetime.utcnow() + timedelta(days=duration_days)
+    
+    # Process the borrowing
+    lending.borrower_id = current_user.id
+    lending.return_date = return_date
+    db.session.commit()
+    
+    flash(f'Game borrowed successfully for {duration_days} days. Please return by {return_date.strftime("%Y-%m-%d")}')
+    return redirect(url_for('lending.lend_games'))
+
+@bp.route('/delete_lending/<int:lending_id>', methods=['POST'])
+@login_required
+def delete_lending(lending_id):
+    lending = GameLending.query.get_or_404(lending_id)
+    
+    # Check if user owns this lending post
+    if lending.lender_id != current_user.id:
+        flash('You can only delete your own lending posts')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Check if game is currently borrowed
+    if lending.borrower_id and not lending.is_returned:
+        flash('Cannot delete lending post while game is borrowed')
+        return redirect(url_for('lending.lend_games'))
+    
+    db.session.delete(lending)
+    db.session.commit()
+    
+    flash('Lending post deleted successfully')
+    return redirect(url_for('lending.lend_games'))
+
+@bp.route('/return_game/<int:lending_id>', methods=['POST'])
+@login_required
+def return_game(lending_id):
+    lending = GameLending.query.get_or_404(lending_id)
+    
+    # Check if user is the borrower
+    if lending.borrower_id != current_user.id:
+        flash('You can only return games you borrowed')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Check if game is already returned
+    if lending.is_returned:
+        flash('This game is already returned')
+        return redirect(url_for('lending.lend_games'))
+    
+    # Mark game as returned
+    lending.is_returned = True
+    db.session.commit()
+    
+    flash('Game returned successfully')
+    return redirect(url_for('lending.lend_games'))
@@ -0,0 +1,69 @@
+# Notifications blueprint: the user inbox
+
+from flask import Blueprint, Response, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from database import read_replica
+from extensions import db, notification_hub
+from models import Notification
+from notification_hub import format_event
+from services import mark_notifications_read
+
+bp = Blueprint('notifications', __name__)
+
+# How long browsers wait before asking this view again (asgi.py keeps the stream open instead)
+POLL_RETRY_MS = 15000
+
+@bp.route('/notifications')
+@read_replica
+@login_required
+def user_notifications():
+    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(Notification.created_at.desc()).all()
+    return render_template('notifications.html', notifications=notifications)
+
+@bp.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-sent events for new notifications.
+
+    asgi.py serves this path as a push stream. Here a sync worker must not be
+    held per open page, so the response carries what arrived since the
+    browser's Last-Event-ID and ends; EventSource reconnects after the retry.
+    """
+    events, cursor = notification_hub.replay(db.session, current_user.id, request.headers.get('Last-Event-ID', type=int))
+    body = f"retry: {POLL_RETRY_MS}\nid: {cursor}\n\n" + ''.join(format_event(item) for item in events)
+    return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@bp.route('/mark_notification_read/<int:notification_id>', methods=['POST'])
+@login_required
+def mark_notification_read(notification_id):
+    notification = Notification.query.get_or_404(notification_id)
+    if notification.user_id == current_user.id:
+        notification.is_read = True
+        db.session.commit()
+    
+    return redirect(url_for('notifications.user_notifications'))
+
+@bp.route('/mark_notifications_read', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    # Also served without a worker thread by asgi.py
+    updated = mark_notifications_read(db.session, current_user.id)
+    db.session.commit()
+    return jsonify({'success': True, 'updated': updated})
+
+@bp.route('/clear_notifications', methods=['POST'])
+@login_required
+def clear_notifications():
+    Notification.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+    flash('All notifications cleared!')
+    return redirect(url_for('account.profile'))
+
+@bp.route('/clear_all_notifications', methods=['POST'])
+@login_required
+def clear_all_notifications():
+    Notification.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+    flash('All notifications cleared')
+    return redirect(url_for('notifications.user_notifications'))
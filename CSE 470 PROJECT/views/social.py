@@ -0,0 +1,326 @@
+# Social blueprint: reviews, comments, the leaderboard and the setups gallery
+
+import base64
+import json
+import math
+from datetime import datetime
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+
+from database import read_replica
+from extensions import db, fragment_cache
+from models import User, Review, ReviewComment, Purchase, SetupPost, Notification
+from services import apply_review_vote, apply_setup_vote, process_image_upload, stage_image_upload
+from uploads import InvalidImage
+
+bp = Blueprint('social', __name__)
+
+@bp.route('/review_game/<int:game_id>', methods=['POST'])
+@login_required
+def review_game(game_id):
+    if current_user.is_admin:
+        flash('Admins cannot post reviews.')
+        return redirect(url_for('store.game_detail', game_id=game_id))
+    # Only allow review if user owns the game
+    owns_game = Purchase.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if not owns_game:
+        flash('You can only review games you own.')
+        return redirect(url_for('store.game_detail', game_id=game_id))
+    rating = int(request.form['rating'])
+    content = request.form['content']
+    existing_review = Review.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if existing_review:
+        existing_review.rating = rating
+        existing_review.content = content
+    else:
+        review = Review(
+            user_id=current_user.id,
+            game_id=game_id,
+            rating=rating,
+            content=content
+        )
+        db.session.add(review)
+        # Award popularity points
+        current_user.popularity_points = User.popularity_points + 50  # in SQL, so a concurrent redemption is not undone
+    db.session.commit()
+    flash('Review submitted successfully')
+    return redirect(url_for('store.game_detail', game_id=game_id))
+
+@bp.route('/vote_review', methods=['POST'])
+@login_required
+def vote_review():
+    # Also served without a worker thread by asgi.py
+    body, status = apply_review_vote(db.session, current_user, int(request.form['review_id']), request.form['vote_type'])
+    if status == 200:
+        db.session.commit()
+    return jsonify(body), status
+
+@bp.route('/comment_review', methods=['POST'])
+@login_required
+def comment_review():
+    review_id = int(request.form['review_id'])
+    content = request.form['content']
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    
+    # Count the comment, and get what the notification and redirect need, without loading the review
+    review = db.session.execute(
+        update(Review).where(Review.id == review_id).values(comment_count=Review.comment_count + 1)
+        .returning(Review.user_id, Review.game_id, Review.comment_count)
+    ).one_or_none()
+    if review is None:
+        if wants_json:
+            return jsonify({'success': False, 'message': 'Review not found'}), 404
+        abort(404)
+    
+    comment = ReviewComment(
+        user_id=current_user.id,
+        review_id=review_id,
+        content=content
+    )
+    db.session.add(comment)
+    
+    # Create notification
+    if review.user_id != current_user.id:
+        notification = Notification(
+            user_id=review.user_id,
+            title='New Comment',
+            message=f'{current_user.username} commented on your review'
+        )
+        db.session.add(notification)
+    
+    db.session.commit()
+    if wants_json:
+        # Posted from the game page: send back just the new comment
+        return jsonify({'success': True, 'html': render_template('_review_comment.html', comment=comment),
+                        'comment_count': review.comment_count})
+    return redirect(url_for('store.game_detail', game_id=review.game_id))
+
+COMMENTS_PER_PAGE = 20
+
+def get_comments_page(review_id, after=None, per_page=COMMENTS_PER_PAGE):
+    """Fetch one page of a review's comments (with their authors), oldest first, and the id to continue after"""
+    query = ReviewComment.query.options(joinedload(ReviewComment.user)).filter(
+        ReviewComment.review_id == review_id
+    ).order_by(ReviewComment.id)
+    if after:
+        query = query.filter(ReviewComment.id > after)
+    comments = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(comments) > per_page:
+        comments = comments[:per_page]
+        next_cursor = comments[-1].id
+    return comments, next_cursor
+
+@bp.route('/review/<int:review_id>/comments')
+@read_replica
+@login_required
+def review_comments(review_id):
+    """Comment thread of a review, loaded on demand: rendered comments plus the cursor for the next page"""
+    comments, next_cursor = get_comments_page(review_id, request.args.get('after', type=int))
+    html = ''.join(render_template('_review_comment.html', comment=comment) for comment in comments)
+    return jsonify({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+@bp.route('/edit_comment/<int:comment_id>', methods=['GET', 'POST'])
+@login_required
+def edit_comment(comment_id):
+    comment = ReviewComment.query.get_or_404(comment_id)
+    if comment.user_id != current_user.id:
+        flash('You are not authorized to edit this comment.')
+        return redirect(url_for('store.game_detail', game_id=comment.review.game_id))
+    if request.method == 'POST':
+        new_content = request.form['content']
+        comment.content = new_content
+        db.session.commit()
+        flash('Comment updated successfully!')
+        return redirect(url_for('store.game_detail', game_id=comment.review.game_id))
+    return render_template('edit_comment.html', comment=comment)
+
+@bp.route('/delete_comment/<int:comment_id>', methods=['POST'])
+@login_required
+def delete_comment(comment_id):
+    comment = ReviewComment.query.get_or_404(comment_id)
+    if comment.user_id != current_user.id:
+        flash('You are not authorized to delete this comment.')
+        return redirect(url_for('store.game_detail', game_id=comment.review.game_id))
+    game_id = db.session.execute(
+        update(Review).where(Review.id == comment.review_id).values(comment_count=Review.comment_count - 1)
+        .returning(Review.game_id)
+    ).scalar()
+    db.session.delete(comment)
+    db.session.commit()
+    flash('Comment deleted successfully!')
+    return redirect(url_for('store.game_detail', game_id=game_id))
+
+@bp.route('/leaderboard')
+@read_replica
+@fragment_cache.conditional('User')
+def leaderboard():
+    users = User.query.filter_by(is_admin=False).order_by(User.popularity_points.desc()).limit(20).all()
+    return render_template('leaderboard.html', users=users)
+
+# Setups gallery: sort mode -> column, paginated by (column, id) keyset
+SETUP_SORTS = {
+    'newest': SetupPost.created_at,
+    'hot': SetupPost.hot_score,
+    'top': SetupPost.likes,
+    'cleanest': SetupPost.cleanest_votes,
+    'rgb': SetupPost.rgb_votes,
+    'budget': SetupPost.budget_votes,
+}
+
+SETUPS_PER_PAGE = 12
+
+def encode_setup_cursor(setup, sort):
+    value = getattr(setup, SETUP_SORTS[sort].key)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, setup.id]).encode()).decode()
+
+def decode_setup_cursor(cursor, sort):
+    """Return (sort value, id) from a cursor, or None if it is missing, malformed or of the wrong types"""
+    if not cursor:
+        return None
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    # bool is an int too, and json accepts NaN and Infinity; none of them came from encode_setup_cursor
+    if type(last_id) is not int:
+        return None
+    expected = SETUP_SORTS[sort].type.python_type
+    if expected is datetime:
+        if not isinstance(value, str):
+            return None
+        try:
+            return datetime.fromisoformat(value), last_id
+        except ValueError:
+            return None
+    if type(value) not in ((int, float) if expected is float else (int,)) or not math.isfinite(value):
+        return None
+    return value, last_id
+
+def get_setups_page(sort, cursor=None, per_page=SETUPS_PER_PAGE):
+    """Fetch one page of setups (with their authors) and the cursor for the next page"""
+    column = SETUP_SORTS[sort]
+    query = SetupPost.query.options(joinedload(SetupPost.user)).order_by(column.desc(), SetupPost.id.desc())
+    position = decode_setup_cursor(cursor, sort)
+    if position:
+        query = query.filter(db.tuple_(column, SetupPost.id) < position)
+    setups = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(setups) > per_page:
+        setups = setups[:per_page]
+        next_cursor = encode_setup_cursor(setups[-1], sort)
+    return setups, next_cursor
+
+@bp.route('/setups')
+@read_replica
+@fragment_cache.conditional('SetupPost', 'User:{user_id}')
+def setups():
+    sort = request.args.get('sort', 'newest')
+    if sort not in SETUP_SORTS:
+        sort = 'newest'
+    setups, next_cursor = get_setups_page(sort, request.args.get('cursor'))
+    return render_template('setups.html', setups=setups, sort=sort, next_cursor=next_cursor)
+
+@bp.route('/setups/page')
+@read_replica
+def setups_page():
+    """Infinite-scroll endpoint: rendered setup cards plus the next cursor"""
+    sort = request.args.get('sort', 'newest')
+    if sort not in SETUP_SORTS:
+        return jsonify({'success': False, 'message': 'Invalid sort'}), 400
+    setups, next_cursor = get_setups_page(sort, request.args.get('cursor'))
+    html = ''.join(render_template('_setup_card.html', setup=setup) for setup in setups)
+    return jsonify({'success': True, 'html': html, 'next_cursor': next_cursor})
+
+@bp.route('/post_setup', methods=['GET', 'POST'])
+@login_required
+def post_setup():
+    if current_user.is_admin:
+        flash('Admins cannot post setups.')
+        return redirect(url_for('social.setups'))
+    if request.method == 'POST':
+        title = request.form['title']
+        description = request.form['description']
+        default_image_url = '/static/uploads/setups/default_setup.jpg'
+        image_url = default_image_url
+        pending_path = None
+        # Handle file upload; the image is resized in the background
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename:
+                try:
+                    upload_path, pending_path = stage_image_upload(file, 'setups')
+                except InvalidImage:
+                    flash('Setup image must be a valid image file')
+                    return redirect(url_for('social.post_setup'))
+                image_url = '/static/uploads/' + (pending_path or upload_path)
+        setup = SetupPost(
+            user_id=current_user.id,
+            title=title,
+            description=description,
+            image_url=image_url,
+            created_at=datetime.utcnow()
+        )
+        setup.update_hot_score()
+        db.session.add(setup)
+        db.session.commit()
+        if pending_path:
+            process_image_upload(SetupPost, setup.id, 'image_url', pending_path, upload_path, default_image_url, '/static/uploads/')
+        flash('Setup posted successfully')
+        return redirect(url_for('social.setups'))
+    return render_template('post_setup.html')
+
+@bp.route('/vote_setup', methods=['POST'])
+@login_required
+def vote_setup():
+    # Also served without a worker thread by asgi.py
+    body, status = apply_setup_vote(db.session, current_user, int(request.form['setup_id']), request.form['vote_type'])
+    if status == 200:
+        db.session.commit()
+    return jsonify(body), status
+
+@bp.route('/edit_setup/<int:setup_id>', methods=['GET', 'POST'])
+@login_required
+def edit_setup(setup_id):
+    setup = SetupPost.query.get_or_404(setup_id)
+    if current_user.id != setup.user_id and not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('social.setups'))
+    if request.method == 'POST':
+        setup.title = request.form['title']
+        setup.description = request.form['description']
+        previous_image_url = setup.image_url
+        pending_path = None
+        # Handle image upload; the image is resized in the background
+        if 'image' in request.files:
+            file = request.files['image']
+            if file and file.filename:
+                try:
+                    upload_path, pending_path = stage_image_upload(file, 'setups')
+                except InvalidImage:
+                    flash('Setup image must be a valid image file')
+                    return redirect(url_for('social.edit_setup', setup_id=setup.id))
+                setup.image_url = '/static/uploads/' + (pending_path or upload_path)
+        db.session.commit()
+        if pending_path:
+            process_image_upload(SetupPost, setup.id, 'image_url', pending_path, upload_path, previous_image_url, '/static/uploads/')
+        flash('Setup updated successfully')
+        return redirect(url_for('social.setups'))
+    return render_template('edit_setup.html', setup=setup)
+
+@bp.route('/delete_setup/<int:setup_id>', methods=['POST'])
+@login_required
+def delete_setup(setup_id):
+    setup = SetupPost.query.get_or_404(setup_id)
+    if current_user.id != setup.user_id and not current_user.is_admin:
+        flash('Access denied')
+        return redirect(url_for('social.setups'))
+    db.session.delete(setup)
+    db.session.commit()
+    flash('Setup deleted successfully')
+    return redirect(url_for('social.setups'))
@@ -0,0 +1,246 @@
+# Store blueprint: catalog, game pages, cart, checkout and vouchers
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy import exists, select
+from sqlalchemy.orm import joinedload
+
+from database import read_replica
+from extensions import db, fragment_cache
+from models import Game, Review, Cart, Purchase, SetupPost, NotifyRequest, Voucher
+from services import redeem_points_for_voucher, use_voucher
+
+bp = Blueprint('store', __name__)
+
+# Voucher costs and amounts
+VOUCHER_TYPES = {
+    'small': {'cost': 50, 'amount': 5.00},    # 50 points for $5 voucher
+    'medium': {'cost': 100, 'amount': 12.00}, # 100 points for $12 voucher
+    'large': {'cost': 200, 'amount': 25.00}   # 200 points for $25 voucher
+}
+
+@bp.route('/')
+@read_replica
+@fragment_cache.cached_for_anonymous('Game', 'SetupPost')
+def index():
+    games = Game.query.filter_by(is_available=True).limit(8).all()
+    # Chosen by rotate_featured_setup(); until the first rotation, show the hottest setup
+    featured_query = SetupPost.query.options(joinedload(SetupPost.user))
+    featured_setup = featured_query.filter_by(is_featured=True).first()
+    if not featured_setup:
+        featured_setup = featured_query.order_by(SetupPost.hot_score.desc(), SetupPost.id.desc()).first()
+    
+    return render_template('index.html', games=games, featured_setup=featured_setup)
+
+@bp.route('/games')
+@read_replica
+@fragment_cache.conditional('Game', 'User:{user_id}')
+@fragment_cache.cached_for_anonymous('Game')
+def games():
+    page = request.args.get('page', 1, type=int)
+    genre = request.args.get('genre')
+    query = Game.query
+    if genre:
+        query = query.filter(Game.genre.ilike(f'%{genre.strip()}%'))
+    games = query.order_by(Game.created_at.desc()).paginate(page=page, per_page=12, error_out=False)
+    return render_template('games.html', games=games, NotifyRequest=NotifyRequest)
+
+@bp.route('/game/<int:game_id>')
+@read_replica
+@fragment_cache.conditional('Game:{game_id}', 'ReviewComment', 'User:{user_id}')
+@fragment_cache.cached_for_anonymous('Game:{game_id}', 'ReviewComment')
+def game_detail(game_id):
+    game = Game.query.get_or_404(game_id)
+    reviews = Review.query.options(joinedload(Review.user)).filter_by(game_id=game_id).all()
+    user_review = None
+    notify_requested = None
+    owns_game = False
+    if current_user.is_authenticated:
+        user_review = Review.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+        # One EXISTS query, however many games the viewer owns
+        owns_game = db.session.execute(
+            select(exists().where(Purchase.user_id == current_user.id, Purchase.game_id == game_id))
+        ).scalar()
+        if not current_user.is_admin:
+            notify_requested = NotifyRequest.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    return render_template('game_detail.html', game=game, reviews=reviews, user_review=user_review,
+                           notify_requested=notify_requested, owns_game=owns_game)
+
+@bp.route('/add_to_cart/<int:game_id>')
+@login_required
+def add_to_cart(game_id):
+    if current_user.is_admin:
+        flash('Admins cannot buy games.')
+        return redirect(url_for('store.game_detail', game_id=game_id))
+    # Prevent adding if already owned
+    already_owned = Purchase.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if already_owned:
+        flash('You already own this game.')
+        return redirect(url_for('store.game_detail', game_id=game_id))
+    existing_item = Cart.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if existing_item:
+        flash('This game is already in your cart.')
+        return redirect(url_for('store.game_detail', game_id=game_id))
+    else:
+        cart_item = Cart(user_id=current_user.id, game_id=game_id)
+        db.session.add(cart_item)
+    db.session.commit()
+    flash('Game added to cart')
+    return redirect(url_for('store.game_detail', game_id=game_id))
+
+@bp.route('/cart')
+@login_required
+def cart():
+    cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+    total = sum(item.game.price * item.quantity for item in cart_items)
+    return render_template('cart.html', cart_items=cart_items, total=total)
+
+@bp.route('/checkout')
+@login_required
+def checkout():
+    if current_user.is_admin:
+        flash('Admins cannot buy games.')
+        return redirect(url_for('store.cart'))
+    
+    cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+    if not cart_items:
+        flash('Your cart is empty')
+        return redirect(url_for('store.cart'))
+    
+    total = sum(item.game.price * item.quantity for item in cart_items)
+    
+    # Get user's active vouchers
+    active_vouchers = Voucher.query.filter_by(
+        user_id=current_user.id, 
+        is_used=False
+    ).all()
+    
+    return render_template('checkout.html', 
+                         cart_items=cart_items, 
+                         total=total,
+                         active_vouchers=active_vouchers)
+
+@bp.route('/process_checkout', methods=['POST'])
+@login_required
+def process_checkout():
+    if current_user.is_admin:
+        flash('Admins cannot buy games.')
+        return redirect(url_for('store.cart'))
+    
+    cart_items = Cart.query.filter_by(user_id=current_user.id).all()
+    if not cart_items:
+        flash('Your cart is empty')
+        return redirect(url_for('store.cart'))
+    
+    total = sum(item.game.price * item.quantity for item in cart_items)
+    voucher_id = request.form.get('voucher_id')
+    
+    # Apply voucher if selected
+    discount_amount = 0
+    if voucher_id:
+        # Marked used only if still unused, so one voucher cannot pay for two orders
+        discount_amount = use_voucher(db.session, current_user.id, int(voucher_id)) if voucher_id.isdigit() else None
+        if discount_amount is None:
+            db.session.rollback()
+            flash('Invalid voucher selected')
+            return redirect(url_for('store.checkout'))
+    
+    final_total = max(0, total - discount_amount)
+    
+    # Process purchases
+    for item in cart_items:
+        purchase = Purchase(
+            user_id=current_user.id,
+            game_id=item.game_id,
+            price_paid=item.game.price
+        )
+        db.session.add(purchase)
+    
+    # Clear cart
+    Cart.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+    
+    if discount_amount > 0:
+        flash(f'Purchase successful! ${discount_amount:.2f} discount applied. Total paid: ${final_total:.2f}')
+    else:
+        flash('Purchase successful!')
+    
+    return redirect(url_for('account.profile'))
+
+@bp.route('/clear_cart', methods=['POST'])
+@login_required
+def clear_cart():
+    Cart.query.filter_by(user_id=current_user.id).delete()
+    db.session.commit()
+    flash('Cart cleared!')
+    return redirect(url_for('store.cart'))
+
+@bp.route('/redeem_voucher', methods=['POST'])
+@login_required
+def redeem_voucher():
+    voucher_type = request.form.get('voucher_type')
+    
+    if voucher_type not in VOUCHER_TYPES:
+        flash('Invalid voucher type')
+        return redirect(url_for('account.profile'))
+    
+    cost = VOUCHER_TYPES[voucher_type]['cost']
+    amount = VOUCHER_TYPES[voucher_type]['amount']
+    
+    # The points are checked and deducted in one UPDATE
+    if redeem_points_for_voucher(db.session, current_user.id, cost, amount) is None:
+        db.session.rollback()
+        flash(f'You need {cost} popularity points to redeem this voucher. You currently have {current_user.popularity_points} points.')
+        return redirect(url_for('account.profile'))
+    db.session.commit()
+    
+    flash(f'Voucher worth ${amount:.2f} redeemed successfully! {cost} popularity points deducted.')
+    return redirect(url_for('store.redeem_vouchers_page'))
+
+@bp.route('/redeem_vouchers')
+@login_required
+def redeem_vouchers_page():
+    return render_template('redeem_vouchers.html')
+
+@bp.route('/notify_when_available/<int:game_id>', methods=['POST'])
+@login_required
+def notify_when_available(game_id):
+    existing = NotifyRequest.query.filter_by(user_id=current_user.id, game_id=game_id).first()
+    if not existing:
+        req = NotifyRequest(user_id=current_user.id, game_id=game_id)
+        db.session.add(req)
+        db.session.commit()
+        flash('You will be notified when this game is available.')
+    else:
+        flash('You have already requested notification for this game.')
+    return redirect(url_for('store.game_detail', game_id=game_id))
+
+@bp.route('/ai_recommendations')
+@login_required
+def ai_recommendations():
+    # Simple AI recommendation based on user's purchase history and ratings
+    user_purchases = Purchase.query.filter_by(user_id=current_user.id).all()
+    user_reviews = Review.query.filter_by(user_id=current_user.id).all()
+    
+    # Get genres from purchased games
+    purchased_genres = []
+    for purchase in user_purchases:
+        if purchase.game.genre:
+            purchased_genres.append(purchase.game.genre)
+    
+    # Get highly rated genres from reviews
+    high_rated_genres = []
+    for review in user_reviews:
+        if review.rating >= 4 and review.game.genre:
+            high_rated_genres.append(review.game.genre)
+    
+    # Combine and find most common genres
+    all_genres = purchased_genres + high_rated_genres
+    if all_genres:
+        most_common_genre = max(set(all_genres), key=all_genres.count)
+        recommendations = Game.query.filter_by(genre=most_common_genre, is_available=True).limit(6).all()
+    else:
+        # Fallback to popular games
+        recommendations = Game.query.filter_by(is_available=True).limit(6).all()
+    
+    return render_template('ai_recommendations.html', recommendations=recommendations)
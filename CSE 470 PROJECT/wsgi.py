@@ -0,0 +1,5 @@
+# WSGI entry point for production servers (see gunicorn.conf.py and scripts/serve.py)
+
+from app import create_app
+
+app = create_app()